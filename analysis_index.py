@@ -0,0 +1,123 @@
+"""
+Persistenter Analyse-Index (JSON im Output-Ordner)
+
+Speichert die Ergebnisse von AudioAnalyzer.analyze_file pro Datei, gültig für
+(Pfad, Größe, mtime, Inhalts-Hash). Die Indexseite der Weboberfläche analysiert
+so nur Dateien, die sich seit dem letzten Aufruf geändert haben. Wie beim
+Batch-Manifest wird nur gehasht, wenn sich Größe oder mtime geändert haben;
+eine Datei mit bekanntem Inhalt (touch, Kopie, Umbenennung) wird nicht neu
+analysiert.
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from batch_journal import json_default
+from batch_manifest import file_digest
+from config import ANALYSIS_INDEX_FILENAME
+
+logger = logging.getLogger(__name__)
+
+# Format der gespeicherten Analysen - bei Änderungen an AudioAnalyzer.analyze_file erhöhen
+ANALYSIS_VERSION = 1
+
+
+class AnalysisIndex:
+    """
+    Cache der Datei-Analysen, geteilt von AudioAnalyzer, Weboberfläche und BatchProcessor
+
+    Thread-sicher; analysiert wird außerhalb des Locks (zwei Threads können
+    dieselbe Datei parallel analysieren, das Ergebnis ist identisch).
+    """
+
+    def __init__(self, directory: Path):
+        self.path = Path(directory) / ANALYSIS_INDEX_FILENAME
+        self.entries: Dict[str, dict] = {}       # absoluter Pfad → Größe, mtime, Hash, Analyse
+        self._by_digest: Dict[str, dict] = {}    # Inhalts-Hash → Analyse
+        self._dirty = False
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == ANALYSIS_VERSION:
+                    self.entries = data.get('entries', {})
+                else:
+                    logger.info(f"Analyse-Index {self.path} hat altes Format, wird neu aufgebaut")
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️  Analyse-Index {self.path} nicht lesbar ({e}), starte neu")
+        for entry in self.entries.values():
+            self._by_digest[entry['sha256']] = entry['analysis']
+
+    def get(self, filepath: Path) -> Optional[Dict[str, Any]]:
+        """Gespeicherte Analyse einer Datei oder None, wenn sie (neu) analysiert werden muss"""
+        return self.lookup(filepath)[0]
+
+    def lookup(self, filepath: Path) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Wie get, liefert zusätzlich den Datei-Stand der Prüfung
+
+        Returns:
+            (Analyse oder None, Größe/mtime/Hash für put - erspart dort das erneute Hashen)
+        """
+        key = str(Path(filepath).resolve())
+        stat = os.stat(filepath)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+                self.hits += 1
+                return entry['analysis'], None
+
+        # Größe/mtime unbekannt oder geändert - erst der Inhalts-Hash entscheidet
+        fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': file_digest(Path(filepath))}
+        with self._lock:
+            analysis = self._by_digest.get(fingerprint['sha256'])
+            if analysis is None:
+                self.misses += 1
+                return None, fingerprint
+            self.entries[key] = dict(fingerprint, analysis=analysis)
+            self._dirty = True
+            self.hits += 1
+            return analysis, None
+
+    def put(self, filepath: Path, analysis: Dict[str, Any], fingerprint: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Speichert die Analyse einer Datei
+
+        fingerprint (aus lookup) beschreibt den analysierten Stand; ohne ihn gilt der
+        Stand zum Zeitpunkt des Aufrufs (Datei wird gehasht). Ändert sich die Datei
+        danach, passt mtime nicht mehr und der nächste Abruf prüft erneut.
+        """
+        if fingerprint is None:
+            stat = os.stat(filepath)
+            fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                           'sha256': file_digest(Path(filepath))}
+        with self._lock:
+            self.entries[str(Path(filepath).resolve())] = dict(fingerprint, analysis=analysis)
+            self._by_digest[fingerprint['sha256']] = analysis
+            self._dirty = True
+
+    def save(self) -> None:
+        """Schreibt den Index atomar, falls geändert; Einträge gelöschter Dateien entfallen"""
+        with self._lock:
+            for key in [key for key in self.entries if not os.path.exists(key)]:
+                del self.entries[key]
+                self._dirty = True
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + '.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': ANALYSIS_VERSION, 'entries': self.entries}, f, default=json_default)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self.entries)}
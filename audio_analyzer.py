@@ -5,34 +5,50 @@ Erstellt detaillierte Reports und visualisiert Änderungen
 
 import numpy as np
 import soundfile as sf
-import pyloudnorm as pyln
 from pathlib import Path
 import json
 
+from loudness import LoudnessMeter
+
 
 class AudioAnalyzer:
     """Detaillierte Audio-Analyse"""
 
-    def __init__(self):
-        self.meter_44k = pyln.Meter(44100)
-        self.meter_48k = pyln.Meter(48000)
+    def __init__(self, dtype='float64', index=None):
+        self.meters = {}  # LoudnessMeter pro Sample-Rate
+        self.dtype = dtype  # 'float32' halbiert den Speicherbedarf beim Laden
+        self.index = index  # AnalysisIndex: unveränderte Dateien werden nicht erneut analysiert
 
     def analyze_file(self, filepath):
-        """Vollständige Analyse einer Audio-Datei"""
-        audio, sr = sf.read(filepath)
+        """Vollständige Analyse einer Audio-Datei (aus dem Index, falls unverändert)"""
+        if self.index is None:
+            return self._analyze_file(filepath)
+
+        cached, fingerprint = self.index.lookup(filepath)
+        if cached is not None:
+            # Gleicher Inhalt kann unter anderem Namen im Index stehen (Kopie, Umbenennung)
+            return dict(cached, filename=Path(filepath).name)
+        analysis = self._analyze_file(filepath)
+        self.index.put(filepath, analysis, fingerprint)
+        return analysis
+
+    def _analyze_file(self, filepath):
+        audio, sr = sf.read(filepath, dtype=self.dtype)
 
-        # Meter wählen
-        meter = self.meter_44k if sr == 44100 else self.meter_48k
+        # Meter für die tatsächliche Sample-Rate
+        if sr not in self.meters:
+            self.meters[sr] = LoudnessMeter(sr)
 
-        # LUFS Messung
-        lufs_integrated = meter.integrated_loudness(audio)
+        # LUFS Messung (Integrated, Momentary, Short-Term, LRA in einem Durchlauf)
+        loudness = self.meters[sr].measure(audio)
+        lufs_integrated = loudness['integrated']
 
         # Peak Messungen
-        peak_sample = np.max(np.abs(audio))
+        peak_sample = float(np.max(np.abs(audio)))
         peak_db = 20 * np.log10(peak_sample + 1e-10)
 
         # RMS (Root Mean Square)
-        rms = np.sqrt(np.mean(audio ** 2))
+        rms = np.sqrt(np.mean(audio ** 2, dtype=np.float64))
         rms_db = 20 * np.log10(rms + 1e-10)
 
         # Crest Factor (Dynamik-Indikator)
@@ -45,14 +61,14 @@ class AudioAnalyzer:
             mid = (audio[:, 0] + audio[:, 1]) / 2
             side = (audio[:, 0] - audio[:, 1]) / 2
 
-            mid_rms = np.sqrt(np.mean(mid ** 2))
-            side_rms = np.sqrt(np.mean(side ** 2))
+            mid_rms = np.sqrt(np.mean(mid ** 2, dtype=np.float64))
+            side_rms = np.sqrt(np.mean(side ** 2, dtype=np.float64))
 
             stereo_width = side_rms / (mid_rms + 1e-10)
 
             # Balance
-            left_rms = np.sqrt(np.mean(audio[:, 0] ** 2))
-            right_rms = np.sqrt(np.mean(audio[:, 1] ** 2))
+            left_rms = np.sqrt(np.mean(audio[:, 0] ** 2, dtype=np.float64))
+            right_rms = np.sqrt(np.mean(audio[:, 1] ** 2, dtype=np.float64))
             balance = (right_rms - left_rms) / (right_rms + left_rms + 1e-10)
         else:
             stereo_width = 0
@@ -70,6 +86,9 @@ class AudioAnalyzer:
 
             # Lautstärke
             'lufs_integrated': round(lufs_integrated, 2),
+            'lufs_momentary_max': round(loudness['momentary_max'], 2),
+            'lufs_short_term_max': round(loudness['short_term_max'], 2),
+            'loudness_range': round(loudness['lra'], 2),
             'peak_db': round(peak_db, 2),
             'rms_db': round(rms_db, 2),
 
@@ -99,6 +118,7 @@ class AudioAnalyzer:
                 'peak_db': round(mast['peak_db'] - orig['peak_db'], 2),
                 'rms_db': round(mast['rms_db'] - orig['rms_db'], 2),
                 'crest_factor_db': round(mast['crest_factor_db'] - orig['crest_factor_db'], 2),
+                'loudness_range': round(mast['loudness_range'] - orig['loudness_range'], 2),
             }
         }
 
@@ -122,6 +142,8 @@ class AudioAnalyzer:
             comparison = self.compare_files(str(orig_file), str(mastered_file))
             comparisons.append(comparison)
 
+        if self.index is not None:
+            self.index.save()
         return comparisons
 
     def print_comparison_report(self, comparisons):
@@ -147,6 +169,7 @@ class AudioAnalyzer:
             # Dynamik
             print(f"\n  🎚️  DYNAMIK:")
             print(f"     Crest Factor: {orig['crest_factor_db']:>5.2f} dB  →  {mast['crest_factor_db']:>5.2f} dB  (Δ {delta['crest_factor_db']:>+5.2f} dB)")
+            print(f"     LRA:          {orig['loudness_range']:>5.2f} LU  →  {mast['loudness_range']:>5.2f} LU  (Δ {delta['loudness_range']:>+5.2f} LU)")
 
             # Stereo
             if orig['channels'] == 2:
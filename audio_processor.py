@@ -4,15 +4,48 @@ Audio-Verarbeitungsklasse für Mastering-Chain
 
 import numpy as np
 import soundfile as sf
-import pyloudnorm as pyln
 from scipy import signal
 from scipy.signal import resample_poly
-from typing import Tuple, Optional
+from typing import Tuple, Optional, List
 import logging
+import os
+from contextlib import contextmanager
 from math import gcd
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+from dsp import (smooth_gain_reduction, sliding_mean_square, measure_true_peak, compute_gain_reduction,
+                 TruePeakMeter, StreamingCompressor, StreamingLimiter, StreamResampler, highpass_sos,
+                 resample_filter, limit_true_peak, TRUE_PEAK_BLOCK_SIZE, TRUE_PEAK_OVERSAMPLING)
+from loudness import StreamingLoudnessMeter, LoudnessModel, LoudnessMeter
+from config import WAVEFORM_SIDECARS
+from waveform import WaveformBuilder
 
 logger = logging.getLogger(__name__)
 
+# Namensteil temporärer Outputs: ".song_mastered.partial.wav" bis zum atomaren Umbenennen
+PARTIAL_MARKER = ".partial"
+
+
+@contextmanager
+def atomic_output(output_path: str):
+    """
+    Schreibt einen Output über eine temporäre Datei im selben Ordner
+
+    Liefert den temporären Pfad; erst nach erfolgreichem Schreiben wird er per
+    os.replace atomar umbenannt. Ein Absturz hinterlässt so nie eine halb
+    geschriebene Datei unter dem endgültigen Namen (die Endung bleibt erhalten,
+    damit soundfile das Format erkennt).
+    """
+    path = Path(output_path)
+    tmp_path = path.with_name(f".{path.stem}{PARTIAL_MARKER}{path.suffix}")
+    try:
+        yield str(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
 # Genre-spezifische Mastering-Presets
 MASTERING_PRESETS = {
     'default': {
@@ -22,6 +55,7 @@ MASTERING_PRESETS = {
         'comp_ratio': 2.0,      # Weniger aggressiv (statt 2.5)
         'comp_attack': 15,      # Sanfter
         'comp_release': 200,    # Länger
+        'limiter_release': 50,  # Release des Lookahead-Limiters (ms)
         'use_compression': True
     },
 
@@ -33,6 +67,7 @@ MASTERING_PRESETS = {
         'comp_ratio': 2.0,
         'comp_attack': 15,
         'comp_release': 200,
+        'limiter_release': 100,
         'use_compression': False  # Nur LUFS + Limiter
     },
 
@@ -44,6 +79,7 @@ MASTERING_PRESETS = {
         'comp_ratio': 1.0,      # Nicht verwendet
         'comp_attack': 20,      # Nicht verwendet
         'comp_release': 200,    # Nicht verwendet
+        'limiter_release': 80,
         'use_compression': False  # Keine Kompression für Suno AI
     },
 
@@ -55,6 +91,7 @@ MASTERING_PRESETS = {
         'comp_ratio': 4.0,
         'comp_attack': 5,
         'comp_release': 100,
+        'limiter_release': 30,
         'use_compression': True
     },
 
@@ -66,6 +103,7 @@ MASTERING_PRESETS = {
         'comp_ratio': 1.5,
         'comp_attack': 20,
         'comp_release': 300,
+        'limiter_release': 150,
         'use_compression': True
     },
 
@@ -77,16 +115,139 @@ MASTERING_PRESETS = {
         'comp_ratio': 3.0,
         'comp_attack': 5,
         'comp_release': 100,
+        'limiter_release': 60,
         'use_compression': True
     }
 }
 
 
+# Analyse-Modi für process_file:
+# - 'full': vollständige Analyse nach jedem Schritt
+# - 'incremental': reine Gain-Schritte (LUFS-Norm, inaktiver Limiter) analytisch ableiten
+# - 'final-only': nur Original und Endergebnis messen
+ANALYSIS_MODES = ('full', 'incremental', 'final-only')
+
+# Sample-Formate der Verarbeitungskette (float32 halbiert Speicher und Bandbreite;
+# Filterkoeffizienten, Filterzustände und Messungen bleiben in float64)
+DTYPES = ('float64', 'float32')
+
+# Frames pro Lese-/Schreibblock im Streaming-Modus
+STREAM_BLOCK_FRAMES = 65536
+
+# Gain Reduction, die der Lookahead-Limiter bei der LUFS-Normalisierung übernehmen darf;
+# erst darüber wird der Normalisierungs-Gain zurückgenommen (Smart Limiting)
+LIMITER_MAX_GAIN_REDUCTION_DB = 6.0
+
+# Speicherschätzung pro Job (estimate_memory), mit tracemalloc an process_audio kalibriert:
+# Kopien des Audios bei Ziel-Sample-Rate (High-Pass, Gain, Limiter-Ausgang) plus
+# float64-Kurven pro Frame (Limiter-Gain, Hüllkurven; mit Kompression RMS und GR)
+MEMORY_AUDIO_COPIES = 3.5
+MEMORY_FRAME_CURVES = 1.0
+MEMORY_COMPRESSION_FRAME_CURVES = 3.5
+
+# Segment-parallele Verarbeitung einzelner langer Dateien (process_audio_segmented):
+# Kernlänge pro Segment und Mindestdauer, ab der eine Datei segmentiert wird
+SEGMENT_SEC = 30.0
+SEGMENT_MIN_DURATION_SEC = 2 * SEGMENT_SEC
+
+# Einschwingzeit vor jedem Segment: mindestens SEGMENT_WARMUP_MIN_SEC (IIR-Filter),
+# sonst das Vielfache der längsten Release-Zeitkonstante (Restfehler ~e^-20)
+SEGMENT_WARMUP_MIN_SEC = 2.0
+SEGMENT_WARMUP_TIME_CONSTANTS = 20
+
+# Nachlauf hinter jedem Segment für Lookahead (RMS-Fenster, Limiter, True Peak)
+SEGMENT_TAIL_SEC = 0.1
+
+
 def get_preset(name='suno'):
     """Lade Preset nach Name"""
     return MASTERING_PRESETS.get(name, MASTERING_PRESETS['suno'])
 
 
+class StreamingAnalysis:
+    """
+    Blockweise Variante von AudioProcessor.analyze_audio
+
+    Liefert dieselben Kennzahlen (LUFS, Peak, True Peak, RMS, Crest Factor),
+    hält aber nur laufende Summen, Maxima und Filterzustände im Speicher.
+    """
+
+    def __init__(self, sample_rate: int, channels: int, start_frame: int = 0):
+        self._loudness = StreamingLoudnessMeter(sample_rate, channels, start_frame)
+        self._true_peak = TruePeakMeter(channels)
+        self._sum_squares = 0.0
+        self._samples = 0
+        self._peak = 0.0
+
+    def process(self, block: np.ndarray) -> None:
+        if len(block) == 0:
+            return
+        self._loudness.process(block)
+        self._true_peak.process(block)
+        self._sum_squares += float(np.sum(block**2, dtype=np.float64))
+        self._samples += block.size
+        self._peak = max(self._peak, float(np.max(np.abs(block))))
+
+    def warm_up(self, block: np.ndarray) -> None:
+        """Frames vor start_frame: nur Filterzustände einschwingen (Segment-Analyse)"""
+        self._loudness.warm_up(block)
+        self._true_peak.warm_up(block)
+
+    def peek_ahead(self, block: np.ndarray) -> None:
+        """
+        Frames nach dem Segmentende: nur für die Inter-Sample-Peaks am Segmentrand
+
+        Die Werte stammen aus dem echten Signal (Nachbarsegment), ein Mitzählen
+        ändert das Maximum über die ganze Datei daher nicht.
+        """
+        self._true_peak.process(block)
+
+    def merge(self, other: 'StreamingAnalysis') -> None:
+        """Hängt die Analyse des direkt folgenden Segments an"""
+        self._loudness.merge(other._loudness)
+        self._true_peak.merge(other._true_peak)
+        self._sum_squares += other._sum_squares
+        self._samples += other._samples
+        self._peak = max(self._peak, other._peak)
+
+    def loudness_model(self) -> LoudnessModel:
+        """Lautheitsmodell aus den gemessenen Gating-Blöcken (für Gain-Berechnungen)"""
+        return LoudnessModel(self._loudness.block_energies(), self._true_peak.peak_db())
+
+    def result(self, step_name: str = "Analyse") -> dict:
+        """Analyse-Dict im Format von analyze_audio"""
+        try:
+            lufs = self._loudness.integrated_loudness()
+            peak_db = 20 * np.log10(self._peak + 1e-10)
+            peak_dbtp = self._true_peak.peak_db()
+            rms = np.sqrt(self._sum_squares / self._samples)
+            crest_factor = peak_db - 20 * np.log10(rms + 1e-10)
+
+            return {
+                'lufs': round(lufs, 2),
+                'peak_db': round(peak_db, 2),
+                'peak_dbtp': round(peak_dbtp, 2),
+                'rms_db': round(20 * np.log10(rms + 1e-10), 2),
+                'crest_factor': round(crest_factor, 2),
+                'dynamic_range': round(crest_factor, 2)
+            }
+        except Exception as e:
+            logger.warning(f"Analyse fehlgeschlagen bei {step_name}: {e}")
+            return {'lufs': 0, 'peak_db': 0, 'peak_dbtp': 0, 'rms_db': 0, 'crest_factor': 0, 'dynamic_range': 0}
+
+
+class PreparedAudio:
+    """Ergebnis von AudioProcessor.prepare_audio (Eingang der preset-spezifischen Stufen)"""
+
+    def __init__(self, audio: np.ndarray, sample_rate: int, original_analysis: dict,
+                 hp_analysis: dict, hp_model: Optional[LoudnessModel]):
+        self.audio = audio                      # nach Resample und High-Pass
+        self.sample_rate = sample_rate
+        self.original_analysis = original_analysis
+        self.hp_analysis = hp_analysis
+        self.hp_model = hp_model                # None, falls die Messung fehlschlug
+
+
 class AudioProcessor:
     """
     Verarbeitet einzelne Audio-Dateien durch die Mastering-Chain:
@@ -100,7 +261,21 @@ class AudioProcessor:
                  target_lufs: float = -10.0,
                  true_peak_ceiling: float = -1.0,
                  sample_rate: int = 44100,
-                 preset: str = 'suno'):
+                 preset: str = 'suno',
+                 analysis_mode: str = 'incremental',
+                 dtype: str = 'float64',
+                 segment_workers: int = 1):
+        if analysis_mode not in ANALYSIS_MODES:
+            raise ValueError(f"Unbekannter Analyse-Modus '{analysis_mode}' (erlaubt: {', '.join(ANALYSIS_MODES)})")
+        if dtype not in DTYPES:
+            raise ValueError(f"Unbekanntes Sample-Format '{dtype}' (erlaubt: {', '.join(DTYPES)})")
+        if segment_workers < 1:
+            raise ValueError(f"segment_workers muss >= 1 sein ({segment_workers} angegeben)")
+        self.analysis_mode = analysis_mode
+        self.dtype = dtype
+        # > 1: lange Dateien in Segmenten parallel verarbeiten (Threads)
+        self.segment_workers = segment_workers
+
         # Speichere Preset-Name für Logging
         self._preset_name = preset
 
@@ -114,6 +289,7 @@ class AudioProcessor:
             self.comp_ratio = config['comp_ratio']
             self.comp_attack = config['comp_attack']
             self.comp_release = config['comp_release']
+            self.limiter_release = config['limiter_release']
             logger.info(f"🎛️ Verwende Preset '{preset}': LUFS {self.target_lufs}dB, Kompression {'Ja' if self.use_compression else 'Nein'}")
         else:
             self.target_lufs = target_lufs
@@ -123,21 +299,76 @@ class AudioProcessor:
             self.comp_ratio = 1.0  # Default
             self.comp_attack = 10.0  # Default
             self.comp_release = 100.0  # Default
+            self.limiter_release = MASTERING_PRESETS['suno']['limiter_release']
             logger.info(f"🎛️ Verwende Suno AI Preset: LUFS {self.target_lufs}dB, Kompression Nein")
 
         self.sample_rate = sample_rate
-        self.meter = pyln.Meter(sample_rate)
+        self.meter = LoudnessMeter(sample_rate)
+
+    def processing_settings(self) -> dict:
+        """Alle Parameter, die das gemasterte Audio bestimmen (ohne Analyse-Modus)"""
+        return {
+            'preset': self._preset_name,
+            'target_lufs': self.target_lufs,
+            'true_peak_ceiling': self.true_peak_ceiling,
+            'use_compression': self.use_compression,
+            'comp_threshold': self.comp_threshold,
+            'comp_ratio': self.comp_ratio,
+            'comp_attack': self.comp_attack,
+            'comp_release': self.comp_release,
+            'limiter_release': self.limiter_release,
+            'sample_rate': self.sample_rate,
+            'dtype': self.dtype
+        }
+
+    def estimate_memory(self, frames: int, file_sr: int, channels: int, streaming: bool = False,
+                        renditions: int = 1) -> int:
+        """
+        Geschätzter Spitzen-Speicher (Bytes) für das Mastering einer Datei
+
+        Dekodiertes Audio plus das Maximum aus Resample-Phase (resample_poly rechnet
+        Ein- und Ausgang in float64) und Verarbeitungs-Phase: MEMORY_AUDIO_COPIES
+        Kopien bei Ziel-Sample-Rate, float64-Kurven pro Frame und True-Peak-
+        Oversampling. Die 4x-Oversampling-Puffer entstehen blockweise
+        (TRUE_PEAK_BLOCK_SIZE) und hängen daher nicht von der Dateilänge ab.
+        Streaming hält nur STREAM_BLOCK_FRAMES im Speicher; renditions > 1 (Preset-
+        Fan-out) zählt je eine zusätzliche Kopie pro weiterem Output.
+        """
+        itemsize = np.dtype(self.dtype).itemsize
+        if streaming:
+            frames = min(frames, STREAM_BLOCK_FRAMES)
+        target_frames = int(np.ceil(frames * self.sample_rate / file_sr))
+
+        resampling = (frames + target_frames) * channels * 8 if file_sr != self.sample_rate else 0
+        curves = MEMORY_FRAME_CURVES + (MEMORY_COMPRESSION_FRAME_CURVES if self.use_compression else 0.0)
+        copies = MEMORY_AUDIO_COPIES + renditions - 1
+        processing = (copies * target_frames * channels * itemsize
+                      + curves * target_frames * 8
+                      + TRUE_PEAK_OVERSAMPLING * TRUE_PEAK_BLOCK_SIZE * channels * 8)
+        return int(frames * channels * itemsize + max(resampling, processing))
 
     def analyze_audio(self, audio: np.ndarray, step_name: str = "Analyse") -> dict:
         """Führt vollständige Audio-Analyse durch"""
+        return self._analyze_with_model(audio, step_name)[0]
+
+    def _analyze_with_model(self, audio: np.ndarray,
+                            step_name: str = "Analyse") -> Tuple[dict, Optional[LoudnessModel]]:
+        """
+        Audio-Analyse plus LoudnessModel der Messung
+
+        LUFS und True Peak kommen aus einem gemeinsamen blockweisen Durchlauf;
+        das Modell erlaubt danach Gain-Berechnungen ohne erneute Messung
+        (None, falls die Analyse fehlschlägt).
+        """
         try:
-            lufs = self.meter.integrated_loudness(audio)
-            peak_linear = np.max(np.abs(audio))
+            model = LoudnessModel.measure(audio, self.sample_rate)
+            lufs = model.loudness_after_gain(0.0)
+            peak_linear = float(np.max(np.abs(audio)))
             peak_db = 20 * np.log10(peak_linear + 1e-10)
-            peak_dbtp = self._measure_true_peak(audio)
+            peak_dbtp = model.true_peak_db
 
             # Zusätzliche Metriken
-            rms = np.sqrt(np.mean(audio**2))
+            rms = np.sqrt(np.mean(audio**2, dtype=np.float64))
             crest_factor = peak_db - 20 * np.log10(rms + 1e-10)
 
             return {
@@ -147,15 +378,30 @@ class AudioProcessor:
                 'rms_db': round(20 * np.log10(rms + 1e-10), 2),
                 'crest_factor': round(crest_factor, 2),
                 'dynamic_range': round(peak_db - 20 * np.log10(rms + 1e-10), 2)
-            }
+            }, model
         except Exception as e:
             logger.warning(f"Analyse fehlgeschlagen bei {step_name}: {e}")
-            return {'lufs': 0, 'peak_db': 0, 'peak_dbtp': 0, 'rms_db': 0, 'crest_factor': 0, 'dynamic_range': 0}
+            return {'lufs': 0, 'peak_db': 0, 'peak_dbtp': 0, 'rms_db': 0, 'crest_factor': 0, 'dynamic_range': 0}, None
+
+    def _derive_gain_analysis(self, analysis: dict, gain_db: float) -> dict:
+        """
+        Leitet die Analyse nach einem reinen Gain-Schritt analytisch ab
+
+        LUFS, Peak, True Peak und RMS verschieben sich exakt um den Gain,
+        Crest Factor und Dynamik bleiben unverändert - keine erneute Messung nötig.
+        """
+        derived = dict(analysis)
+        for key in ('lufs', 'peak_db', 'peak_dbtp', 'rms_db'):
+            derived[key] = round(analysis[key] + gain_db, 2)
+        return derived
 
     def process_file(self, input_path: str, output_path: str) -> dict:
         """
         Verarbeitet eine einzelne Audio-Datei mit detaillierter Analyse und Logging
 
+        Ablauf: load_audio → process_audio → write_audio (die Stufen sind einzeln
+        aufrufbar, z.B. für die Pipeline in BatchProcessor)
+
         Args:
             input_path: Pfad zur Input-Datei
             output_path: Pfad zur Output-Datei
@@ -164,98 +410,485 @@ class AudioProcessor:
             Dict mit Messwerten und Verarbeitungsdetails
         """
         try:
-            logger.info(f"🔍 Starte Verarbeitung von {input_path}")
+            audio, sr = self.load_audio(input_path)
+            audio, results = self.process_audio(audio, sr)
+            # process_audio resampelt auf self.sample_rate - geschrieben wird mit der Rate des Ergebnisses
+            self.write_audio(output_path, audio, results['sample_rate'])
+            return results
+
+        except Exception as e:
+            logger.error(f"❌ Fehler bei Verarbeitung von {input_path}: {str(e)}")
+            raise
+
+    def load_audio(self, input_path: str) -> Tuple[np.ndarray, int]:
+        """Dekodiert eine Audio-Datei im Verarbeitungs-dtype (Stufe 1: I/O)"""
+        logger.info(f"🔍 Starte Verarbeitung von {input_path}")
+        audio, sr = sf.read(input_path, dtype=self.dtype)
+        logger.info(f"📂 Datei geladen: {audio.shape}, {sr}Hz, Dauer: {len(audio)/sr:.1f}s")
+        return audio, sr
+
+    def write_audio(self, output_path: str, audio: np.ndarray, sr: int) -> None:
+        """Schreibt das gemasterte Audio als 16-bit PCM (Stufe 3: I/O)"""
+        logger.info(f"💾 Speichere als {output_path}")
+        with atomic_output(output_path) as tmp_path:
+            sf.write(tmp_path, audio, sr, subtype='PCM_16')
+        if WAVEFORM_SIDECARS:
+            waveform = WaveformBuilder(sr, audio.shape[1] if audio.ndim > 1 else 1)
+            waveform.process(audio)
+            self._save_waveform(waveform, output_path)
+
+    def _save_waveform(self, waveform: WaveformBuilder, output_path: str) -> None:
+        """Wellenform-Sidecar des fertigen Outputs - ein Fehler hier gefährdet den Output nicht"""
+        try:
+            waveform.finish().save(output_path)
+        except OSError as e:
+            logger.warning(f"⚠️  Wellenform für {output_path} nicht gespeichert: {e}")
+
+    def process_audio(self, audio: np.ndarray, sr: int) -> Tuple[np.ndarray, dict]:
+        """
+        Mastering-Chain auf dekodiertem Audio (Stufe 2: DSP, ohne Datei-I/O)
+
+        Returns:
+            Tuple (gemastertes Audio, Dict mit Messwerten und Verarbeitungsdetails)
+        """
+        if self.segment_workers > 1 and len(audio) >= SEGMENT_MIN_DURATION_SEC * sr:
+            return self.process_audio_segmented(audio, sr)
+        return self.master_prepared(self.prepare_audio(audio, sr))
+
+    def prepare_audio(self, audio: np.ndarray, sr: int) -> PreparedAudio:
+        """
+        Preset-unabhängige Stufen: Resample, Original-Analyse, High-Pass und dessen Messung
+
+        Das Ergebnis kann mit master_prepared mehrerer AudioProcessor-Instanzen
+        (gleiche Sample-Rate, dtype und Analyse-Modus) weiterverarbeitet werden.
+        """
+        # Resample falls nötig
+        if sr != self.sample_rate:
+            logger.info(f"🔄 Resample von {sr}Hz auf {self.sample_rate}Hz")
+            audio = self._resample_audio(audio, sr, self.sample_rate)
+            sr = self.sample_rate
+
+        # VORHER-Analyse
+        original_analysis = self.analyze_audio(audio, "Original")
+        logger.info(f"📊 ORIGINAL - LUFS: {original_analysis['lufs']}dB, Peak: {original_analysis['peak_dbtp']}dBTP, RMS: {original_analysis['rms_db']}dB")
+
+        # 2. High-Pass Filter (Messung liefert auch das Modell für den Normalisierungs-Gain)
+        logger.info("🎛️  Schritt 1: High-Pass Filter (20Hz)")
+        audio = self._apply_high_pass(audio, sr)
+        hp_analysis, hp_model = self._analyze_with_model(audio, "Nach High-Pass")
+        logger.info(f"   → LUFS: {hp_analysis['lufs']}dB (Δ{round(hp_analysis['lufs'] - original_analysis['lufs'], 2)}dB)")
+
+        return PreparedAudio(audio, sr, original_analysis, hp_analysis, hp_model)
+
+    def master_prepared(self, prepared: PreparedAudio) -> Tuple[np.ndarray, dict]:
+        """
+        Preset-spezifische Stufen: LUFS-Normalisierung, Kompression, Limiter
 
-            # 1. Audio laden
-            audio, sr = sf.read(input_path)
-            logger.info(f"📂 Datei geladen: {audio.shape}, {sr}Hz, Dauer: {len(audio)/sr:.1f}s")
+        prepared.audio wird nicht verändert (jede Stufe erzeugt ein neues Array).
+        """
+        audio, sr = prepared.audio, prepared.sample_rate
+        original_analysis = prepared.original_analysis
+        hp_model = prepared.hp_model
+
+        # Zwischenanalysen nur im 'full'/'incremental' Modus
+        measure_steps = self.analysis_mode != 'final-only'
+        hp_analysis = prepared.hp_analysis if measure_steps else None
+
+        # 3. LUFS-Normalisierung (mit intelligentem Anti-Clipping)
+        logger.info(f"📏 Schritt 2: LUFS-Normalisierung auf {self.target_lufs}dB")
+        if hp_model is not None:
+            # Gating-Blöcke der High-Pass-Analyse wiederverwenden (keine weitere Messung)
+            norm_gain_db = float(self._smart_gain_db(hp_model, self.target_lufs))
+        else:
+            norm_gain_db = float(self._compute_lufs_gain_db(audio, self.target_lufs))
+        audio = audio * 10 ** (norm_gain_db / 20)
+        lufs_analysis = None
+        if self.analysis_mode == 'incremental':
+            # Reiner Gain-Schritt: Werte analytisch aus High-Pass-Analyse ableiten
+            lufs_analysis = self._derive_gain_analysis(hp_analysis, norm_gain_db)
+        elif measure_steps:
+            lufs_analysis = self.analyze_audio(audio, "Nach LUFS-Norm")
+        if lufs_analysis:
+            logger.info(f"   → LUFS: {lufs_analysis['lufs']}dB (Δ{round(lufs_analysis['lufs'] - hp_analysis['lufs'], 2)}dB)")
 
-            # Resample falls nötig
-            if sr != self.sample_rate:
-                logger.info(f"🔄 Resample von {sr}Hz auf {self.sample_rate}Hz")
-                audio = self._resample_audio(audio, sr, self.sample_rate)
-                sr = self.sample_rate
+        # 4. Kompression (falls aktiviert - NACH Normalisierung!)
+        if self.use_compression:
+            # Hole Attack/Release aus Preset (mit Defaults)
+            attack = getattr(self, 'comp_attack', 10)
+            release = getattr(self, 'comp_release', 100)
+            logger.info(f"🗜️  Schritt 3: RMS-Kompression ({self.comp_ratio}:1 @ {self.comp_threshold}dB, A={attack}ms R={release}ms)")
+            audio = self._apply_compression(audio, self.comp_ratio, self.comp_threshold, attack, release)
+            comp_analysis = None
+            if measure_steps:
+                comp_analysis = self.analyze_audio(audio, "Nach Kompression")
+                logger.info(f"   → LUFS: {comp_analysis['lufs']}dB (Δ{round(comp_analysis['lufs'] - lufs_analysis['lufs'], 2)}dB)")
+        else:
+            logger.info("🗜️  Schritt 3: Kompression übersprungen (Preset: gentle/suno)")
+            comp_analysis = lufs_analysis
+
+        # 5. Peak Limiter (NACH Kompression für korrekte Reihenfolge!)
+        logger.info(f"🔊 Schritt 4: True Peak Limiter ({self.true_peak_ceiling}dBTP, Release {self.limiter_release}ms)")
+        audio, limiter_gr_db = self._apply_peak_limiter(audio)
+        if limiter_gr_db < 0:
+            logger.info(f"   → Max. Gain Reduction: {limiter_gr_db:.2f}dB")
+        if self.analysis_mode == 'incremental' and limiter_gr_db == 0:
+            # Kein True Peak über der Ceiling: Limiter hat nichts verändert
+            limiter_analysis = comp_analysis
+        else:
+            limiter_analysis = self.analyze_audio(audio, "Nach Limiter")
+        if comp_analysis:
+            logger.info(f"   → Peak: {limiter_analysis['peak_dbtp']}dBTP (Δ{round(limiter_analysis['peak_dbtp'] - comp_analysis['peak_dbtp'], 2)}dB)")
 
-            # VORHER-Analyse
-            original_analysis = self.analyze_audio(audio, "Original")
+        results = self._summarize(audio, sr, original_analysis, hp_analysis, lufs_analysis,
+                                  comp_analysis, limiter_analysis)
+        return audio, results
+
+    def _summarize(self, audio: np.ndarray, sr: int, original_analysis: dict, hp_analysis: Optional[dict],
+                   lufs_analysis: Optional[dict], comp_analysis: Optional[dict], limiter_analysis: dict) -> dict:
+        """Abschluss-Logging und Ergebnis-Dict von process_audio"""
+        measure_steps = self.analysis_mode != 'final-only'
+
+        # Finale Analyse = Analyse nach Limiter (Audio unverändert, keine Doppelmessung)
+        final_analysis = limiter_analysis
+        logger.info(f"✅ VERARBEITUNG ABGESCHLOSSEN")
+        logger.info(f"   Original → Final: LUFS {original_analysis['lufs']}dB → {final_analysis['lufs']}dB")
+        logger.info(f"   Peak: {original_analysis['peak_dbtp']}dBTP → {final_analysis['peak_dbtp']}dBTP")
+        logger.info(f"   Dynamik: {original_analysis['dynamic_range']}dB → {final_analysis['dynamic_range']}dB")
+
+        return {
+            'original': original_analysis,
+            'final': final_analysis,
+            'processing_steps': {
+                'high_pass': hp_analysis,
+                'lufs_norm': lufs_analysis,
+                'compression': comp_analysis if self.use_compression else None,
+                'limiter': limiter_analysis if measure_steps else None
+            },
+            'analysis_mode': self.analysis_mode,
+            'duration_sec': len(audio) / sr,
+            'channels': audio.shape[1] if audio.ndim == 2 else 1,
+            'sample_rate': sr,
+            'preset_used': getattr(self, '_preset_name', 'custom')
+        }
+
+    def process_audio_segmented(self, audio: np.ndarray, sr: int) -> Tuple[np.ndarray, dict]:
+        """
+        process_audio mit segment-paralleler DSP für einzelne lange Dateien
+
+        Die Datei wird in Segmente à SEGMENT_SEC geteilt; High-Pass, Kompressor,
+        Limiter und die Messungen laufen pro Segment in segment_workers Threads.
+        Jedes Segment rechnet mit Einschwingzeit davor (Filter- und Release-Zustände)
+        und Nachlauf danach (Lookahead), geschrieben wird nur der Kern.
+        Lautheit, True Peak und Make-up Gain bleiben Entscheidungen über die ganze
+        Datei: die Segment-Messungen werden exakt zusammengeführt (Gating-Blöcke,
+        Maxima, GR-Summen), erst danach werden Gains festgelegt. Das Ergebnis
+        weicht nur im Rundungsbereich von process_audio ab.
+        """
+        if sr != self.sample_rate:
+            logger.info(f"🔄 Resample von {sr}Hz auf {self.sample_rate}Hz")
+            audio = self._resample_audio(audio, sr, self.sample_rate)
+            sr = self.sample_rate
+
+        segments = self._segment_bounds(len(audio))
+        measure_steps = self.analysis_mode != 'final-only'
+        logger.info(f"🧩 Segment-parallele Verarbeitung: {len(segments)} Segmente à {SEGMENT_SEC:.0f}s, "
+                    f"{self.segment_workers} Threads")
+
+        with ThreadPoolExecutor(max_workers=self.segment_workers) as executor:
+            original_analysis, _ = self._analyze_segmented(executor, audio, segments, "Original")
             logger.info(f"📊 ORIGINAL - LUFS: {original_analysis['lufs']}dB, Peak: {original_analysis['peak_dbtp']}dBTP, RMS: {original_analysis['rms_db']}dB")
 
             # 2. High-Pass Filter
             logger.info("🎛️  Schritt 1: High-Pass Filter (20Hz)")
-            audio = self._apply_high_pass(audio, sr)
-            hp_analysis = self.analyze_audio(audio, "Nach High-Pass")
-            logger.info(f"   → LUFS: {hp_analysis['lufs']}dB (Δ{round(hp_analysis['lufs'] - original_analysis['lufs'], 2)}dB)")
+            sos = highpass_sos(sr)
+            filtered = np.empty_like(audio)
+
+            def high_pass(bounds: Tuple[int, int]) -> None:
+                start, end = bounds
+                first = self._segment_region(start, end, len(audio), tail=False)[0]
+                # Gleicher Nullzustand wie _apply_high_pass am Dateianfang
+                filtered[start:end] = signal.sosfilt(sos, audio[first:end], axis=0)[start - first:]
+
+            list(executor.map(high_pass, segments))
+            hp_analysis, hp_model = self._analyze_segmented(executor, filtered, segments, "Nach High-Pass")
+            if measure_steps:
+                logger.info(f"   → LUFS: {hp_analysis['lufs']}dB (Δ{round(hp_analysis['lufs'] - original_analysis['lufs'], 2)}dB)")
+            else:
+                hp_analysis = None
 
-            # 3. LUFS-Normalisierung (mit intelligentem Anti-Clipping)
+            # 3. LUFS-Normalisierung: Gain aus den zusammengeführten Gating-Blöcken
             logger.info(f"📏 Schritt 2: LUFS-Normalisierung auf {self.target_lufs}dB")
-            audio = self._normalize_lufs_smart(audio, self.target_lufs)
-            lufs_analysis = self.analyze_audio(audio, "Nach LUFS-Norm")
-            logger.info(f"   → LUFS: {lufs_analysis['lufs']}dB (Δ{round(lufs_analysis['lufs'] - hp_analysis['lufs'], 2)}dB)")
-
-            # 4. Kompression (falls aktiviert - NACH Normalisierung!)
+            norm_gain_db = float(self._smart_gain_db(hp_model, self.target_lufs))
+            norm_gain = 10 ** (norm_gain_db / 20)
+            lufs_analysis = None
+            if self.analysis_mode == 'incremental':
+                lufs_analysis = self._derive_gain_analysis(hp_analysis, norm_gain_db)
+            elif measure_steps:
+                lufs_analysis, _ = self._analyze_segmented(executor, filtered, segments, "Nach LUFS-Norm", norm_gain)
+            if lufs_analysis:
+                logger.info(f"   → LUFS: {lufs_analysis['lufs']}dB (Δ{round(lufs_analysis['lufs'] - hp_analysis['lufs'], 2)}dB)")
+
+            # 4. Kompression: GR pro Segment, Make-up Gain aus der Summe über alle Segmente
+            source, source_gain = filtered, norm_gain
             if self.use_compression:
-                # Hole Attack/Release aus Preset (mit Defaults)
                 attack = getattr(self, 'comp_attack', 10)
                 release = getattr(self, 'comp_release', 100)
                 logger.info(f"🗜️  Schritt 3: RMS-Kompression ({self.comp_ratio}:1 @ {self.comp_threshold}dB, A={attack}ms R={release}ms)")
-                audio = self._apply_compression(audio, self.comp_ratio, self.comp_threshold, attack, release)
-                comp_analysis = self.analyze_audio(audio, "Nach Kompression")
-                logger.info(f"   → LUFS: {comp_analysis['lufs']}dB (Δ{round(comp_analysis['lufs'] - lufs_analysis['lufs'], 2)}dB)")
+                compressed = np.empty_like(audio)
+
+                def compress(bounds: Tuple[int, int]) -> Tuple[float, int]:
+                    start, end = bounds
+                    first, last = self._segment_region(start, end, len(audio))
+                    region = filtered[first:last] * norm_gain
+                    core = slice(start - first, end - first)
+                    smoothed_gr = self._compression_gain_db(region, self.comp_ratio, self.comp_threshold,
+                                                            attack, release)[core]
+                    gain_linear = (10 ** (smoothed_gr / 20)).astype(audio.dtype)
+                    if audio.ndim == 2:
+                        gain_linear = gain_linear[:, np.newaxis]
+                    compressed[start:end] = region[core] * gain_linear
+                    significant = smoothed_gr[smoothed_gr < -0.1]
+                    return float(np.sum(significant)), significant.size
+
+                gr_stats = list(executor.map(compress, segments))
+                del filtered
+                gr_count = sum(count for _, count in gr_stats)
+                makeup_db = 0.0
+                if gr_count:
+                    avg_gr = sum(total for total, _ in gr_stats) / gr_count
+                    makeup_db = -avg_gr * 0.7  # 70% der durchschnittlichen GR
+                    logger.debug(f"Kompressor: Avg GR={avg_gr:.1f}dB, Makeup={makeup_db:.1f}dB")
+                source, source_gain = compressed, 10 ** (makeup_db / 20)
+
+                comp_analysis = None
+                if measure_steps:
+                    comp_analysis, _ = self._analyze_segmented(executor, source, segments, "Nach Kompression", source_gain)
+                    logger.info(f"   → LUFS: {comp_analysis['lufs']}dB (Δ{round(comp_analysis['lufs'] - lufs_analysis['lufs'], 2)}dB)")
             else:
                 logger.info("🗜️  Schritt 3: Kompression übersprungen (Preset: gentle/suno)")
                 comp_analysis = lufs_analysis
 
-            # 5. Peak Limiter (NACH Kompression für korrekte Reihenfolge!)
-            logger.info(f"🔊 Schritt 4: Peak Limiter ({self.true_peak_ceiling}dBTP)")
-            audio = self._apply_peak_limiter(audio)
-            limiter_analysis = self.analyze_audio(audio, "Nach Limiter")
-            logger.info(f"   → Peak: {limiter_analysis['peak_dbtp']}dBTP (Δ{round(limiter_analysis['peak_dbtp'] - comp_analysis['peak_dbtp'], 2)}dB)")
+            # 5. Peak Limiter
+            logger.info(f"🔊 Schritt 4: True Peak Limiter ({self.true_peak_ceiling}dBTP, Release {self.limiter_release}ms)")
+            limited = np.empty_like(audio)
+
+            def limit(bounds: Tuple[int, int]) -> float:
+                start, end = bounds
+                first, last = self._segment_region(start, end, len(audio))
+                region, gr_db = self._apply_peak_limiter(source[first:last] * source_gain)
+                limited[start:end] = region[start - first:end - first]
+                return gr_db
+
+            limiter_gr_db = min(executor.map(limit, segments))
+            del source
+            if limiter_gr_db < 0:
+                logger.info(f"   → Max. Gain Reduction: {limiter_gr_db:.2f}dB")
+            if self.analysis_mode == 'incremental' and limiter_gr_db == 0:
+                limiter_analysis = comp_analysis
+            else:
+                limiter_analysis, _ = self._analyze_segmented(executor, limited, segments, "Nach Limiter")
+            if comp_analysis:
+                logger.info(f"   → Peak: {limiter_analysis['peak_dbtp']}dBTP (Δ{round(limiter_analysis['peak_dbtp'] - comp_analysis['peak_dbtp'], 2)}dB)")
+
+        results = self._summarize(limited, sr, original_analysis, hp_analysis, lufs_analysis,
+                                  comp_analysis, limiter_analysis)
+        results['segments'] = len(segments)
+        results['segment_workers'] = self.segment_workers
+        return limited, results
+
+    def _segment_bounds(self, frames: int) -> List[Tuple[int, int]]:
+        """Kernbereiche [start, end) der Segmente (das letzte nimmt den Rest auf)"""
+        length = int(SEGMENT_SEC * self.sample_rate)
+        starts = list(range(0, max(frames - length // 2, 1), length))
+        return [(start, starts[i + 1] if i + 1 < len(starts) else frames) for i, start in enumerate(starts)]
+
+    def _segment_region(self, start: int, end: int, frames: int, tail: bool = True) -> Tuple[int, int]:
+        """Rechenbereich eines Segments: Kern plus Einschwingzeit davor und Nachlauf danach"""
+        time_constant_sec = max(self.limiter_release, self.comp_release if self.use_compression else 0) / 1000
+        warmup_sec = max(SEGMENT_WARMUP_MIN_SEC, SEGMENT_WARMUP_TIME_CONSTANTS * time_constant_sec)
+        first = max(0, start - int(warmup_sec * self.sample_rate))
+        last = min(frames, end + int(SEGMENT_TAIL_SEC * self.sample_rate)) if tail else end
+        return first, last
+
+    def _analyze_segmented(self, executor: ThreadPoolExecutor, audio: np.ndarray,
+                           segments: List[Tuple[int, int]], step_name: str,
+                           gain: float = 1.0) -> Tuple[dict, LoudnessModel]:
+        """
+        analyze_audio über Segmente: Teilmessungen parallel, dann exakt zusammengeführt
+
+        Jedes Segment schwingt K-Weighting und True-Peak-Filter mit den Frames davor
+        ein und misst nur seinen Kern; gain skaliert das Audio vor der Messung.
+        """
+        channels = audio.shape[1] if audio.ndim == 2 else 1
+
+        def measure(bounds: Tuple[int, int]) -> StreamingAnalysis:
+            start, end = bounds
+            first, last = self._segment_region(start, end, len(audio))
+            analysis = StreamingAnalysis(self.sample_rate, channels, start)
+            analysis.warm_up(audio[first:start] * gain)
+            for block_start in range(start, end, STREAM_BLOCK_FRAMES):
+                analysis.process(audio[block_start:min(end, block_start + STREAM_BLOCK_FRAMES)] * gain)
+            if last > end:
+                analysis.peek_ahead(audio[end:last] * gain)
+            return analysis
+
+        parts = list(executor.map(measure, segments))
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        return merged.result(step_name), merged.loudness_model()
+
+    def process_file_streaming(self, input_path: str, output_path: str) -> dict:
+        """
+        Zwei-Pass-Mastering mit begrenztem Speicher (für sehr lange Dateien)
+
+        Pass 1 misst Lautheit und True Peak blockweise (Original und nach High-Pass),
+        bei Presets mit Kompression sammelt ein Messdurchlauf zusätzlich die
+        Gain Reduction für den Make-up Gain. Pass 2 wendet High-Pass (sosfilt mit
+        Zustand), Gain, Kompression und Limiter blockweise an und schreibt
+        inkrementell. Der Speicherbedarf hängt nur von STREAM_BLOCK_FRAMES ab.
+
+        Args:
+            input_path: Pfad zur Input-Datei
+            output_path: Pfad zur Output-Datei
+
+        Returns:
+            Dict mit Messwerten wie process_file
+        """
+        try:
+            logger.info(f"🔍 Starte Streaming-Verarbeitung von {input_path}")
+
+            info = sf.info(input_path)
+            channels = info.channels
+            sr = self.sample_rate
+            logger.info(f"📂 Datei geöffnet: {info.frames} Frames, {channels} Kanäle, {info.samplerate}Hz, "
+                        f"Dauer: {info.duration:.1f}s")
+            if info.samplerate != sr:
+                logger.info(f"🔄 Resample von {info.samplerate}Hz auf {sr}Hz (blockweise)")
+
+            sos = highpass_sos(sr)
+            measure_steps = self.analysis_mode != 'final-only'
+
+            # PASS 1: Messung Original + nach High-Pass
+            logger.info("📊 Pass 1: Lautheit und True Peak blockweise messen")
+            original = StreamingAnalysis(sr, channels)
+            high_pass = StreamingAnalysis(sr, channels)
+            zi = np.zeros((sos.shape[0], 2, channels))
+            for block in self._stream_blocks(input_path, info.samplerate):
+                original.process(block)
+                filtered, zi = signal.sosfilt(sos, block, axis=0, zi=zi)
+                high_pass.process(filtered)
+
+            original_analysis = original.result("Original")
+            hp_analysis = high_pass.result("Nach High-Pass")
+            logger.info(f"📊 ORIGINAL - LUFS: {original_analysis['lufs']}dB, Peak: {original_analysis['peak_dbtp']}dBTP, RMS: {original_analysis['rms_db']}dB")
+            logger.info(f"🎛️  Nach High-Pass (20Hz) → LUFS: {hp_analysis['lufs']}dB")
 
-            # 6. Speichern
-            logger.info(f"💾 Speichere als {output_path}")
-            sf.write(output_path, audio, sr, subtype='PCM_16')
+            # Gain der LUFS-Normalisierung aus den Messwerten ableiten
+            norm_gain_db = float(self._smart_gain_db(high_pass.loudness_model(), self.target_lufs))
+            norm_gain = 10 ** (norm_gain_db / 20)
+            lufs_analysis = self._derive_gain_analysis(hp_analysis, norm_gain_db)
+            logger.info(f"📏 LUFS-Normalisierung: Gain {norm_gain_db:+.2f}dB → LUFS: {lufs_analysis['lufs']}dB")
 
-            # Finale Analyse
-            final_analysis = self.analyze_audio(audio, "Final")
-            logger.info(f"✅ VERARBEITUNG ABGESCHLOSSEN")
+            # Messdurchlauf für Make-up Gain (nur bei Kompression)
+            makeup_db = 0.0
+            if self.use_compression:
+                attack = getattr(self, 'comp_attack', 10)
+                release = getattr(self, 'comp_release', 100)
+                logger.info("🗜️  Pass 1b: Gain Reduction für Make-up Gain messen")
+                compressor = StreamingCompressor(sr, self.comp_ratio, self.comp_threshold, attack, release)
+                zi = np.zeros((sos.shape[0], 2, channels))
+                for block in self._stream_blocks(input_path, info.samplerate):
+                    filtered, zi = signal.sosfilt(sos, block, axis=0, zi=zi)
+                    compressor.process(filtered * norm_gain)
+                compressor.flush()
+                avg_gr = compressor.average_gain_reduction_db
+                if not np.isnan(avg_gr):
+                    makeup_db = -avg_gr * 0.7  # 70% der durchschnittlichen GR
+                    logger.debug(f"Kompressor: Avg GR={avg_gr:.1f}dB, Makeup={makeup_db:.1f}dB")
+
+            # PASS 2: Verarbeitung und inkrementelles Schreiben
+            logger.info(f"💾 Pass 2: Verarbeite und schreibe {output_path}")
+            limiter = StreamingLimiter(sr, self.true_peak_ceiling, channels, release_ms=self.limiter_release)
+            compressor = None
+            comp_stream = None
+            if self.use_compression:
+                compressor = StreamingCompressor(sr, self.comp_ratio, self.comp_threshold,
+                                                 attack, release, makeup_db=makeup_db)
+                if measure_steps:
+                    comp_stream = StreamingAnalysis(sr, channels)
+            final = StreamingAnalysis(sr, channels)
+
+            frames_written = 0
+            waveform = WaveformBuilder(sr, channels) if WAVEFORM_SIDECARS else None
+            zi = np.zeros((sos.shape[0], 2, channels))
+            with atomic_output(output_path) as tmp_path, \
+                    sf.SoundFile(tmp_path, 'w', samplerate=sr, channels=channels, subtype='PCM_16') as out:
+                def write_block(limited):
+                    nonlocal frames_written
+                    final.process(limited)
+                    if waveform is not None:
+                        waveform.process(limited)
+                    out.write(limited)
+                    frames_written += len(limited)
+
+                def finish_block(processed):
+                    if comp_stream is not None:
+                        comp_stream.process(processed)
+                    write_block(limiter.process(processed))
+
+                for block in self._stream_blocks(input_path, info.samplerate):
+                    filtered, zi = signal.sosfilt(sos, block, axis=0, zi=zi)
+                    processed = filtered * norm_gain
+                    if compressor is not None:
+                        processed = compressor.process(processed)
+                    finish_block(processed)
+                if compressor is not None:
+                    finish_block(compressor.flush())
+                write_block(limiter.flush())
+            if waveform is not None:
+                self._save_waveform(waveform, output_path)
+
+            comp_analysis = lufs_analysis
+            if self.use_compression:
+                comp_analysis = comp_stream.result("Nach Kompression") if comp_stream else None
+            final_analysis = final.result("Final")
+
+            logger.info(f"✅ STREAMING-VERARBEITUNG ABGESCHLOSSEN")
             logger.info(f"   Original → Final: LUFS {original_analysis['lufs']}dB → {final_analysis['lufs']}dB")
             logger.info(f"   Peak: {original_analysis['peak_dbtp']}dBTP → {final_analysis['peak_dbtp']}dBTP")
-            logger.info(f"   Dynamik: {original_analysis['dynamic_range']}dB → {final_analysis['dynamic_range']}dB")
 
-            results = {
+            return {
                 'original': original_analysis,
                 'final': final_analysis,
                 'processing_steps': {
-                    'high_pass': hp_analysis,
-                    'lufs_norm': lufs_analysis,
+                    'high_pass': hp_analysis if measure_steps else None,
+                    'lufs_norm': lufs_analysis if measure_steps else None,
                     'compression': comp_analysis if self.use_compression else None,
-                    'limiter': limiter_analysis
+                    'limiter': final_analysis if measure_steps else None
                 },
-                'duration_sec': len(audio) / sr,
-                'channels': audio.shape[1] if audio.ndim == 2 else 1,
+                'analysis_mode': self.analysis_mode,
+                'streaming': True,
+                'duration_sec': frames_written / sr,
+                'channels': channels,
                 'sample_rate': sr,
                 'preset_used': getattr(self, '_preset_name', 'custom')
             }
 
-            return results
-
         except Exception as e:
-            logger.error(f"❌ Fehler bei Verarbeitung von {input_path}: {str(e)}")
+            logger.error(f"❌ Fehler bei Streaming-Verarbeitung von {input_path}: {str(e)}")
             raise
 
-    def _process_channels(self, audio: np.ndarray, func, *args, **kwargs) -> np.ndarray:
-        """
-        Helper-Funktion: Wendet Funktion auf Mono/Stereo-Audio an
-
-        Eliminiert Code-Duplikation bei Stereo-Processing
-        """
-        if audio.ndim == 1:
-            return func(audio, *args, **kwargs)
-        else:
-            return np.column_stack([
-                func(audio[:, 0], *args, **kwargs),
-                func(audio[:, 1], *args, **kwargs)
-            ])
+    def _stream_blocks(self, input_path: str, file_sr: int):
+        """Liest die Datei blockweise (2D, im Verarbeitungs-dtype) und resampelt bei Bedarf"""
+        resampler = StreamResampler(file_sr, self.sample_rate) if file_sr != self.sample_rate else None
+        previous = None
+        for block in sf.blocks(input_path, blocksize=STREAM_BLOCK_FRAMES, dtype=self.dtype, always_2d=True):
+            if previous is not None:
+                yield resampler.process(previous) if resampler else previous
+            previous = block
+        if previous is not None:
+            yield resampler.process(previous, final=True) if resampler else previous
 
     def _resample_audio(self, audio: np.ndarray, from_sr: int, to_sr: int) -> np.ndarray:
         """
@@ -271,25 +904,29 @@ class AudioProcessor:
 
         logger.debug(f"Resampling: {from_sr}Hz → {to_sr}Hz (up={up}, down={down})")
 
-        # resample_poly verwendet Polyphase-Filter (viel schneller als FFT)
-        if audio.ndim == 1:
-            return resample_poly(audio, up, down)
-        else:
-            return np.column_stack([
-                resample_poly(audio[:, 0], up, down),
-                resample_poly(audio[:, 1], up, down)
-            ])
+        # resample_poly verwendet Polyphase-Filter (viel schneller als FFT),
+        # das Anti-Aliasing-FIR kommt aus dem Filter-Cache statt pro Datei neu.
+        # Das Ergebnis ist float64 - zurück in den Verarbeitungs-dtype, sonst
+        # liefe die restliche Kette bei float32 mit doppeltem Speicher
+        resampled = resample_poly(audio, up, down, axis=0, window=resample_filter(up, down))
+        return resampled.astype(audio.dtype, copy=False)
 
     def _apply_high_pass(self, audio: np.ndarray, sr: int) -> np.ndarray:
         """
         High-Pass Filter bei 20 Hz
 
-        Verwendet helper für sauberes Stereo-Handling
+        Filtert alle Kanäle gemeinsam (axis=0) blockweise mit übertragenem Zustand:
+        Koeffizienten und Zustand bleiben float64 (Pole nahe am Einheitskreis),
+        das Ergebnis behält den dtype des Audios ohne float64-Kopie des ganzen Tracks.
         """
-        sos = signal.butter(4, 20, 'hp', fs=sr, output='sos')
+        sos = highpass_sos(sr)
 
-        # Nutze Helper-Funktion statt Code-Duplikation
-        return self._process_channels(audio, lambda ch: signal.sosfilt(sos, ch))
+        filtered = np.empty_like(audio)
+        zi = np.zeros((sos.shape[0], 2) + audio.shape[1:])
+        for start in range(0, len(audio), STREAM_BLOCK_FRAMES):
+            end = start + STREAM_BLOCK_FRAMES
+            filtered[start:end], zi = signal.sosfilt(sos, audio[start:end], axis=0, zi=zi)
+        return filtered
 
     def _apply_compression(self, audio: np.ndarray, ratio: float = 3.0,
                           threshold_db: float = -20.0,
@@ -304,51 +941,14 @@ class AudioProcessor:
         - Attack/Release Envelope für sanfte Übergänge
         - Soft Knee für natürlicheren Sound
         - Make-up Gain für konstante Lautheit
+        - Channel-Linked: ein gemeinsamer Detektor für alle Kanäle (frames, channels)
         """
-        # 1. RMS-Envelope berechnen (10ms Fenster)
-        window_size = int(0.01 * self.sample_rate)
-        rms_squared = np.convolve(audio**2, np.ones(window_size)/window_size, mode='same')
-        rms_envelope = np.sqrt(np.maximum(rms_squared, 1e-10))
-        rms_db = 20 * np.log10(rms_envelope)
-
-        # 2. Gain Reduction berechnen (mit Soft Knee)
-        gain_reduction_db = np.zeros_like(rms_db)
-
-        # Soft Knee Bereich: [threshold - knee/2, threshold + knee/2]
-        knee_start = threshold_db - knee_db/2
-        knee_end = threshold_db + knee_db/2
-
-        # Unterhalb Knee: keine Kompression
-        below_knee = rms_db < knee_start
-        gain_reduction_db[below_knee] = 0
-
-        # Im Knee-Bereich: sanfter Übergang
-        in_knee = (rms_db >= knee_start) & (rms_db <= knee_end)
-        if np.any(in_knee):
-            x = rms_db[in_knee] - knee_start
-            gain_reduction_db[in_knee] = (x ** 2) / (2 * knee_db) * (1 - 1/ratio)
-
-        # Oberhalb Knee: volle Kompression
-        above_knee = rms_db > knee_end
-        gain_reduction_db[above_knee] = (threshold_db - rms_db[above_knee]) * (1 - 1/ratio)
-
-        # 3. Attack/Release Envelope Filter
-        attack_coeff = np.exp(-1 / (attack_ms * self.sample_rate / 1000))
-        release_coeff = np.exp(-1 / (release_ms * self.sample_rate / 1000))
-
-        smoothed_gr = np.zeros_like(gain_reduction_db)
-        smoothed_gr[0] = gain_reduction_db[0]
-
-        for i in range(1, len(gain_reduction_db)):
-            if gain_reduction_db[i] < smoothed_gr[i-1]:
-                # Attack (Gain Reduction erhöht sich = Attack)
-                smoothed_gr[i] = attack_coeff * smoothed_gr[i-1] + (1 - attack_coeff) * gain_reduction_db[i]
-            else:
-                # Release (Gain Reduction verringert sich = Release)
-                smoothed_gr[i] = release_coeff * smoothed_gr[i-1] + (1 - release_coeff) * gain_reduction_db[i]
+        smoothed_gr = self._compression_gain_db(audio, ratio, threshold_db, attack_ms, release_ms, knee_db)
 
         # 4. Gain Reduction anwenden
-        gain_linear = 10 ** (smoothed_gr / 20)
+        gain_linear = (10 ** (smoothed_gr / 20)).astype(audio.dtype)
+        if audio.ndim == 2:
+            gain_linear = gain_linear[:, np.newaxis]  # Gleicher Gain für alle Kanäle
         compressed = audio * gain_linear
 
         # 5. Make-up Gain (kompensiere durchschnittliche Gain Reduction)
@@ -360,61 +960,101 @@ class AudioProcessor:
 
         return compressed
 
+    def _compression_gain_db(self, audio: np.ndarray, ratio: float, threshold_db: float,
+                             attack_ms: float, release_ms: float, knee_db: float = 6.0) -> np.ndarray:
+        """Geglättete Gain Reduction (dB) pro Frame, ohne Make-up Gain"""
+        # 1. RMS-Envelope berechnen (10ms Fenster, laufende Summe statt Faltung)
+        window_size = int(0.01 * self.sample_rate)
+        rms_squared = sliding_mean_square(audio, window_size)
+        rms_envelope = np.sqrt(np.maximum(rms_squared, 1e-10))
+        rms_db = 20 * np.log10(rms_envelope)
+
+        # 2. Gain Reduction berechnen (mit Soft Knee)
+        gain_reduction_db = compute_gain_reduction(rms_db, ratio, threshold_db, knee_db)
+
+        # 3. Attack/Release Envelope Filter
+        attack_coeff = np.exp(-1 / (attack_ms * self.sample_rate / 1000))
+        release_coeff = np.exp(-1 / (release_ms * self.sample_rate / 1000))
+
+        # Attack wenn Gain Reduction zunimmt, Release wenn sie abnimmt
+        # (blockrekursiv vektorisiert statt Python-Schleife pro Sample)
+        return smooth_gain_reduction(gain_reduction_db, attack_coeff, release_coeff)
+
     def _normalize_lufs(self, audio: np.ndarray) -> np.ndarray:
         """Normalisiere auf Ziel-LUFS"""
         try:
             loudness = self.meter.integrated_loudness(audio)
-            return pyln.normalize.loudness(audio, loudness, self.target_lufs)
+            return audio * 10 ** ((self.target_lufs - loudness) / 20)
         except Exception as e:
             logger.warning(f"LUFS-Normalisierung fehlgeschlagen: {e}, verwende Original")
             return audio
 
-    def _normalize_lufs_smart(self, audio: np.ndarray, target_lufs: float) -> np.ndarray:
-        """Intelligente LUFS-Normalisierung mit Soft-Limiting"""
-        try:
-            # Original-Lautstärke messen
-            original_loudness = self.meter.integrated_loudness(audio)
-
-            # Berechne benötigte Verstärkung
-            gain_db = target_lufs - original_loudness
-
-            # Test-Normalisierung
-            test_audio = audio * 10 ** (gain_db / 20)
-
-            # Prüfe True Peak nach Normalisierung
-            test_peak = self._measure_true_peak(test_audio)
+    def _compute_lufs_gain_db(self, audio: np.ndarray, target_lufs: float) -> float:
+        """
+        Berechnet den Gesamt-Gain der intelligenten LUFS-Normalisierung
 
-            if test_peak > self.true_peak_ceiling:
-                # Zu viel Gain - verwende Soft-Limiting Strategie
-                # Berechne maximal möglichen Gain ohne Clipping
-                max_safe_gain_db = gain_db - (test_peak - self.true_peak_ceiling) - 0.5  # 0.5dB Headroom
-                max_safe_gain_linear = 10 ** (max_safe_gain_db / 20)
+        Die Normalisierung ist ein reiner Gain-Schritt - der Gain wird zurückgegeben,
+        damit process_file die Analyse danach analytisch ableiten kann.
+        Gemessen wird einmal (Gating-Blöcke + True Peak), alle Test-Gains
+        werden am LoudnessModel ausgewertet statt an verstärkten Kopien.
+        """
+        try:
+            model = LoudnessModel.measure(audio, self.sample_rate)
+            return self._smart_gain_db(model, target_lufs)
 
-                logger.info(f"🛡️  Smart Limiting: Peak {test_peak:.1f}dBTP > {self.true_peak_ceiling}dBTP, Gain auf {max_safe_gain_db:.1f}dB begrenzt")
-                audio = audio * max_safe_gain_linear
+        except Exception as e:
+            logger.warning(f"Intelligente LUFS-Normalisierung fehlgeschlagen: {e}, verwende Original")
+            return 0.0
 
-                # Nach-Normalisierung falls noch nicht nah genug am Ziel
-                current_loudness = self.meter.integrated_loudness(audio)
-                if abs(current_loudness - target_lufs) > 1.0:  # Mehr als 1dB Abweichung
-                    remaining_gain_db = target_lufs - current_loudness
-                    # Begrenze Nach-Normalisierung auf 2dB
-                    remaining_gain_db = max(-2.0, min(2.0, remaining_gain_db))
-                    audio = audio * 10 ** (remaining_gain_db / 20)
-                    logger.info(f"🔄 Nach-Normalisierung: +{remaining_gain_db:.1f}dB für genauere Zielerreichung")
+    def _smart_gain_db(self, model: LoudnessModel, target_lufs: float) -> float:
+        """
+        Gain der intelligenten LUFS-Normalisierung aus dem Lautheitsmodell
 
-                return audio
-            else:
-                # Normalisierung sicher möglich
-                return pyln.normalize.loudness(audio, original_loudness, target_lufs)
+        Lautheit und True Peak nach jedem Test-Gain kommen aus den gespeicherten
+        Gating-Block-Energien (O(Blöcke)), daher ist keine Messung am
+        verstärkten Signal nötig.
+        """
+        # Original-Lautstärke
+        original_loudness = model.loudness_after_gain(0.0)
+        if not np.isfinite(original_loudness):
+            logger.warning("LUFS-Normalisierung nicht möglich (Stille), verwende Original")
+            return 0.0
+
+        # Benötigte Verstärkung und True Peak danach
+        gain_db = target_lufs - original_loudness
+        test_peak = model.peak_after_gain(gain_db)
+
+        peak_limit = self.true_peak_ceiling + LIMITER_MAX_GAIN_REDUCTION_DB
+        if test_peak > peak_limit:
+            # Zu viel Gain selbst für den Limiter - verwende Soft-Limiting Strategie
+            # Berechne maximal möglichen Gain innerhalb der Limiter-Reserve
+            max_safe_gain_db = gain_db - (test_peak - peak_limit)
+            logger.info(f"🛡️  Smart Limiting: Peak {test_peak:.1f}dBTP > {peak_limit:.1f}dBTP, Gain auf {max_safe_gain_db:.1f}dB begrenzt")
+
+            # Nach-Normalisierung falls noch nicht nah genug am Ziel
+            current_loudness = model.loudness_after_gain(max_safe_gain_db)
+            if abs(current_loudness - target_lufs) > 1.0:  # Mehr als 1dB Abweichung
+                # Begrenze Nach-Normalisierung auf 2dB
+                remaining_gain_db = max(-2.0, min(2.0, target_lufs - current_loudness))
+                logger.info(f"🔄 Nach-Normalisierung: +{remaining_gain_db:.1f}dB für genauere Zielerreichung")
+                return max_safe_gain_db + remaining_gain_db
+            return max_safe_gain_db
+
+        # Normalisierung möglich, Peaks über der Ceiling übernimmt der Limiter
+        return gain_db
+
+    def _apply_peak_limiter(self, audio: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Lookahead True Peak Limiter
 
-        except Exception as e:
-            logger.warning(f"Intelligente LUFS-Normalisierung fehlgeschlagen: {e}, verwende Original")
-            return audio
+        Ersetzt das harte Clipping: Der Gain fällt vor jedem Inter-Sample-Peak
+        über das Lookahead ab und erholt sich mit der Preset-Release.
 
-    def _apply_peak_limiter(self, audio: np.ndarray) -> np.ndarray:
-        """Peak Limiter für True Peak"""
-        ceiling_linear = 10 ** (self.true_peak_ceiling / 20)
-        return np.clip(audio, -ceiling_linear, ceiling_linear)
+        Returns:
+            Tuple (limitiertes Audio, maximale Gain Reduction in dB; 0 = inaktiv)
+        """
+        return limit_true_peak(audio, self.sample_rate, self.true_peak_ceiling,
+                               release_ms=self.limiter_release)
 
     def _measure_true_peak(self, audio: np.ndarray) -> float:
         """
@@ -422,23 +1062,11 @@ class AudioProcessor:
 
         Performance: 4x Oversampling zur Erkennung von Inter-Sample Peaks
         Korrekt: Erkennt Peaks zwischen Samples die Digital-Analog-Wandler clippen würden
+        Speicher: Blockweise Polyphase-Messung statt oversampelter Kopie des ganzen Tracks
         """
         try:
-            # 4x Oversampling für inter-sample peak detection
-            if audio.ndim == 1:
-                oversampled = resample_poly(audio, 4, 1)
-            else:
-                oversampled = np.column_stack([
-                    resample_poly(audio[:, 0], 4, 1),
-                    resample_poly(audio[:, 1], 4, 1)
-                ])
-
-            peak_linear = np.max(np.abs(oversampled))
-
-            if peak_linear == 0:
-                return -float('inf')
-
-            peak_dbtp = 20 * np.log10(peak_linear)
+            # 4x Oversampling für inter-sample peak detection (konstanter Speicher)
+            peak_dbtp = measure_true_peak(audio)
             logger.debug(f"True Peak (4x oversampled): {peak_dbtp:.2f} dBTP")
 
             return peak_dbtp
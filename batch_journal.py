@@ -0,0 +1,138 @@
+"""
+Append-only Journal für Batch-Läufe im Output-Ordner (JSON Lines)
+
+Jede Zeile ist ein Ereignis: batch_start, batch_resume, job_start, job_done
+(mit allen Messwerten), job_failed und batch_end. Zeilen werden sofort auf die
+Platte geschrieben (flush + fsync); nach einem Absturz (OOM, Neustart) lässt
+sich ein Batch mit --resume genau dort fortsetzen, wo er stehen blieb, und der
+vollständige Report wird aus dem Journal wiederhergestellt.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from config import JOURNAL_FILENAME
+
+logger = logging.getLogger(__name__)
+
+
+def json_default(value):
+    """NumPy-Skalare (z.B. np.float32) als Python-Zahlen speichern"""
+    if hasattr(value, 'item'):
+        return value.item()
+    raise TypeError(f"Nicht serialisierbar: {type(value).__name__}")
+
+
+class BatchState:
+    """Aus dem Journal rekonstruierter Zustand eines Batches"""
+
+    def __init__(self, batch_id: str, settings: dict, jobs: Dict[Path, Dict[str, Path]], outputs_skipped: int):
+        self.batch_id = batch_id
+        self.settings = settings
+        self.jobs = jobs                  # Input-Datei → Outputs {Preset: Pfad} laut batch_start
+        self.outputs_skipped = outputs_skipped
+        self.results: List[Dict[str, Any]] = []
+        self.errors: List[Dict[str, str]] = []
+        self.finished = set()             # Input-Dateien mit job_done oder job_failed
+        self.active_sec = 0.0             # Laufzeit aller bisherigen Läufe
+        self.ended = False
+
+    def remaining(self) -> Dict[Path, Dict[str, Path]]:
+        """Jobs ohne Abschluss (nie gestartet oder während eines Absturzes gelaufen)"""
+        return {input_file: outputs for input_file, outputs in self.jobs.items()
+                if input_file not in self.finished}
+
+
+class BatchJournal:
+    """Schreibt und liest das Journal eines Output-Ordners"""
+
+    def __init__(self, output_dir: Path):
+        self.path = Path(output_dir) / JOURNAL_FILENAME
+        self.batch_id: Optional[str] = None
+        self._lock = threading.Lock()  # Pipeline: Reader- und Writer-Thread schreiben
+
+    def _append(self, event: str, **fields) -> None:
+        record = {'event': event, 'batch_id': self.batch_id, 'time': time.time(), **fields}
+        line = json.dumps(record, default=json_default, ensure_ascii=False)
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def start_batch(self, settings: dict, jobs: Dict[Path, Dict[str, Path]], outputs_skipped: int) -> None:
+        """Beginnt einen neuen Batch und hält alle geplanten Jobs fest"""
+        self.batch_id = uuid.uuid4().hex[:12]
+        self._append('batch_start', settings=settings, outputs_skipped=outputs_skipped,
+                     jobs={str(f): {preset: str(path) for preset, path in outputs.items()}
+                           for f, outputs in jobs.items()})
+
+    def resume_batch(self, state: BatchState) -> None:
+        """Setzt einen unterbrochenen Batch fort (weitere Ereignisse unter dessen ID)"""
+        self.batch_id = state.batch_id
+        self._append('batch_resume', remaining=len(state.remaining()))
+
+    def job_started(self, input_file: Path) -> None:
+        self._append('job_start', file=str(input_file))
+
+    def job_done(self, input_file: Path, results: List[Dict[str, Any]]) -> None:
+        self._append('job_done', file=str(input_file), results=results)
+
+    def job_failed(self, input_file: Path, error: str) -> None:
+        self._append('job_failed', file=str(input_file), error=error)
+
+    def end_batch(self, summary: Dict[str, Any]) -> None:
+        """Schließt den Batch ab (Zusammenfassung ohne die Einzel-Ergebnisse)"""
+        self._append('batch_end', summary={key: value for key, value in summary.items()
+                                           if key not in ('results', 'errors')})
+
+    def load_last_batch(self) -> Optional[BatchState]:
+        """
+        Rekonstruiert den zuletzt gestarteten Batch aus dem Journal
+
+        Eine beim Absturz abgeschnittene letzte Zeile wird ignoriert.
+        """
+        if not self.path.exists():
+            return None
+
+        state = None
+        segment_start = last_time = None
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"⚠️  Journal-Zeile {line_number} unvollständig, wird ignoriert")
+                    continue
+
+                event = record['event']
+                if event == 'batch_start':
+                    jobs = {Path(f): {preset: Path(path) for preset, path in outputs.items()}
+                            for f, outputs in record['jobs'].items()}
+                    state = BatchState(record['batch_id'], record['settings'], jobs, record['outputs_skipped'])
+                    segment_start = last_time = record['time']
+                    continue
+                if state is None or record['batch_id'] != state.batch_id:
+                    continue
+
+                if event == 'batch_resume':
+                    state.active_sec += last_time - segment_start
+                    segment_start = record['time']
+                elif event == 'job_done':
+                    state.results.extend(record['results'])
+                    state.finished.add(Path(record['file']))
+                elif event == 'job_failed':
+                    state.errors.append({'file': record['file'], 'error': record['error']})
+                    state.finished.add(Path(record['file']))
+                elif event == 'batch_end':
+                    state.ended = True
+                last_time = record['time']
+
+        if state is not None:
+            state.active_sec += last_time - segment_start
+        return state
@@ -0,0 +1,108 @@
+"""
+Inkrementelles Batch-Manifest im Output-Ordner
+
+Hält pro Output-Datei fest, aus welchem Input (Inhalts-Hash, Größe, mtime),
+mit welchen Einstellungen und mit welcher Tool-Version sie erzeugt wurde.
+Reruns verarbeiten nur Dateien, deren Input oder Einstellungen sich geändert haben.
+"""
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import VERSION, MANIFEST_FILENAME
+
+logger = logging.getLogger(__name__)
+
+# Lesegröße für das Hashen der Input-Dateien
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 des Dateiinhalts (blockweise gelesen)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BatchManifest:
+    """
+    Persistentes Manifest (JSON) der erzeugten Output-Dateien
+
+    Prüfung pro Datei: zuerst Einstellungen, Version und Größe/mtime des Inputs;
+    nur wenn sich Größe oder mtime geändert haben, wird der Inhalt gehasht.
+    Ein gleicher Hash (z.B. nach touch oder Kopie) gilt als unverändert.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.path = Path(output_dir) / MANIFEST_FILENAME
+        self.entries: Dict[str, dict] = {}
+        # In diesem Prozess berechnete Hashes, gültig für (Pfad, Größe, mtime) -
+        # langlebige Prozesse (Watch-Modus) hashen geänderte Dateien neu
+        self._digests: Dict[tuple, str] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get('entries', {})
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️  Manifest {self.path} nicht lesbar ({e}), starte neu")
+
+    def _digest(self, input_file: Path) -> str:
+        stat = input_file.stat()
+        key = (str(input_file), stat.st_size, stat.st_mtime_ns)
+        if key not in self._digests:
+            self._digests[key] = file_digest(input_file)
+        return self._digests[key]
+
+    def check(self, input_file: Path, output_path: Path, settings: dict) -> Optional[str]:
+        """
+        Prüft, ob eine Datei (neu) verarbeitet werden muss
+
+        Returns:
+            Grund für die Verarbeitung oder None, wenn der Output aktuell ist
+        """
+        entry = self.entries.get(output_path.name)
+        if entry is None:
+            return "neu"
+        if not output_path.exists():
+            return "Output fehlt"
+        if entry.get('version') != VERSION:
+            return f"Version {entry.get('version')} → {VERSION}"
+        if entry.get('settings') != settings:
+            return "Einstellungen geändert"
+
+        stat = input_file.stat()
+        if entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return None
+
+        # Größe/mtime geändert - erst der Inhalts-Hash entscheidet
+        if entry.get('sha256') != self._digest(input_file):
+            return "Input geändert"
+        entry['size'] = stat.st_size
+        entry['mtime_ns'] = stat.st_mtime_ns
+        return None
+
+    def record(self, input_file: Path, output_path: Path, settings: dict) -> None:
+        """Trägt einen erfolgreich erzeugten Output ein"""
+        stat = input_file.stat()
+        self.entries[output_path.name] = {
+            'input': str(input_file),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': self._digest(input_file),
+            'settings': settings,
+            'version': VERSION
+        }
+
+    def save(self) -> None:
+        """Schreibt das Manifest atomar (temporäre Datei + os.replace)"""
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': VERSION, 'entries': self.entries}, f, indent=2)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,163 @@
+"""
+Pipeline-Executor für Batch-Jobs: Dekodieren → DSP → Kodieren
+
+Die Stufen laufen in eigenen Threads und sind über begrenzte Queues verbunden.
+Während ein Job verarbeitet wird, liest der Reader bereits den nächsten und
+der Writer schreibt den vorherigen - Festplatten- und Codec-Zeit verschwinden
+hinter der Rechenzeit. Volle Queues bremsen die vorgelagerte Stufe
+(Backpressure), der Speicherbedarf bleibt bei queue_size Jobs pro Queue.
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Maximal wartende Jobs zwischen zwei Stufen (dekodierte bzw. gemasterte Tracks)
+PIPELINE_QUEUE_SIZE = 2
+
+# Markiert das Ende des Job-Stroms in einer Queue
+_END = object()
+
+
+class StageStats:
+    """Laufzeit-Statistik einer Pipeline-Stufe (thread-sicher)"""
+
+    def __init__(self, name: str, workers: int = 1):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_sec = 0.0      # Zeit in der Stufenfunktion
+        self.blocked_sec = 0.0   # Wartezeit auf Platz in der nachfolgenden Queue
+        self._lock = threading.Lock()
+
+    def add(self, busy_sec: float, blocked_sec: float = 0.0) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy_sec += busy_sec
+            self.blocked_sec += blocked_sec
+
+    def summary(self, wall_sec: float) -> Dict[str, Any]:
+        """Kennzahlen mit Auslastung = Arbeitszeit / (Laufzeit × Worker)"""
+        capacity = wall_sec * self.workers
+        return {
+            'workers': self.workers,
+            'items': self.items,
+            'busy_sec': round(self.busy_sec, 2),
+            'blocked_sec': round(self.blocked_sec, 2),
+            'utilization': round(self.busy_sec / capacity, 3) if capacity > 0 else 0.0
+        }
+
+
+class PipelineExecutor:
+    """
+    Dreistufige Pipeline mit Prefetching-Reader, DSP-Workern und Writer
+
+    Args:
+        load: job → Payload (Dekodieren, I/O)
+        process: Payload → Payload (DSP, läuft in dsp_workers Threads)
+        write: (job, Payload) → Ergebnis (Kodieren, I/O)
+        dsp_workers: Anzahl paralleler DSP-Threads
+        queue_size: Kapazität der Queues zwischen den Stufen
+    """
+
+    def __init__(self, load: Callable[[Any], Any], process: Callable[[Any], Any],
+                 write: Callable[[Any, Any], Any], dsp_workers: int = 1,
+                 queue_size: int = PIPELINE_QUEUE_SIZE):
+        self.load = load
+        self.process = process
+        self.write = write
+        self.dsp_workers = max(1, dsp_workers)
+        self.queue_size = queue_size
+
+    def _put(self, target: queue.Queue, item) -> float:
+        """Legt ein Element in die Queue, gibt die Wartezeit (Backpressure) zurück"""
+        start = time.time()
+        target.put(item)
+        return time.time() - start
+
+    def _read(self, jobs: Iterable, decoded: queue.Queue, stats: StageStats) -> None:
+        try:
+            for job in jobs:
+                start = time.time()
+                try:
+                    item = (job, self.load(job), None)
+                except Exception as e:
+                    item = (job, None, e)
+                busy = time.time() - start
+                stats.add(busy, self._put(decoded, item))
+        finally:
+            for _ in range(self.dsp_workers):
+                decoded.put(_END)
+
+    def _work(self, decoded: queue.Queue, processed: queue.Queue, stats: StageStats) -> None:
+        try:
+            while True:
+                item = decoded.get()
+                if item is _END:
+                    break
+                job, payload, error = item
+                start = time.time()
+                if error is None:
+                    try:
+                        payload = self.process(payload)
+                    except Exception as e:
+                        payload, error = None, e
+                busy = time.time() - start
+                stats.add(busy, self._put(processed, (job, payload, error)))
+        finally:
+            processed.put(_END)
+
+    def run(self, jobs: Iterable, on_done: Callable[[Any, Optional[Any], Optional[Exception]], None]) -> Dict[str, Dict[str, Any]]:
+        """
+        Führt alle Jobs aus; on_done(job, ergebnis, fehler) läuft im aufrufenden Thread
+
+        Returns:
+            Statistik pro Stufe ('decode', 'dsp', 'encode')
+        """
+        decoded = queue.Queue(maxsize=self.queue_size)
+        processed = queue.Queue(maxsize=self.queue_size)
+        stats = {
+            'decode': StageStats('decode'),
+            'dsp': StageStats('dsp', self.dsp_workers),
+            'encode': StageStats('encode'),
+        }
+
+        start_time = time.time()
+        threads = [threading.Thread(target=self._read, args=(jobs, decoded, stats['decode']), daemon=True)]
+        threads += [threading.Thread(target=self._work, args=(decoded, processed, stats['dsp']), daemon=True)
+                    for _ in range(self.dsp_workers)]
+        for thread in threads:
+            thread.start()
+
+        # Writer-Stufe im aufrufenden Thread: on_done braucht keine Synchronisation
+        finished_workers = 0
+        while finished_workers < self.dsp_workers:
+            item = processed.get()
+            if item is _END:
+                finished_workers += 1
+                continue
+
+            job, payload, error = item
+            start = time.time()
+            result = None
+            if error is None:
+                try:
+                    result = self.write(job, payload)
+                except Exception as e:
+                    error = e
+            stats['encode'].add(time.time() - start)
+
+            try:
+                on_done(job, result, error)
+            except Exception as e:
+                logger.error(f"❌ Ergebnis-Verarbeitung fehlgeschlagen für {job}: {e}")
+
+        for thread in threads:
+            thread.join()
+
+        wall_sec = time.time() - start_time
+        return {name: stage.summary(wall_sec) for name, stage in stats.items()}
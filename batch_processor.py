@@ -3,16 +3,241 @@ Batch-Verarbeitung für mehrere Audio-Dateien
 """
 
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Tuple
 import logging
+import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-from config import INPUT_DIR, OUTPUT_DIR, LOGS_DIR, SUPPORTED_EXTENSIONS, MASTERED_SUFFIX
-from audio_processor import AudioProcessor
+import uuid
+import multiprocessing
+import sqlite3
+import soundfile as sf
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+
+from config import (INPUT_DIR, OUTPUT_DIR, LOGS_DIR, SUPPORTED_EXTENSIONS, MASTERED_SUFFIX,
+                    WATCH_POLL_INTERVAL_SEC, WATCH_SETTLE_SEC, QUEUE_HEARTBEAT_SEC, QUEUE_POLL_INTERVAL_SEC)
+from audio_processor import AudioProcessor, MASTERING_PRESETS, PARTIAL_MARKER
+from audio_analyzer import AudioAnalyzer
+from analysis_index import AnalysisIndex
+from batch_manifest import BatchManifest
+from batch_pipeline import PipelineExecutor
+from batch_journal import BatchJournal
+from folder_watch import scan_directory, SettledFileTracker
+from job_queue import JobQueue, QueuedJob, default_worker_id
+from memory_budget import MemoryBudget, format_mb
+from dsp import filter_cache
 
 logger = logging.getLogger(__name__)
 
+# Ausführungs-Backends für parallele Verarbeitung:
+# - 'thread': Threads teilen sich einen AudioProcessor (wenig Overhead, GIL-begrenzt)
+# - 'process': ein langlebiger AudioProcessor pro Worker-Prozess (skaliert mit CPU-Kernen)
+# - 'pipeline': Dekodieren, DSP (max_workers Threads) und Kodieren überlappend in eigenen Stufen
+BACKENDS = ('thread', 'process', 'pipeline')
+
+# Dauer-Schätzung aus der Dateigröße, falls sf.info den Header nicht lesen kann (128 kbit/s)
+FALLBACK_BYTES_PER_SEC = 16000
+
+# AudioProcessor-Instanzen des aktuellen Worker-Prozesses pro Preset (gesetzt von _init_process_worker)
+_worker_processors = {}
+
+
+def _master_job(processors: Dict[str, AudioProcessor], input_file: Path, outputs: Dict[str, Path],
+                streaming: bool) -> List[Dict[str, any]]:
+    """
+    Erzeugt alle veralteten Outputs einer Input-Datei (ein Ergebnis-Dict pro Preset)
+
+    Mehrere Presets teilen sich Dekodieren, Resample und High-Pass (Fan-out);
+    erst ab der LUFS-Normalisierung wird pro Preset gerechnet.
+    """
+    if len(outputs) == 1:
+        (preset, output_path), = outputs.items()
+        return [_master_file(processors[preset], input_file, output_path, streaming)]
+
+    start_time = time.time()
+    shared = processors[next(iter(outputs))]
+    audio, sr = shared.load_audio(str(input_file))
+    prepared = shared.prepare_audio(audio, sr)
+    del audio
+
+    results = []
+    for preset, output_path in outputs.items():
+        logger.info(f"🔀 Preset '{preset}' → {output_path.name}")
+        processor = processors[preset]
+        mastered, result = processor.master_prepared(prepared)
+        processor.write_audio(str(output_path), mastered, result['sample_rate'])
+        result.update(_file_metadata(input_file, output_path, start_time))
+        results.append(result)
+    _share_job_time(results, start_time)
+    return results
+
+
+def _share_job_time(results: List[Dict[str, any]], start_time: float) -> None:
+    """Verteilt die Dauer eines Fan-out-Jobs gleichmäßig auf seine Outputs (Summe = Jobdauer)"""
+    share = round((time.time() - start_time) / len(results), 2)
+    for result in results:
+        result['processing_time_sec'] = share
+
+
+def _master_file(processor: AudioProcessor, input_file: Path, output_path: Path,
+                 streaming: bool) -> Dict[str, any]:
+    """Mastert eine Datei und ergänzt die Datei-Metadaten (Ergebnis ohne Audio-Arrays)"""
+    start_time = time.time()
+    if streaming:
+        result = processor.process_file_streaming(str(input_file), str(output_path))
+    else:
+        result = processor.process_file(str(input_file), str(output_path))
+
+    # Zusätzliche Metadaten
+    result.update(_file_metadata(input_file, output_path, start_time))
+    return result
+
+
+def _count_inputs(results: List[Dict[str, any]]) -> int:
+    """Anzahl Input-Dateien hinter den Ergebnis-Dicts (bei Fan-out ein Dict pro Preset-Output)"""
+    return len({result['input_file'] for result in results})
+
+
+def _file_metadata(input_file: Path, output_path: Path, start_time: float) -> Dict[str, any]:
+    """Datei-Metadaten eines fertigen Jobs (Pfade, Größen, Verarbeitungszeit)"""
+    return {
+        'input_file': str(input_file),
+        'output_file': str(output_path),
+        'original_size_mb': round(input_file.stat().st_size / (1024*1024), 2),
+        'output_size_mb': round(output_path.stat().st_size / (1024*1024), 2) if output_path.exists() else 0,
+        'processing_time_sec': round(time.time() - start_time, 2)
+    }
+
+
+def _init_process_worker(presets: tuple, analysis_mode: str, dtype: str, segment_workers: int) -> None:
+    """Initialisiert einen Worker-Prozess mit eigenen, langlebigen AudioProcessor-Instanzen"""
+    global _worker_processors
+    _worker_processors = {preset: AudioProcessor(preset=preset, analysis_mode=analysis_mode, dtype=dtype,
+                                                 segment_workers=segment_workers)
+                          for preset in presets}
+
+
+def _process_in_worker(input_file: Path, outputs: Dict[str, Path], streaming: bool) -> List[Dict[str, any]]:
+    """Job im Worker-Prozess; zurück kommen nur die Ergebnis-Dicts (Messwerte, Pfade)"""
+    return _master_job(_worker_processors, input_file, outputs, streaming)
+
+
+class QueueWorker:
+    """
+    Worker im Koordinator/Worker-Modus: holt Jobs aus der Queue und mastert sie
+
+    Die Einstellungen (Presets, Analyse-Modus, dtype, ...) kommen mit jedem Job;
+    AudioProcessor-Instanzen bleiben über Jobs hinweg erhalten. Während ein Job
+    läuft, verlängert ein Heartbeat-Thread dessen Lease.
+    """
+
+    def __init__(self, queue: JobQueue, worker_id: Optional[str] = None,
+                 heartbeat_sec: float = QUEUE_HEARTBEAT_SEC, poll_interval: float = QUEUE_POLL_INTERVAL_SEC):
+        if heartbeat_sec >= queue.lease_sec:
+            raise ValueError(f"Heartbeat ({heartbeat_sec}s) muss kürzer als die Lease ({queue.lease_sec}s) sein")
+        self.queue = queue
+        self.worker_id = worker_id or default_worker_id()
+        self.heartbeat_sec = heartbeat_sec
+        self.poll_interval = poll_interval
+        self._processors = {}  # (Preset, Analyse-Modus, dtype, Segment-Worker) → AudioProcessor
+
+    def _processors_for(self, config: Dict[str, any]) -> Dict[str, AudioProcessor]:
+        processors = {}
+        for preset in config['presets']:
+            key = (preset, config['analysis_mode'], config['dtype'], config['segment_workers'])
+            if key not in self._processors:
+                self._processors[key] = AudioProcessor(preset=preset, analysis_mode=config['analysis_mode'],
+                                                       dtype=config['dtype'],
+                                                       segment_workers=config['segment_workers'])
+            processors[preset] = self._processors[key]
+        return processors
+
+    def run(self, max_jobs: Optional[int] = None, max_idle_sec: Optional[float] = None) -> Dict[str, int]:
+        """
+        Verarbeitet Jobs, bis max_jobs erreicht, die Queue max_idle_sec leer ist oder Ctrl+C
+
+        Returns:
+            Zähler erledigter, fehlgeschlagener und verlorener Jobs (Lease abgelaufen)
+        """
+        stats = {'jobs_done': 0, 'jobs_failed': 0, 'jobs_lost': 0}
+        logger.info(f"👷 Worker {self.worker_id} wartet auf Jobs in {self.queue.path}")
+        idle_since = time.monotonic()
+        try:
+            while max_jobs is None or sum(stats.values()) < max_jobs:
+                job = self.queue.claim(self.worker_id)
+                if job is None:
+                    if max_idle_sec is not None and time.monotonic() - idle_since >= max_idle_sec:
+                        break
+                    time.sleep(self.poll_interval)
+                    continue
+                stats[self._run_job(job)] += 1
+                idle_since = time.monotonic()
+        except KeyboardInterrupt:
+            logger.info(f"⏹️  Worker {self.worker_id} beendet")
+        logger.info(f"👷 Worker {self.worker_id}: {stats['jobs_done']} erledigt, {stats['jobs_failed']} Fehler, "
+                    f"{stats['jobs_lost']} Leases verloren")
+        return stats
+
+    def _run_job(self, job: QueuedJob) -> str:
+        """Mastert einen Job mit laufendem Heartbeat; liefert den Zähler-Schlüssel für run()"""
+        logger.info(f"📥 Job {job.id}: {job.input_file.name} (Versuch {job.attempts})")
+        stop = threading.Event()
+
+        def beat() -> None:
+            while not stop.wait(self.heartbeat_sec):
+                try:
+                    if not self.queue.heartbeat(job.id, self.worker_id):
+                        logger.warning(f"⚠️  Job {job.id}: Lease verloren - Ergebnis wird verworfen")
+                        return
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️  Job {job.id}: Heartbeat fehlgeschlagen ({e}), neuer Versuch")
+
+        heartbeat = threading.Thread(target=beat, name=f"heartbeat-{job.id}", daemon=True)
+        heartbeat.start()
+        try:
+            results = _master_job(self._processors_for(job.config), job.input_file, job.outputs,
+                                  job.config['streaming'])
+        except KeyboardInterrupt:
+            self.queue.release(job.id, self.worker_id)
+            raise
+        except Exception as e:
+            logger.error(f"Fehler bei {job.input_file.name}: {e}")
+            return 'jobs_failed' if self.queue.fail(job.id, self.worker_id, str(e)) else 'jobs_lost'
+        finally:
+            stop.set()
+            heartbeat.join()
+        if not self.queue.complete(job.id, self.worker_id, results):
+            logger.warning(f"⚠️  Job {job.id}: Lease inzwischen abgelaufen, Ergebnis verworfen")
+            return 'jobs_lost'
+        logger.info(f"✅ Job {job.id}: {len(results)} Output(s)")
+        return 'jobs_done'
+
+
+def _run_queue_worker(queue_path: Path) -> None:
+    """Einstiegspunkt eines lokalen Worker-Prozesses (run_queue_workers)"""
+    QueueWorker(JobQueue(queue_path)).run()
+
+
+def run_queue_workers(queue_path: Path, count: int = 1) -> None:
+    """Startet count Worker auf dieser Maschine (count > 1: eigene Prozesse, Ctrl+C beendet alle)"""
+    if count < 1:
+        raise ValueError(f"Anzahl Worker muss mindestens 1 sein ({count} angegeben)")
+    if count == 1:
+        QueueWorker(JobQueue(queue_path)).run()
+        return
+
+    processes = [multiprocessing.Process(target=_run_queue_worker, args=(queue_path,), name=f"queue-worker-{i}")
+                 for i in range(count)]
+    for process in processes:
+        process.start()
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # Ctrl+C erreicht auch die Worker-Prozesse; sie geben ihre Jobs selbst frei
+        for process in processes:
+            process.join()
+
 
 class BatchProcessor:
     """
@@ -22,10 +247,48 @@ class BatchProcessor:
     - Sammelt Ergebnisse für Report
     """
 
-    def __init__(self, input_dir: Path = INPUT_DIR, output_dir: Path = OUTPUT_DIR, preset: str = 'suno'):
+    def __init__(self, input_dir: Path = INPUT_DIR, output_dir: Path = OUTPUT_DIR, preset: str = 'suno',
+                 analysis_mode: str = 'incremental', streaming: bool = False, dtype: str = 'float64',
+                 backend: str = 'thread', segment_workers: int = 1,
+                 presets: Optional[List[str]] = None, memory_budget: Optional[int] = None,
+                 analysis_index: Optional[AnalysisIndex] = None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unbekanntes Backend '{backend}' (erlaubt: {', '.join(BACKENDS)})")
+        if backend == 'pipeline' and streaming:
+            raise ValueError("Backend 'pipeline' ist nicht mit Streaming kombinierbar (Streaming liest und schreibt blockweise selbst)")
+        if memory_budget is not None and backend == 'pipeline':
+            raise ValueError("Backend 'pipeline' unterstützt kein Speicher-Budget (Speicher ist über die Queue-Größen begrenzt)")
+        if presets is not None:
+            unknown = [name for name in presets if name not in MASTERING_PRESETS]
+            if unknown or not presets:
+                raise ValueError(f"Unbekannte Presets '{','.join(unknown)}' (erlaubt: {', '.join(MASTERING_PRESETS)})")
+            if streaming:
+                raise ValueError("Mehrere Presets (Fan-out) sind nicht mit Streaming kombinierbar")
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
-        self.processor = AudioProcessor(preset=preset)
+
+        # Fan-out: ein Output pro Preset (Dateiname mit Preset-Suffix), Dekodieren
+        # und High-Pass laufen pro Input nur einmal
+        self.fan_out = presets is not None
+        self.presets = list(dict.fromkeys(presets)) if self.fan_out else [preset]
+        self.processors = {name: AudioProcessor(preset=name, analysis_mode=analysis_mode, dtype=dtype,
+                                                segment_workers=segment_workers)
+                           for name in self.presets}
+        self.processor = self.processors[self.presets[0]]
+        self.streaming = streaming  # Zwei-Pass-Streaming mit begrenztem Speicher
+        self.backend = backend
+        self.memory_budget = memory_budget  # Bytes für gleichzeitig laufende Jobs (None = unbegrenzt)
+
+        # Analyse-Index der Weboberfläche: Inputs und neue Outputs werden nach jedem Job
+        # von einem Hintergrund-Thread eingetragen (blockiert den Batch nicht), die
+        # Indexseite muss sie dann nicht mehr selbst analysieren
+        self.analysis_index = analysis_index
+        self._analyzer = AudioAnalyzer(index=analysis_index) if analysis_index is not None else None
+        self._index_executor = (ThreadPoolExecutor(max_workers=1, thread_name_prefix='analysis-index')
+                                if analysis_index is not None else None)
+
+        # Einstellungen für die AudioProcessor-Instanzen der Worker-Prozesse
+        self._processor_args = (tuple(self.presets), analysis_mode, dtype, segment_workers)
 
         # Erstelle Output-Ordner falls nicht vorhanden
         self.output_dir.mkdir(exist_ok=True)
@@ -43,21 +306,37 @@ class BatchProcessor:
 
         return sorted(list(set(files)))  # Entferne Duplikate und sortiere
 
-    def process_batch(self, max_workers: int = 1) -> Dict[str, any]:
+    def process_batch(self, max_workers: int = 1, resume: bool = False,
+                      progress: Optional[Callable[[str, Dict[str, any]], None]] = None) -> Dict[str, any]:
         """
         Verarbeitet alle Dateien im Batch
 
+        Jeder Job wird im Journal des Output-Ordners festgehalten (Start, Ergebnis,
+        Fehler). Mit resume=True wird der zuletzt unterbrochene Batch fortgesetzt:
+        abgeschlossene Jobs werden übernommen, nur offene Jobs laufen erneut,
+        Report und Zusammenfassung umfassen den ganzen Batch.
+
         Args:
             max_workers: Anzahl paralleler Worker (1 = sequentiell)
+            resume: Unterbrochenen Batch aus dem Journal fortsetzen
+            progress: Callback (Ereignis, Daten) für batch_start, file_start, file_done
+                und file_failed - wird aus Worker-Threads aufgerufen
 
         Returns:
             Dict mit Ergebnissen und Statistiken
         """
+        journal = BatchJournal(self.output_dir)
+        state = journal.load_last_batch() if resume else None
+        if state is not None and state.ended:
+            logger.info("Kein unterbrochener Batch im Journal - starte neuen Batch")
+            state = None
+
         files = self.discover_files()
-        if not files:
+        if not files and state is None:
             logger.warning("Keine Audio-Dateien im Input-Ordner gefunden")
             return {
                 'files_processed': 0,
+                'outputs_written': 0,
                 'files_failed': 0,
                 'total_time_sec': 0.0,
                 'avg_time_per_file': 0.0,
@@ -65,96 +344,509 @@ class BatchProcessor:
                 'errors': []
             }
 
-        logger.info(f"Starte Batch-Verarbeitung von {len(files)} Dateien")
-
-        results = []
-        errors = []
         start_time = time.time()
-
-        if max_workers == 1:
+        self._remove_partial_outputs()
+
+        # Manifest entscheidet, welche Outputs veraltet sind (Input, Einstellungen, Version)
+        manifest = BatchManifest(self.output_dir)
+        settings = {preset: self.processing_settings(preset) for preset in self.presets}
+        if state is not None:
+            if state.settings != settings:
+                raise ValueError(f"Batch {state.batch_id} lief mit anderen Einstellungen - "
+                                 f"Fortsetzen nur mit denselben Presets und Optionen möglich")
+            outputs = state.remaining()
+            outputs_skipped = state.outputs_skipped
+            results = list(state.results)
+            errors = list(state.errors)
+            previous_sec = state.active_sec
+            journal.resume_batch(state)
+            logger.info(f"▶️  Setze Batch {state.batch_id} fort: {len(state.finished)} Jobs abgeschlossen, "
+                        f"{len(outputs)} offen")
+        else:
+            logger.info(f"Starte Batch-Verarbeitung von {len(files)} Dateien")
+            outputs, outputs_skipped = self._plan_jobs(manifest, files)
+            results = []
+            errors = []
+            previous_sec = 0.0
+            journal.start_batch(settings, outputs, outputs_skipped)
+        pending = list(outputs)
+        notify = progress or (lambda event, info: None)
+        notify('batch_start', {'files': [input_file.name for input_file in pending], 'skipped': outputs_skipped})
+
+        def record(input_file: Path, job_results: List[Dict[str, any]]) -> None:
+            results.extend(job_results)
+            for preset, output_path in outputs[input_file].items():
+                manifest.record(input_file, output_path, settings[preset])
+            manifest.save()
+            journal.job_done(input_file, job_results)
+            self._index_job(input_file, job_results)
+            notify('file_done', {'file': input_file.name,
+                                 'outputs': [Path(result['output_file']).name for result in job_results],
+                                 'lufs': [result['final']['lufs'] for result in job_results]})
+
+        def fail(input_file: Path, error: Exception) -> None:
+            errors.append({'file': str(input_file), 'error': str(error)})
+            journal.job_failed(input_file, str(error))
+            logger.error(f"Fehler bei {input_file.name}: {error}")
+            notify('file_failed', {'file': input_file.name, 'error': str(error)})
+
+        def start(input_file: Path) -> None:
+            journal.job_started(input_file)
+            notify('file_start', {'file': input_file.name})
+
+        def started(jobs: List[Path]):
+            for input_file in jobs:
+                start(input_file)
+                yield input_file
+
+        pipeline_stats = None
+        budget = None
+        if self.backend == 'pipeline':
+            # Dekodieren, DSP und Kodieren überlappen (auch mit nur einem DSP-Worker)
+            def on_done(input_file: Path, job_results: Optional[List[Dict[str, any]]],
+                        error: Optional[Exception]) -> None:
+                if error is None:
+                    record(input_file, job_results)
+                else:
+                    fail(input_file, error)
+
+            logger.info(f"Pipeline-Verarbeitung: Dekodieren → DSP ({max_workers} Worker) → Kodieren")
+            pipeline_stats = self._create_pipeline(max_workers, outputs).run(started(pending), on_done)
+        elif max_workers == 1:
             # Sequentiell verarbeiten
-            for i, input_file in enumerate(files, 1):
-                # Generiere Output-Pfad
-                output_filename = f"{input_file.stem}{MASTERED_SUFFIX}{input_file.suffix.lower()}"
-                output_path = self.output_dir / output_filename
-
-                logger.info(f"Verarbeite {i}/{len(files)}: {input_file.name}")
+            for i, input_file in enumerate(started(pending), 1):
+                logger.info(f"Verarbeite {i}/{len(pending)}: {input_file.name}")
                 try:
-                    # Fix: Race Condition vermeiden - prüfe in _process_single_file
-                    # ob Datei existiert und überspringe dann
-                    if output_path.exists():
-                        logger.info(f"Überspringe {input_file.name} - bereits verarbeitet")
-                        continue
-
-                    result = self._process_single_file(input_file)
-                    results.append(result)
-                except FileExistsError:
-                    # Datei wurde während Verarbeitung erstellt (Race Condition)
-                    logger.info(f"Überspringe {input_file.name} - bereits verarbeitet (Race Condition)")
-                    continue
+                    record(input_file, self._process_job(input_file, outputs[input_file]))
                 except Exception as e:
-                    error_info = {
-                        'file': str(input_file),
-                        'error': str(e)
-                    }
-                    errors.append(error_info)
-                    logger.error(f"Fehler bei {input_file.name}: {e}")
+                    fail(input_file, e)
         else:
-            # Parallel verarbeiten (für zukünftige Erweiterung)
-            with ThreadPoolExecutor(max_workers=max_workers) as executor:
-                futures = [executor.submit(self._process_single_file, f) for f in files]
-                for future in as_completed(futures):
-                    try:
-                        result = future.result()
-                        results.append(result)
-                    except Exception as e:
-                        # Fehler-Handling für parallele Verarbeitung
-                        errors.append({'error': str(e)})
+            # Parallel verarbeiten (Threads oder Worker-Prozesse), längste Jobs zuerst:
+            # Der Executor vergibt Jobs in Einreichungsreihenfolge, ein langer Job am Ende
+            # würde sonst allein weiterlaufen, während alle anderen Worker warten
+            durations = self.estimate_durations(pending)
+            schedule = sorted(pending, key=lambda f: durations[f], reverse=True)
+            logger.info(f"Parallele Verarbeitung: {max_workers} Worker ({self.backend}), längste Dateien zuerst")
+
+            def finish(input_file: Path, future) -> None:
+                try:
+                    record(input_file, future.result())
+                except Exception as e:
+                    # Fehler-Handling für parallele Verarbeitung
+                    fail(input_file, e)
 
-        total_time = time.time() - start_time
+            with self._create_executor(max_workers) as executor:
+                def submit(input_file: Path):
+                    return self._submit(executor, input_file, outputs[input_file])
+
+                if self.memory_budget is None:
+                    futures = {submit(f): f for f in started(schedule)}
+                    for future in as_completed(futures):
+                        finish(futures[future], future)
+                else:
+                    budget = self._run_with_budget(submit, schedule, outputs, max_workers, finish, start)
+
+        # Gesamtzeit inkl. der Läufe vor einer Unterbrechung
+        total_time = previous_sec + time.time() - start_time
 
-        # Berechne übersprungene Dateien
-        total_input_files = len(files)
-        processed_or_failed = len(results) + len(errors)
-        files_skipped = total_input_files - processed_or_failed
+        # Übersprungen = aktuelle Outputs laut Manifest (bei Fan-out pro Preset gezählt)
+        files_processed = _count_inputs(results)
+        processed_or_failed = files_processed + len(errors)
 
         summary = {
-            'files_processed': len(results),
+            'files_processed': files_processed,
+            'outputs_written': len(results),
             'files_failed': len(errors),
-            'files_skipped': files_skipped,
+            'files_skipped': outputs_skipped,
             'total_time_sec': round(total_time, 2),
             'avg_time_per_file': round(total_time / processed_or_failed, 2) if processed_or_failed else 0,
             'results': results,
-            'errors': errors
+            'errors': errors,
+            'backend': self.backend if max_workers > 1 or self.backend == 'pipeline' else 'sequential'
         }
+        if budget is not None:
+            summary['memory_budget'] = budget.summary()
+            logger.info(f"Speicher-Budget: Spitze {summary['memory_budget']['peak_reserved_mb']}MB "
+                        f"von {summary['memory_budget']['budget_mb']}MB, "
+                        f"{summary['memory_budget']['jobs_queued']} Jobs mussten warten")
+        if pipeline_stats is not None:
+            summary['pipeline'] = pipeline_stats
+            logger.info("Pipeline-Auslastung: " + ", ".join(
+                f"{name} {stage['utilization']:.0%}" for name, stage in pipeline_stats.items()))
+        elif max_workers > 1 and results:
+            summary['schedule'] = self._schedule_stats(results, total_time, max_workers)
+            logger.info(f"Makespan: {summary['schedule']['makespan_sec']}s "
+                        f"(Untergrenze {summary['schedule']['lower_bound_sec']}s)")
+        if max_workers == 1 or self.backend != 'process':
+            # Worker-Prozesse haben eigene Caches - Statistik nur für diesen Prozess aussagekräftig
+            summary['filter_cache'] = filter_cache.stats()
+            logger.debug(f"Filter-Cache: {summary['filter_cache']}")
+
+        if self.analysis_index is not None:
+            # Speichern nach den noch laufenden Index-Analysen, ohne auf sie zu warten
+            self._index_executor.submit(self.analysis_index.save)
+        journal.end_batch(summary)
+        logger.info(f"Batch-Verarbeitung abgeschlossen: {files_processed} Dateien erfolgreich "
+                    f"({len(results)} Outputs), {len(errors)} Fehler")
+        return summary
+
+    def watch(self, max_workers: int = 1, poll_interval: float = WATCH_POLL_INTERVAL_SEC,
+              settle_sec: float = WATCH_SETTLE_SEC, max_polls: Optional[int] = None) -> Dict[str, int]:
+        """
+        Watch-Modus: überwacht den Input-Ordner und mastert neue oder geänderte Dateien
+
+        Ein Executor mit warmen AudioProcessor-Instanzen (Threads oder Worker-Prozesse)
+        läuft über die ganze Laufzeit. Dateien werden erst eingereicht, wenn sie
+        settle_sec unverändert sind; das Manifest überspringt bereits aktuelle Outputs.
+        Ändert sich eine Datei während ihres Jobs, wird sie danach erneut verarbeitet.
+
+        Args:
+            max_workers: Anzahl paralleler Worker
+            poll_interval: Abstand der Verzeichnis-Snapshots in Sekunden
+            settle_sec: Mindestdauer ohne Änderung vor der Verarbeitung
+            max_polls: Anzahl Snapshots bis zum Ende (None = bis Ctrl+C)
+
+        Returns:
+            Zähler: verarbeitete und fehlerhafte Input-Dateien, geschriebene und
+            übersprungene Outputs (bei Fan-out pro Preset gezählt)
+        """
+        manifest = BatchManifest(self.output_dir)
+        tracker = SettledFileTracker(settle_sec)
+        in_flight = {}  # Future → (Input-Datei, Zustand bei Einreichung, Outputs, Startzeit)
+        stats = {'files_processed': 0, 'outputs_written': 0, 'files_failed': 0, 'files_skipped': 0}
+
+        def collect(future) -> None:
+            input_file, state, outputs, start_time = in_flight.pop(future)
+            try:
+                job_results = future.result()
+            except Exception as e:
+                stats['files_failed'] += 1
+                logger.error(f"Fehler bei {input_file.name}: {e}")
+                return
+
+            stats['files_processed'] += 1
+            stats['outputs_written'] += len(job_results)
+            current = scan_directory(self.input_dir, [input_file.suffix]).get(input_file)
+            if current is None:
+                logger.info(f"🗑️  {input_file.name} wurde während der Verarbeitung gelöscht")
+                return
+            if current != state:
+                logger.info(f"🔁 {input_file.name} wurde während der Verarbeitung geändert - wird erneut gemastert")
+                return
+            for preset, output_path in outputs.items():
+                manifest.record(input_file, output_path, self.processing_settings(preset))
+            manifest.save()
+            logger.info(f"✅ {input_file.name}: {len(job_results)} Output(s) nach {time.time() - start_time:.1f}s")
+
+        logger.info(f"👀 Watch-Modus: {self.input_dir} (Snapshot alle {poll_interval}s, "
+                    f"{settle_sec}s Ruhezeit, {max_workers} Worker {self.backend})")
+        polls = 0
+        with self._create_executor(max_workers) as executor:
+            try:
+                while max_polls is None or polls < max_polls:
+                    polls += 1
+                    busy = {job[0] for job in in_flight.values()}
+                    snapshot = scan_directory(self.input_dir, SUPPORTED_EXTENSIONS)
+                    for input_file, state in tracker.update(snapshot, busy):
+                        outputs = self.stale_outputs(manifest, input_file)
+                        stats['files_skipped'] += len(self.presets) - len(outputs)
+                        if not outputs:
+                            logger.info(f"Überspringe {input_file.name} - Output aktuell")
+                            continue
+                        logger.info(f"📥 {input_file.name} erkannt, starte Mastering")
+                        future = self._submit(executor, input_file, outputs)
+                        in_flight[future] = (input_file, state, outputs, time.time())
+
+                    for future in [future for future in in_flight if future.done()]:
+                        collect(future)
+                    time.sleep(poll_interval)
+            except KeyboardInterrupt:
+                logger.info(f"⏹️  Watch-Modus beendet, warte auf {len(in_flight)} laufende Jobs")
+            finally:
+                for future in as_completed(list(in_flight)):
+                    collect(future)
+                manifest.save()
+
+        return stats
+
+    def process_queued(self, queue: JobQueue, poll_interval: float = QUEUE_POLL_INTERVAL_SEC) -> Dict[str, any]:
+        """
+        Koordinator-Modus: stellt alle veralteten Outputs als Jobs in die Queue
+
+        Die Verarbeitung übernehmen QueueWorker-Prozesse (mastering_tool.py --worker),
+        lokal oder auf anderen Rechnern. Der Koordinator wartet, bis alle Jobs des
+        Batches erledigt oder fehlgeschlagen sind, pflegt dabei das Manifest, reiht
+        Jobs mit abgelaufener Lease wieder ein und liefert dieselbe Zusammenfassung
+        wie process_batch. Pfade stehen absolut in der Queue (gleicher Mount-Pfad
+        auf allen Rechnern).
+
+        Args:
+            queue: Job-Queue auf gemeinsamem Speicher
+            poll_interval: Abfrage-Intervall für den Batch-Fortschritt
 
-        logger.info(f"Batch-Verarbeitung abgeschlossen: {len(results)} erfolgreich, {len(errors)} Fehler")
+        Returns:
+            Dict mit Ergebnissen und Statistiken
+        """
+        files = self.discover_files()
+        start_time = time.time()
+        manifest = BatchManifest(self.output_dir)
+        outputs, outputs_skipped = self._plan_jobs(manifest, files)
+        settings = {preset: self.processing_settings(preset) for preset in self.presets}
+
+        originals = {input_file.resolve(): input_file for input_file in outputs}
+        jobs = {input_file.resolve(): {preset: path.resolve() for preset, path in stale.items()}
+                for input_file, stale in outputs.items()}
+        batch_id = uuid.uuid4().hex[:12]
+        enqueued, pending = queue.enqueue(batch_id, jobs, self.queue_config())
+        logger.info(f"📤 Batch {batch_id}: {enqueued} Jobs in {queue.path} eingereiht - warte auf Worker")
+
+        results = []
+        errors = []
+        workers = set()
+        progress = None
+        while True:
+            counts = queue.batch_counts(batch_id)
+            for input_file, status, payload, worker in queue.collect_finished(batch_id):
+                original = originals[input_file]
+                if worker is not None:
+                    workers.add(worker)
+                if status == 'done':
+                    results.extend(payload)
+                    for preset, output_path in outputs[original].items():
+                        manifest.record(original, output_path, settings[preset])
+                    manifest.save()
+                else:
+                    errors.append({'file': str(original), 'error': payload})
+                    logger.error(f"Fehler bei {original.name}: {payload}")
+            if counts['queued'] + counts['running'] == 0:
+                break
+            if progress != counts:
+                progress = counts
+                logger.info(f"⏳ Batch {batch_id}: {counts['done']} erledigt, {counts['failed']} Fehler, "
+                            f"{counts['running']} laufen, {counts['queued']} warten")
+            queue.requeue_expired()
+            time.sleep(poll_interval)
+
+        total_time = time.time() - start_time
+        files_processed = _count_inputs(results)
+        processed_or_failed = files_processed + len(errors)
+        summary = {
+            'files_processed': files_processed,
+            'outputs_written': len(results),
+            'files_failed': len(errors),
+            'files_skipped': outputs_skipped,
+            'files_pending': len(pending),
+            'total_time_sec': round(total_time, 2),
+            'avg_time_per_file': round(total_time / processed_or_failed, 2) if processed_or_failed else 0,
+            'results': results,
+            'errors': errors,
+            'backend': 'queue',
+            'queue': {'path': str(queue.path), 'batch_id': batch_id, 'jobs_enqueued': enqueued,
+                      'workers': sorted(workers),
+                      'pending': [{'file': str(originals[input_file]), 'job_id': job_id, 'batch_id': other_batch}
+                                  for input_file, (job_id, other_batch) in pending.items()]}
+        }
+        logger.info(f"Batch-Verarbeitung abgeschlossen: {files_processed} Dateien erfolgreich "
+                    f"({len(results)} Outputs), {len(errors)} Fehler "
+                    f"({len(workers)} Worker)")
+        if pending:
+            logger.warning(f"⚠️  {len(pending)} Dateien hatten bereits offene Jobs eines anderen Batches "
+                           f"und fehlen in diesem Ergebnis")
         return summary
 
-    def _process_single_file(self, input_file: Path) -> Dict[str, any]:
-        """Verarbeitet eine einzelne Datei (mit Race Condition Protection)"""
-        # Output-Dateiname generieren
-        stem = input_file.stem
-        suffix = input_file.suffix.lower()
-        output_filename = f"{stem}{MASTERED_SUFFIX}{suffix}"
-        output_path = self.output_dir / output_filename
+    def queue_config(self) -> Dict[str, any]:
+        """Verarbeitungs-Einstellungen, die ein Queue-Job an den Worker mitgibt"""
+        presets, analysis_mode, dtype, segment_workers = self._processor_args
+        return {'presets': list(presets), 'analysis_mode': analysis_mode, 'dtype': dtype,
+                'segment_workers': segment_workers, 'streaming': self.streaming}
+
+    def _plan_jobs(self, manifest: BatchManifest, files: List[Path]) -> Tuple[Dict[Path, Dict[str, Path]], int]:
+        """
+        Ermittelt die veralteten Outputs aller Input-Dateien
+
+        Returns:
+            (Input-Datei → veraltete Outputs {Preset: Pfad}, Anzahl übersprungener Outputs)
+        """
+        outputs = {}
+        outputs_skipped = 0
+        for input_file in files:
+            stale = self.stale_outputs(manifest, input_file)
+            outputs_skipped += len(self.presets) - len(stale)
+            if stale:
+                outputs[input_file] = stale
+            else:
+                logger.info(f"Überspringe {input_file.name} - Output aktuell")
+        manifest.save()
+        return outputs, outputs_skipped
+
+    def _index_job(self, input_file: Path, job_results: List[Dict[str, any]]) -> None:
+        """Reiht Input und erzeugte Outputs eines Jobs für den Analyse-Index ein (Hintergrund-Thread)"""
+        if self._analyzer is None:
+            return
+        for path in [input_file] + [Path(result['output_file']) for result in job_results]:
+            self._index_executor.submit(self._index_file, path)
+
+    def _index_file(self, path: Path) -> None:
+        try:
+            self._analyzer.analyze_file(str(path))
+        except Exception as e:
+            logger.warning(f"⚠️  Analyse-Index für {path.name} nicht aktualisiert: {e}")
+
+    def _remove_partial_outputs(self) -> None:
+        """Entfernt halb geschriebene temporäre Outputs eines abgebrochenen Laufs"""
+        for partial in self.output_dir.glob(f".*{PARTIAL_MARKER}*"):
+            logger.warning(f"🧹 Entferne unvollständigen Output {partial.name}")
+            partial.unlink()
+
+    def stale_outputs(self, manifest: BatchManifest, input_file: Path) -> Dict[str, Path]:
+        """Veraltete Outputs einer Input-Datei laut Manifest ({Preset: Output-Pfad})"""
+        stale = {}
+        for preset in self.presets:
+            output_path = self._output_path(input_file, preset)
+            reason = manifest.check(input_file, output_path, self.processing_settings(preset))
+            if reason is not None:
+                logger.debug(f"{output_path.name}: {reason}")
+                stale[preset] = output_path
+        return stale
+
+    def _run_with_budget(self, submit, schedule: List[Path], outputs: Dict[Path, Dict[str, Path]],
+                         max_workers: int, finish, on_start) -> MemoryBudget:
+        """
+        Reicht Jobs in Schedule-Reihenfolge ein, solange Worker und Speicher-Budget frei sind
+
+        Der nächste Job wartet, bis genug Reservierungen frei werden (keine
+        Überholung durch kleinere Jobs - die längsten Jobs stehen vorn).
+        """
+        budget = MemoryBudget(self.memory_budget)
+        estimates = {f: self.estimate_job_memory(f, list(outputs[f])) for f in schedule}
+        if estimates:
+            logger.info(f"Speicher-Budget {format_mb(self.memory_budget)}: geschätzt "
+                        f"{format_mb(max(estimates.values()))} für den größten Job")
+
+        queue = deque(schedule)
+        running = {}
+        while queue or running:
+            while (queue and len(running) < max_workers
+                   and budget.try_acquire(queue[0].name, estimates[queue[0]])):
+                input_file = queue.popleft()
+                on_start(input_file)
+                running[submit(input_file)] = input_file
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                input_file = running.pop(future)
+                budget.release(estimates[input_file])
+                finish(input_file, future)
+        return budget
+
+    def estimate_job_memory(self, input_file: Path, presets: Optional[List[str]] = None) -> int:
+        """
+        Geschätzter Spitzen-Speicher eines Jobs aus dem Header (sf.info, ohne Dekodieren)
+
+        Bei Fan-out zählt das speicherhungrigste Preset plus eine Kopie pro weiterem
+        Output. Nicht lesbare Header werden über die Dateigröße geschätzt (Stereo, 44.1kHz).
+        """
+        presets = presets or self.presets[:1]
+        try:
+            info = sf.info(str(input_file))
+            frames, file_sr, channels = info.frames, info.samplerate, info.channels
+        except Exception:
+            file_sr, channels = 44100, 2
+            frames = int(input_file.stat().st_size / FALLBACK_BYTES_PER_SEC * file_sr)
+        return max(self.processors[preset].estimate_memory(frames, file_sr, channels, self.streaming, len(presets))
+                   for preset in presets)
+
+    def estimate_durations(self, files: List[Path]) -> Dict[Path, float]:
+        """
+        Dauer pro Datei in Sekunden aus dem Header (sf.info, ohne Dekodieren)
 
-        # Fix: Atomare Prüfung ob Datei bereits existiert
-        if output_path.exists():
-            raise FileExistsError(f"Output-Datei existiert bereits: {output_path}")
+        Nicht lesbare Header werden über die Dateigröße geschätzt.
+        """
+        durations = {}
+        for input_file in files:
+            try:
+                durations[input_file] = sf.info(str(input_file)).duration
+            except Exception:
+                durations[input_file] = input_file.stat().st_size / FALLBACK_BYTES_PER_SEC
+        return durations
+
+    def _schedule_stats(self, results: List[Dict[str, any]], makespan: float, max_workers: int) -> Dict[str, any]:
+        """
+        Erreichter Makespan gegen die ideale Untergrenze
 
-        # Verarbeiten
-        result = self.processor.process_file(str(input_file), str(output_path))
+        Untergrenze = max(längster Job, Gesamtarbeit / Worker) - kein Schedule
+        kann schneller fertig sein.
+        """
+        job_times = [r['processing_time_sec'] for r in results]
+        lower_bound = max(max(job_times), sum(job_times) / max_workers)
+        return {
+            'order': 'longest-first',
+            'makespan_sec': round(makespan, 2),
+            'lower_bound_sec': round(lower_bound, 2),
+            'efficiency': round(lower_bound / makespan, 3) if makespan > 0 else 1.0
+        }
 
-        # Zusätzliche Metadaten
-        result.update({
-            'input_file': str(input_file),
-            'output_file': str(output_path),
-            'original_size_mb': round(input_file.stat().st_size / (1024*1024), 2),
-            'output_size_mb': round(output_path.stat().st_size / (1024*1024), 2) if output_path.exists() else 0
-        })
+    def _create_pipeline(self, dsp_workers: int, outputs: Dict[Path, Dict[str, Path]]) -> PipelineExecutor:
+        """
+        Pipeline aus den Stufen des AudioProcessors (load_audio → process_audio → write_audio)
 
-        return result
+        Bei Fan-out rechnet die DSP-Stufe alle veralteten Presets einer Datei
+        (prepare_audio einmal, master_prepared pro Preset), der Writer schreibt alle Outputs.
+        """
+        def load(input_file: Path):
+            start_time = time.time()
+            audio, sr = self.processor.load_audio(str(input_file))
+            return input_file, audio, sr, start_time
+
+        def process(payload):
+            input_file, audio, sr, start_time = payload
+            presets = list(outputs[input_file])
+            if len(presets) == 1:
+                renditions = [(presets[0],) + self.processors[presets[0]].process_audio(audio, sr)]
+            else:
+                prepared = self.processors[presets[0]].prepare_audio(audio, sr)
+                renditions = [(preset,) + self.processors[preset].master_prepared(prepared) for preset in presets]
+            return renditions, start_time
+
+        def write(input_file: Path, payload) -> List[Dict[str, any]]:
+            renditions, start_time = payload
+            job_results = []
+            for preset, audio, result in renditions:
+                output_path = outputs[input_file][preset]
+                self.processors[preset].write_audio(str(output_path), audio, result['sample_rate'])
+                result.update(_file_metadata(input_file, output_path, start_time))
+                job_results.append(result)
+            _share_job_time(job_results, start_time)
+            return job_results
+
+        return PipelineExecutor(load, process, write, dsp_workers=dsp_workers)
+
+    def _create_executor(self, max_workers: int):
+        """Executor für das gewählte Backend"""
+        if self.backend == 'process':
+            return ProcessPoolExecutor(max_workers=max_workers, initializer=_init_process_worker,
+                                       initargs=self._processor_args)
+        return ThreadPoolExecutor(max_workers=max_workers)
+
+    def _submit(self, executor, input_file: Path, outputs: Dict[str, Path]):
+        """Reicht eine Datei beim Executor ein (Prozess-Backend: nur Pfade werden übertragen)"""
+        if self.backend == 'process':
+            return executor.submit(_process_in_worker, input_file, outputs, self.streaming)
+        return executor.submit(self._process_job, input_file, outputs)
+
+    def _output_path(self, input_file: Path, preset: Optional[str] = None) -> Path:
+        """Output-Pfad einer Input-Datei (bei Fan-out mit Preset-Suffix)"""
+        suffix = f"{MASTERED_SUFFIX}_{preset or self.presets[0]}" if self.fan_out else MASTERED_SUFFIX
+        return self.output_dir / f"{input_file.stem}{suffix}{input_file.suffix.lower()}"
+
+    def processing_settings(self, preset: Optional[str] = None) -> Dict[str, any]:
+        """Einstellungen, die den Output bestimmen (Schlüssel für das Manifest)"""
+        settings = self.processors[preset or self.presets[0]].processing_settings()
+        settings['streaming'] = self.streaming
+        return settings
+
+    def _process_job(self, input_file: Path, outputs: Dict[str, Path]) -> List[Dict[str, any]]:
+        """Verarbeitet eine Datei für die angegebenen Outputs (veraltete werden überschrieben)"""
+        return _master_job(self.processors, input_file, outputs, self.streaming)
 
     def generate_report(self, batch_results: Dict[str, any]) -> str:
         """Generiert einen detaillierten Report mit Vorher/Nachher Analyse"""
@@ -170,9 +862,33 @@ class BatchProcessor:
         # Zusammenfassung
         report_lines.append("📊 ZUSAMMENFASSUNG:")
         report_lines.append(f"  ✅ Verarbeitete Dateien: {batch_results['files_processed']}")
+        if batch_results.get('outputs_written', batch_results['files_processed']) != batch_results['files_processed']:
+            report_lines.append(f"  💾 Geschriebene Outputs: {batch_results['outputs_written']}")
         report_lines.append(f"  ❌ Fehlerhafte Dateien: {batch_results['files_failed']}")
         report_lines.append(f"  ⏱️  Gesamtzeit: {batch_results['total_time_sec']} Sekunden")
         report_lines.append(f"  📈 Durchschnitt pro Datei: {batch_results['avg_time_per_file']} Sekunden")
+        if 'schedule' in batch_results:
+            schedule = batch_results['schedule']
+            report_lines.append(f"  ⚖️  Makespan: {schedule['makespan_sec']}s (Untergrenze {schedule['lower_bound_sec']}s, "
+                                f"Effizienz {schedule['efficiency']:.0%})")
+        if 'pipeline' in batch_results:
+            stages = ", ".join(f"{name} {stage['utilization']:.0%} ({stage['busy_sec']}s)"
+                               for name, stage in batch_results['pipeline'].items())
+            report_lines.append(f"  🔀 Pipeline-Auslastung: {stages}")
+        if 'memory_budget' in batch_results:
+            memory = batch_results['memory_budget']
+            report_lines.append(f"  🧠 Speicher-Budget: Spitze {memory['peak_reserved_mb']}MB von {memory['budget_mb']}MB "
+                                f"reserviert, {memory['jobs_queued']} Jobs mussten warten")
+        if 'queue' in batch_results:
+            queue = batch_results['queue']
+            report_lines.append(f"  🖧  Job-Queue: {queue['jobs_enqueued']} Jobs über {len(queue['workers'])} Worker "
+                                f"({', '.join(queue['workers']) or '-'})")
+            for job in queue.get('pending', []):
+                report_lines.append(f"  ⏳ {Path(job['file']).name}: offen als Job {job['job_id']} "
+                                    f"in Batch {job['batch_id']} (nicht in diesem Ergebnis)")
+        if 'filter_cache' in batch_results:
+            cache = batch_results['filter_cache']
+            report_lines.append(f"  🧮 Filter-Cache: {cache['hits']} Hits / {cache['misses']} Misses ({cache['entries']} Filter)")
         report_lines.append("")
 
         if results:
@@ -211,29 +927,29 @@ class BatchProcessor:
             report_lines.append(f"   LUFS: {orig['lufs']}dB | Peak: {orig['peak_dbtp']}dBTP | RMS: {orig['rms_db']}dB")
             report_lines.append("")
 
-            if 'high_pass' in steps and steps['high_pass']:
+            if steps.get('high_pass'):
                 hp = steps['high_pass']
                 report_lines.append("2. NACH HIGH-PASS FILTER (20Hz)")
                 report_lines.append(f"   LUFS: {hp['lufs']}dB (Δ{round(hp['lufs'] - orig['lufs'], 1)}dB)")
                 report_lines.append("")
 
-            if 'compression' in steps and steps['compression']:
+            if steps.get('compression'):
                 comp = steps['compression']
-                prev = steps.get('high_pass', orig)
+                prev = steps.get('high_pass') or orig
                 report_lines.append("3. NACH KOMPRESSION")
                 report_lines.append(f"   LUFS: {comp['lufs']}dB (Δ{round(comp['lufs'] - prev['lufs'], 1)}dB)")
                 report_lines.append("")
 
-            if 'lufs_norm' in steps:
+            if steps.get('lufs_norm'):
                 lufs = steps['lufs_norm']
-                prev = steps.get('compression', steps.get('high_pass', orig))
+                prev = steps.get('compression') or steps.get('high_pass') or orig
                 report_lines.append("4. NACH LUFS-NORMALISIERUNG")
                 report_lines.append(f"   LUFS: {lufs['lufs']}dB (Δ{round(lufs['lufs'] - prev['lufs'], 1)}dB)")
                 report_lines.append("")
 
-            if 'limiter' in steps:
+            if steps.get('limiter'):
                 lim = steps['limiter']
-                prev = steps.get('lufs_norm', orig)
+                prev = steps.get('lufs_norm') or orig
                 report_lines.append("5. NACH PEAK-LIMITER")
                 report_lines.append(f"   Peak: {lim['peak_dbtp']}dBTP (Δ{round(lim['peak_dbtp'] - prev['peak_dbtp'], 1)}dB)")
                 report_lines.append("")
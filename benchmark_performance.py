@@ -12,6 +12,11 @@ from pathlib import Path
 import tempfile
 import soundfile as sf
 import logging
+import tracemalloc
+import pyloudnorm as pyln
+
+from loudness import LoudnessMeter
+from dsp import smooth_gain_reduction, measure_true_peak, filter_cache, limit_true_peak, ENVELOPE_TOLERANCE_DB
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -111,6 +116,331 @@ def benchmark_memory():
             logger.info(f"   {size/44100/60:.1f}min Array: Memory Error")
             break
 
+def _reference_envelope_loop(gain_reduction_db, attack_coeff, release_coeff):
+    """Ursprüngliche Attack/Release-Schleife (Referenz für Genauigkeit und Speedup)"""
+    smoothed_gr = np.zeros_like(gain_reduction_db)
+    smoothed_gr[0] = gain_reduction_db[0]
+
+    for i in range(1, len(gain_reduction_db)):
+        if gain_reduction_db[i] < smoothed_gr[i-1]:
+            smoothed_gr[i] = attack_coeff * smoothed_gr[i-1] + (1 - attack_coeff) * gain_reduction_db[i]
+        else:
+            smoothed_gr[i] = release_coeff * smoothed_gr[i-1] + (1 - release_coeff) * gain_reduction_db[i]
+
+    return smoothed_gr
+
+def benchmark_compressor_envelope(duration_sec=300, sample_rate=44100):
+    """Vergleicht Envelope-Engine mit der Sample-Schleife (5 Minuten Stereo)"""
+    logger.info("🗜️  Teste Kompressor-Envelope (Attack/Release)...")
+
+    audio = create_test_audio(duration_sec=duration_sec, sample_rate=sample_rate).astype(np.float64)
+    # Amplituden-Modulation, damit Attack und Release beide aktiv sind
+    t = np.arange(len(audio)) / sample_rate
+    audio *= (0.55 + 0.45 * np.sin(2 * np.pi * 0.5 * t))[:, None]
+
+    # Gain Reduction wie im 'aggressive' Preset (10ms RMS, -10dB, 4:1)
+    window_size = int(0.01 * sample_rate)
+    power = np.mean(audio**2, axis=1)
+    csum = np.concatenate([[0.0], np.cumsum(power)])
+    rms_squared = (csum[window_size:] - csum[:-window_size]) / window_size
+    rms_db = 10 * np.log10(np.maximum(rms_squared, 1e-10))
+    gain_reduction_db = np.minimum(0.0, (-10.0 - rms_db) * (1 - 1/4.0))
+
+    attack_coeff = np.exp(-1 / (5 * sample_rate / 1000))
+    release_coeff = np.exp(-1 / (100 * sample_rate / 1000))
+
+    start = time.time()
+    reference = _reference_envelope_loop(gain_reduction_db, attack_coeff, release_coeff)
+    loop_time = time.time() - start
+
+    start = time.time()
+    smoothed = smooth_gain_reduction(gain_reduction_db, attack_coeff, release_coeff)
+    engine_time = time.time() - start
+
+    max_error = float(np.max(np.abs(smoothed - reference)))
+
+    logger.info(f"   Audio: {duration_sec/60:.0f} min Stereo ({len(gain_reduction_db)} Samples)")
+    logger.info(f"   Python-Schleife: {loop_time:.2f}s")
+    logger.info(f"   Envelope-Engine: {engine_time:.2f}s")
+    logger.info(f"   Speedup: {loop_time / engine_time:.1f}x")
+    logger.info(f"   Max. Abweichung: {max_error:.2e} dB (Toleranz {ENVELOPE_TOLERANCE_DB:.0e} dB)")
+
+    return {
+        'loop_time': loop_time,
+        'engine_time': engine_time,
+        'speedup': loop_time / engine_time,
+        'max_error_db': max_error
+    }
+
+def benchmark_true_peak_memory(sample_rate=44100):
+    """Misst Zusatzspeicher der blockweisen True-Peak-Messung (1, 5, 10 Minuten Stereo)"""
+    logger.info("📈 Teste True-Peak-Speicherbedarf...")
+
+    for minutes in [1, 5, 10]:
+        audio = np.random.randn(sample_rate * 60 * minutes, 2) * 0.3
+
+        tracemalloc.start()
+        start = time.time()
+        peak_dbtp = measure_true_peak(audio)
+        duration = time.time() - start
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        audio_mb = audio.nbytes / (1024 * 1024)
+        logger.info(f"   {minutes} min ({audio_mb:.0f}MB Audio): {peak_dbtp:.2f} dBTP in {duration:.2f}s, "
+                    f"Zusatzspeicher {peak_bytes / (1024 * 1024):.1f}MB")
+
+def benchmark_dtype_accuracy(duration_sec=60, sample_rate=44100):
+    """Genauigkeits-Report: float32-Kette gegen float64 (LUFS, Peak, True Peak)"""
+    logger.info("🎯 Teste float32-Genauigkeit gegen float64...")
+
+    # Musikähnliches Test-Signal: modulierte Töne + Rauschen
+    t = np.arange(int(duration_sec * sample_rate)) / sample_rate
+    envelope = 0.3 + 0.25 * np.sin(2 * np.pi * 0.5 * t)
+    noise = np.random.default_rng(0).standard_normal((len(t), 2)) * 0.05
+    test_audio = create_test_audio(duration_sec, sample_rate) * 0.3
+    test_audio = (test_audio[:len(t)] * envelope[:len(test_audio), None] + noise[:len(test_audio)]).astype(np.float32)
+
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as f:
+        input_path = f.name
+    with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as f:
+        output_path = f.name
+
+    try:
+        sf.write(input_path, test_audio, sample_rate, subtype='FLOAT')
+        report = {}
+
+        for preset in ['suno', 'aggressive']:
+            results = {}
+            for dtype in ['float64', 'float32']:
+                processor = AudioProcessor(preset=preset, dtype=dtype)
+                tracemalloc.start()
+                start = time.time()
+                result = processor.process_file(input_path, output_path)
+                duration = time.time() - start
+                _, peak_bytes = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                results[dtype] = (result['final'], duration, peak_bytes / (1024 * 1024))
+
+            ref, ref_time, ref_mem = results['float64']
+            f32, f32_time, f32_mem = results['float32']
+            deltas = {key: round(abs(f32[key] - ref[key]), 3) for key in ['lufs', 'peak_db', 'peak_dbtp', 'rms_db']}
+            report[preset] = deltas
+
+            logger.info(f"   Preset '{preset}':")
+            logger.info(f"      ΔLUFS {deltas['lufs']}dB | ΔPeak {deltas['peak_db']}dB | "
+                        f"ΔTrue Peak {deltas['peak_dbtp']}dB | ΔRMS {deltas['rms_db']}dB")
+            logger.info(f"      Zeit: {ref_time:.2f}s → {f32_time:.2f}s | Speicher: {ref_mem:.0f}MB → {f32_mem:.0f}MB")
+
+        return report
+
+    finally:
+        Path(input_path).unlink(missing_ok=True)
+        Path(output_path).unlink(missing_ok=True)
+
+def benchmark_filter_cache(clips=50, clip_sec=5):
+    """Setup-Kosten pro Datei: viele kurze 48kHz-Clips mit kaltem vs. warmem Filter-Cache"""
+    logger.info("🧮 Teste Filter-Cache (kurze Clips, 48kHz → 44.1kHz)...")
+
+    processor = AudioProcessor(preset='suno')
+    clip = create_test_audio(duration_sec=clip_sec, sample_rate=48000).astype(np.float64)
+
+    def run_clips(clear_cache):
+        start = time.time()
+        for _ in range(clips):
+            if clear_cache:
+                filter_cache.clear()
+            resampled = processor._resample_audio(clip, 48000, 44100)
+            processor._apply_high_pass(resampled, 44100)
+            processor._measure_true_peak(resampled)
+        return (time.time() - start) / clips
+
+    cold_time = run_clips(clear_cache=True)
+    filter_cache.clear()
+    warm_time = run_clips(clear_cache=False)
+
+    stats = filter_cache.stats()
+    logger.info(f"   Ohne Cache (Filterdesign pro Clip): {cold_time*1000:.1f}ms pro Clip")
+    logger.info(f"   Mit Cache: {warm_time*1000:.1f}ms pro Clip")
+    logger.info(f"   Cache: {stats['hits']} Hits / {stats['misses']} Misses (Hit-Rate {stats['hit_rate']:.1%})")
+    return stats
+
+def benchmark_lufs_gain_solver(duration_sec=300, sample_rate=44100):
+    """LUFS-Gain: Mehrfachmessung am verstärkten Signal vs. einmal gemessenes LoudnessModel"""
+    logger.info(f"📏 Teste LUFS-Gain-Berechnung ({duration_sec}s Stereo)...")
+
+    processor = AudioProcessor(preset='suno')
+    meter = pyln.Meter(sample_rate)
+    audio = np.random.randn(duration_sec * sample_rate, 2) * 0.05
+    audio[::sample_rate] = 0.9  # Einzelne Peaks erzwingen Smart Limiting
+
+    # Bisheriger Ablauf: Lautheit, verstärkte Kopie + True Peak, Lautheit nach sicherem Gain
+    start = time.time()
+    loudness = meter.integrated_loudness(audio)
+    gain_db = processor.target_lufs - loudness
+    test_peak = measure_true_peak(audio * 10 ** (gain_db / 20))
+    safe_gain_db = gain_db - (test_peak - processor.true_peak_ceiling)
+    meter.integrated_loudness(audio * 10 ** (safe_gain_db / 20))
+    legacy_time = time.time() - start
+
+    start = time.time()
+    model_gain_db = processor._compute_lufs_gain_db(audio, processor.target_lufs)
+    model_time = time.time() - start
+
+    logger.info(f"   Mehrfachmessung: {legacy_time:.2f}s")
+    logger.info(f"   LoudnessModel (ein Durchlauf): {model_time:.2f}s ({legacy_time / model_time:.1f}x schneller), "
+                f"Gain {model_gain_db:+.2f}dB")
+    return {'legacy_time': legacy_time, 'model_time': model_time}
+
+def benchmark_limiter(duration_sec=300, sample_rate=44100, ceiling_db=-1.0):
+    """Lookahead True-Peak-Limiter vs. hartes Clipping: Echtzeitfaktor und erreichter True Peak"""
+    logger.info(f"🔊 Teste Lookahead-Limiter ({duration_sec}s Stereo)...")
+
+    t = np.arange(duration_sec * sample_rate) / sample_rate
+    music = np.column_stack([
+        np.sin(2 * np.pi * 220 * t) + 0.5 * np.sin(2 * np.pi * 3100 * t + 1.0),
+        np.random.randn(len(t)) * 0.4
+    ]) * (0.6 + 0.5 * np.sin(2 * np.pi * 0.3 * t))[:, np.newaxis]
+    music /= np.max(np.abs(music))
+    ceiling_linear = 10 ** (ceiling_db / 20)
+
+    results = []
+    for overdrive_db in [0, 6, 12]:
+        audio = music * 10 ** (overdrive_db / 20)
+
+        start = time.time()
+        limited, max_gr_db = limit_true_peak(audio, sample_rate, ceiling_db)
+        duration = time.time() - start
+
+        clipped_peak = measure_true_peak(np.clip(audio, -ceiling_linear, ceiling_linear))
+        limited_peak = measure_true_peak(limited)
+        realtime_factor = duration_sec / duration
+        logger.info(f"   +{overdrive_db}dB: {duration:.2f}s ({realtime_factor:.0f}x Echtzeit), "
+                    f"Max GR {max_gr_db:.1f}dB, True Peak {limited_peak:.3f}dBTP "
+                    f"(Clipping: {clipped_peak:.2f}dBTP)")
+        results.append({'overdrive_db': overdrive_db, 'realtime_factor': realtime_factor,
+                        'true_peak_dbtp': limited_peak})
+    return results
+
+def benchmark_loudness_meter(duration_sec=300):
+    """Nativer BS.1770-Meter vs. pyloudnorm: Laufzeit und Abweichung bei verschiedenen Sample-Rates"""
+    logger.info(f"📐 Teste Lautheitsmessung ({duration_sec}s Stereo)...")
+
+    results = []
+    for sample_rate in [22050, 44100, 48000, 96000]:
+        t = np.arange(duration_sec * sample_rate) / sample_rate
+        audio = np.random.randn(len(t), 2) * 0.1 * (0.55 + 0.45 * np.sin(2 * np.pi * 0.05 * t))[:, np.newaxis]
+
+        start = time.time()
+        reference = pyln.Meter(sample_rate).integrated_loudness(audio)
+        reference_time = time.time() - start
+
+        start = time.time()
+        loudness = LoudnessMeter(sample_rate).measure(audio)
+        native_time = time.time() - start
+
+        deviation = abs(loudness['integrated'] - reference)
+        logger.info(f"   {sample_rate}Hz: pyloudnorm {reference_time:.2f}s (nur Integrated), "
+                    f"nativ {native_time:.2f}s (Integrated/Momentary/Short-Term/LRA), "
+                    f"Δ {deviation:.1e} LU, LRA {loudness['lra']:.1f} LU")
+        results.append({'sample_rate': sample_rate, 'speedup': reference_time / native_time,
+                        'deviation_lu': deviation})
+    return results
+
+def benchmark_segment_parallel(duration_sec=600, sample_rate=44100, preset='aggressive'):
+    """Eine lange Datei seriell vs. segment-parallel: Laufzeit pro Thread-Anzahl und Abweichung"""
+    import os
+    logger.info(f"🧩 Teste segment-parallele Verarbeitung ({duration_sec}s Stereo, Preset {preset})...")
+
+    t = np.arange(duration_sec * sample_rate) / sample_rate
+    audio = np.column_stack([
+        np.sin(2 * np.pi * 110 * t) * 0.3,
+        np.random.randn(len(t)) * 0.1
+    ]) * (0.5 + 0.4 * np.sin(2 * np.pi * 0.05 * t))[:, np.newaxis]
+
+    start = time.time()
+    serial, _ = AudioProcessor(preset=preset).process_audio(audio, sample_rate)
+    serial_time = time.time() - start
+    logger.info(f"   Seriell: {serial_time:.2f}s ({os.cpu_count()} CPU-Kerne verfügbar)")
+
+    results = []
+    for workers in [2, 4, 8]:
+        processor = AudioProcessor(preset=preset, segment_workers=workers)
+        start = time.time()
+        segmented, info = processor.process_audio(audio, sample_rate)
+        duration = time.time() - start
+        deviation = float(np.max(np.abs(segmented - serial)))
+        logger.info(f"   {workers} Threads, {info['segments']} Segmente: {duration:.2f}s "
+                    f"({serial_time / duration:.2f}x), max. Abweichung {deviation:.1e}")
+        results.append({'workers': workers, 'speedup': serial_time / duration, 'deviation': deviation})
+    return results
+
+def benchmark_preset_fanout(duration_sec=180, sample_rate=48000, presets=('suno', 'gentle', 'aggressive')):
+    """A/B mehrerer Presets: getrennte Läufe vs. Fan-out (Resample und High-Pass nur einmal)"""
+    logger.info(f"🔀 Teste Preset-Fan-out ({len(presets)} Presets, {duration_sec}s Stereo {sample_rate}Hz)...")
+
+    audio = create_test_audio(duration_sec, sample_rate) * 0.5
+    processors = [AudioProcessor(preset=name) for name in presets]
+
+    start = time.time()
+    for processor in processors:
+        processor.process_audio(audio, sample_rate)
+    separate_time = time.time() - start
+
+    start = time.time()
+    prepared = processors[0].prepare_audio(audio, sample_rate)
+    for processor in processors:
+        processor.master_prepared(prepared)
+    fanout_time = time.time() - start
+
+    logger.info(f"   Getrennte Läufe: {separate_time:.2f}s")
+    logger.info(f"   Fan-out: {fanout_time:.2f}s ({separate_time / fanout_time:.2f}x schneller)")
+    return {'separate_time': separate_time, 'fanout_time': fanout_time}
+
+def benchmark_sample_rate_roundtrip(duration_sec=3, sample_rate=48000):
+    """
+    Prüft Sample-Rate und Dauer der Outputs bei Inputs ≠ 44.1kHz (alle Verarbeitungswege)
+
+    Das Wellenform-Sidecar muss dieselbe Sample-Rate und Frame-Anzahl wie der Output tragen.
+    """
+    from batch_processor import BatchProcessor
+    from waveform import load_waveform
+
+    logger.info(f"🔁 Teste Round-Trip {sample_rate}Hz → 44100Hz ({duration_sec}s PCM_24)...")
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        input_dir = Path(tmp) / "input"
+        input_dir.mkdir()
+        input_path = input_dir / "roundtrip.wav"
+        sf.write(input_path, create_test_audio(duration_sec, sample_rate) * 0.3, sample_rate, subtype='PCM_24')
+
+        outputs = {
+            'process_file': lambda out: AudioProcessor().process_file(str(input_path), str(out / "file.wav")),
+            'process_file (segmentiert)': lambda out: AudioProcessor(segment_workers=2).process_file(
+                str(input_path), str(out / "file.wav")),
+            'process_file_streaming': lambda out: AudioProcessor().process_file_streaming(
+                str(input_path), str(out / "file.wav")),
+        }
+        for backend in ['thread', 'pipeline']:
+            outputs[f'BatchProcessor ({backend})'] = (
+                lambda out, backend=backend: BatchProcessor(input_dir, out, backend=backend).process_batch())
+
+        for name, run in outputs.items():
+            output_dir = Path(tmp) / f"out_{len(report)}"
+            output_dir.mkdir()
+            run(output_dir)
+            for output_path in output_dir.glob("*.wav"):
+                info = sf.info(str(output_path))
+                waveform = load_waveform(output_path, 1)
+                waveform_ok = (waveform is not None and waveform['sample_rate'] == info.samplerate
+                               and waveform['frames'] == info.frames)
+                ok = info.samplerate == 44100 and abs(info.duration - duration_sec) < 0.01 and waveform_ok
+                report[name] = {'sample_rate': info.samplerate, 'duration_sec': round(info.duration, 3),
+                                'waveform_ok': waveform_ok, 'ok': ok}
+                logger.info(f"   {'✅' if ok else '❌'} {name}: {info.samplerate}Hz, {info.duration:.3f}s, "
+                            f"Wellenform {'passend' if waveform_ok else 'abweichend/fehlt'}")
+    return report
+
 if __name__ == "__main__":
     logger.info("=" * 60)
     logger.info("🎵 AUDIO MASTERING PERFORMANCE BENCHMARK")
@@ -133,6 +463,26 @@ if __name__ == "__main__":
     processing_result = benchmark_processing()
     logger.info("")
     benchmark_memory()
+    logger.info("")
+    benchmark_compressor_envelope()
+    logger.info("")
+    benchmark_true_peak_memory()
+    logger.info("")
+    benchmark_dtype_accuracy()
+    logger.info("")
+    benchmark_filter_cache()
+    logger.info("")
+    benchmark_limiter()
+    logger.info("")
+    benchmark_lufs_gain_solver()
+    logger.info("")
+    benchmark_loudness_meter()
+    logger.info("")
+    benchmark_segment_parallel()
+    logger.info("")
+    benchmark_preset_fanout()
+    logger.info("")
+    benchmark_sample_rate_roundtrip()
     
     logger.info("")
     logger.info("✅ Benchmark abgeschlossen!")
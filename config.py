@@ -33,7 +33,38 @@ LOGS_DIR = Path("logs")
 
 # Datei-Suffixe
 MASTERED_SUFFIX = "_mastered"
+MANIFEST_FILENAME = ".mastering_manifest.json"
+JOURNAL_FILENAME = ".mastering_journal.jsonl"
+QUEUE_FILENAME = ".mastering_queue.db"
+ANALYSIS_INDEX_FILENAME = ".analysis_index.json"
+PREVIEW_DIRNAME = ".previews"
 SUPPORTED_EXTENSIONS = {'.wav', '.mp3'}
 
 # Performance
-MAX_FILE_SIZE_MB = 500
\ No newline at end of file
+MAX_FILE_SIZE_MB = 500
+
+# Watch-Modus
+WATCH_POLL_INTERVAL_SEC = 1.0  # Abstand der Verzeichnis-Snapshots
+WATCH_SETTLE_SEC = 2.0         # so lange muss eine Datei unverändert sein (Upload fertig)
+
+# Koordinator/Worker-Modus (Job-Queue als SQLite-Datei auf gemeinsamem Speicher)
+QUEUE_LEASE_SEC = 60.0          # so lange gehört ein Job einem Worker ohne Heartbeat
+QUEUE_HEARTBEAT_SEC = 10.0      # Abstand der Lease-Verlängerungen eines Workers
+QUEUE_POLL_INTERVAL_SEC = 2.0   # Abfrage-Intervall von Worker (leere Queue) und Koordinator
+QUEUE_MAX_ATTEMPTS = 3          # Lease-Abläufe (Worker-Absturz) bis ein Job als fehlgeschlagen gilt
+
+# Hintergrund-Jobs der Weboberfläche (/process)
+WEB_JOB_WORKERS = 2              # gleichzeitig laufende Batch-Jobs (Jobs auf denselben Output-Ordner laufen nacheinander)
+WEB_JOB_HISTORY = 50             # so viele abgeschlossene Jobs bleiben abrufbar
+WEB_SSE_KEEPALIVE_SEC = 15.0     # Kommentarzeile im Event-Stream, damit Proxys die Verbindung offen halten
+
+# Vorschau-Renditionen für den A/B-Player der Weboberfläche
+PREVIEW_CACHE_MAX_MB = 1024          # Cache-Größe, darüber werden die ältesten Vorschauen gelöscht (LRU)
+PREVIEW_COMPRESSION_LEVEL = 0.6      # 0 = beste Qualität, 1 = kleinste Datei (Vorbis ca. 110 kbit/s)
+PREVIEW_MAX_SAMPLE_RATE = 44100      # höhere Sample-Raten werden für die Vorschau heruntergerechnet
+
+# Wellenform-Übersichten (Min/Max/RMS-Pyramide als Binär-Sidecar neben der Audiodatei)
+WAVEFORM_SIDECARS = True             # beim Schreiben gemasterter Outputs direkt mit erzeugen
+WAVEFORM_SAMPLES_PER_BIN = 256       # feinste Stufe (ca. 6ms bei 44.1kHz), jede weitere Stufe halbiert die Auflösung
+WAVEFORM_MIN_BINS = 512              # gröbste Stufe hat höchstens so viele Werte
+WAVEFORM_DEFAULT_BINS = 2000         # Auflösung für /waveform ohne bins-Parameter (ca. Bildschirmbreite)
\ No newline at end of file
@@ -0,0 +1,637 @@
+"""
+DSP-Bausteine für die Mastering-Chain (vektorisiert, ohne Python-Sample-Loops)
+"""
+
+import numpy as np
+import logging
+import threading
+from math import gcd
+from typing import Callable, Hashable, List, Optional, Tuple
+from scipy import signal
+from scipy.signal import resample_poly
+from scipy.ndimage import uniform_filter1d, minimum_filter1d
+
+logger = logging.getLogger(__name__)
+
+# Fensterlänge der blockrekursiven Envelope-Berechnung (Samples)
+ENVELOPE_BLOCK_SIZE = 8192
+
+# Maximale Iterationen pro Block bis zur Fixpunkt-Konvergenz der Attack/Release-Maske
+ENVELOPE_MAX_ITERATIONS = 16
+
+# Dokumentierte Toleranz gegenüber der sequentiellen Referenz-Schleife (dB)
+ENVELOPE_TOLERANCE_DB = 1e-9
+
+# Blockgröße der True-Peak-Messung (Frames) - bestimmt den Speicherbedarf
+TRUE_PEAK_BLOCK_SIZE = 65536
+
+# Oversampling-Faktor der True-Peak-Messung (ITU-R BS.1770-4)
+TRUE_PEAK_OVERSAMPLING = 4
+
+# Lookahead-Limiter: Vorlaufzeit der Gain-Rampe und Default-Release (ms)
+LIMITER_LOOKAHEAD_MS = 1.5
+LIMITER_RELEASE_MS = 50.0
+
+# Haltezeit um jeden Peak (Frames) = halbe Länge des Interpolationsfilters,
+# damit sich der Gain innerhalb der Interpolation eines Peaks nicht ändert
+LIMITER_HOLD_FRAMES = 10
+
+
+class FilterCache:
+    """
+    Prozessweiter Cache für Filterkoeffizienten (thread-safe)
+
+    Schlüssel sind Tupel aus Filterart, Rate/Verhältnis und Ordnung.
+    Einträge werden geteilt und dürfen vom Aufrufer nicht verändert werden
+    (sosfilt akzeptiert keine schreibgeschützten Arrays).
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, factory: Callable[[], np.ndarray]) -> np.ndarray:
+        """Liefert gecachte Koeffizienten oder berechnet sie einmalig"""
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                return self._entries[key]
+
+        coeffs = np.asarray(factory())
+
+        with self._lock:
+            self.misses += 1
+            return self._entries.setdefault(key, coeffs)
+
+    def stats(self) -> dict:
+        """Hit/Miss-Zähler für Logging und Batch-Report"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+# Gemeinsamer Cache für alle Prozessoren, Meter und Resampler im Prozess
+filter_cache = FilterCache()
+
+
+def highpass_sos(rate: int, cutoff: float = 20, order: int = 4) -> np.ndarray:
+    """Butterworth-High-Pass als SOS (gecacht pro Rate, Grenzfrequenz, Ordnung)"""
+    return filter_cache.get(('highpass', rate, cutoff, order),
+                            lambda: signal.butter(order, cutoff, 'hp', fs=rate, output='sos'))
+
+
+def resample_filter(up: int, down: int) -> np.ndarray:
+    """
+    Anti-Aliasing-FIR von resample_poly (gecacht pro Verhältnis)
+
+    Identisch zum Default-Design von resample_poly; als window=... übergeben
+    liefert resample_poly dasselbe Ergebnis ohne Neuberechnung.
+    """
+    max_rate = max(up, down)
+    num_taps = 2 * 10 * max_rate + 1
+    return filter_cache.get(('resample', up, down, num_taps),
+                            lambda: signal.firwin(num_taps, 1.0 / max_rate, window=('kaiser', 5.0)))
+
+
+def _true_peak_phases(oversampling: int) -> Tuple[List[np.ndarray], int]:
+    """
+    Polyphase-Teilfilter des Oversampling-FIR und seine Verzögerung in Input-Samples
+
+    Gemeinsame Definition für TruePeakMeter und TruePeakEnvelope: die Verzögerung
+    ergibt sich aus der halben Filterlänge der tatsächlichen resample_filter-Taps.
+    """
+    taps = resample_filter(oversampling, 1) * oversampling
+    half_len = (len(taps) - 1) // 2
+    return [taps[p::oversampling] for p in range(oversampling)], half_len // oversampling
+
+
+def smooth_gain_reduction(gain_reduction_db: np.ndarray,
+                          attack_coeff: float,
+                          release_coeff: float,
+                          block_size: int = ENVELOPE_BLOCK_SIZE,
+                          initial: Optional[float] = None) -> np.ndarray:
+    """
+    Attack/Release-Glättung der Gain Reduction (blockrekursiv vektorisiert)
+
+    Ersetzt die Sample-Schleife
+        y[i] = c * y[i-1] + (1 - c) * x[i],  c = attack falls x[i] < y[i-1], sonst release
+    durch einen Fixpunkt über die Attack/Release-Maske pro Block: Bei fester Maske
+    ist der Filter ein zeitvarianter One-Pole, der sich geschlossen über
+    kumulierte Produkte lösen lässt. Die Maske wird aus dem Ergebnis neu bestimmt,
+    bis sie stabil ist; nicht konvergierte Blöcke übernehmen nur den exakten Präfix.
+
+    Genauigkeit: Abweichung zur Referenz-Schleife < ENVELOPE_TOLERANCE_DB
+    (nur Rundungsunterschiede der Summation).
+
+    Args:
+        gain_reduction_db: Ungeglättete Gain Reduction (1D, dB, <= 0)
+        attack_coeff: Filterkoeffizient für steigende Gain Reduction
+        release_coeff: Filterkoeffizient für fallende Gain Reduction
+        block_size: Blocklänge in Samples
+        initial: Geglätteter Wert vor dem ersten Sample (Zustand bei Streaming);
+                 ohne Angabe startet die Glättung beim ersten Sample
+
+    Returns:
+        Geglättete Gain Reduction (float64, gleiche Länge)
+    """
+    x = np.asarray(gain_reduction_db, dtype=np.float64)
+    if initial is not None:
+        return smooth_gain_reduction(np.concatenate([[initial], x]), attack_coeff,
+                                     release_coeff, block_size)[1:]
+
+    n = len(x)
+    smoothed = np.empty(n)
+    if n == 0:
+        return smoothed
+    smoothed[0] = x[0]
+
+    log_attack = np.log(attack_coeff)
+    log_release = np.log(release_coeff)
+
+    # Blocklänge begrenzen, damit das kumulierte Produkt nicht unterläuft
+    min_log = min(log_attack, log_release)
+    if min_log < 0:
+        block_size = max(1, min(block_size, int(600 / -min_log)))
+
+    i = 1
+    while i < n:
+        end = min(n, i + block_size)
+        block = x[i:end]
+        prev = smoothed[i - 1]
+
+        # Startschätzung: Attack wo die Gain Reduction zunimmt
+        attack = np.empty(len(block), dtype=bool)
+        attack[0] = block[0] < prev
+        attack[1:] = block[1:] < block[:-1]
+
+        for _ in range(ENVELOPE_MAX_ITERATIONS):
+            log_coeff = np.where(attack, log_attack, log_release)
+            decay = np.exp(np.cumsum(log_coeff))
+            result = decay * (prev + np.cumsum((1 - np.exp(log_coeff)) * block / decay))
+
+            # Maske aus dem Ergebnis neu bestimmen (Index 0 hängt nur von prev ab)
+            new_attack = np.empty_like(attack)
+            new_attack[0] = attack[0]
+            new_attack[1:] = block[1:] < result[:-1]
+            mismatch = np.flatnonzero(new_attack != attack)
+            if mismatch.size == 0:
+                break
+            attack = new_attack
+
+        if mismatch.size == 0:
+            smoothed[i:end] = result
+            i = end
+        else:
+            # Bis zur ersten Abweichung ist das Ergebnis exakt
+            k = mismatch[0]
+            smoothed[i:i + k] = result[:k]
+            i += k
+
+    return smoothed
+
+
+def compute_gain_reduction(rms_db: np.ndarray, ratio: float, threshold_db: float,
+                           knee_db: float = 6.0) -> np.ndarray:
+    """Statische Kompressor-Kennlinie mit Soft Knee (Gain Reduction in dB, <= 0)"""
+    gain_reduction_db = np.zeros_like(rms_db)
+
+    # Soft Knee Bereich: [threshold - knee/2, threshold + knee/2]
+    knee_start = threshold_db - knee_db/2
+    knee_end = threshold_db + knee_db/2
+
+    # Im Knee-Bereich: sanfter Übergang
+    in_knee = (rms_db >= knee_start) & (rms_db <= knee_end)
+    if np.any(in_knee):
+        x = rms_db[in_knee] - knee_start
+        gain_reduction_db[in_knee] = (x ** 2) / (2 * knee_db) * (1 - 1/ratio)
+
+    # Oberhalb Knee: volle Kompression
+    above_knee = rms_db > knee_end
+    gain_reduction_db[above_knee] = (threshold_db - rms_db[above_knee]) * (1 - 1/ratio)
+
+    return gain_reduction_db
+
+
+def sliding_mean_square(audio: np.ndarray, window_size: int) -> np.ndarray:
+    """
+    Gleitendes Mittel der Signalleistung (O(N) laufende Summe)
+
+    Mehrkanal-Input (frames, channels) wird zu einem gemeinsamen Detektor
+    verknüpft (Mittel der Kanal-Leistungen), damit alle Kanäle dieselbe
+    Gain Reduction erhalten und das Stereobild stabil bleibt.
+
+    Ausrichtung identisch zu np.convolve(audio**2, np.ones(W)/W, mode='same').
+
+    Args:
+        audio: Mono (frames,) oder Mehrkanal (frames, channels)
+        window_size: Fensterlänge in Samples
+
+    Returns:
+        Mittlere Leistung pro Frame (1D)
+    """
+    power = audio**2 if audio.ndim == 1 else np.mean(audio**2, axis=1)
+    return uniform_filter1d(power, window_size, mode='constant', cval=0.0)
+
+
+class TruePeakMeter:
+    """
+    Streaming True-Peak-Meter mit Polyphase-Oversampling (ITU-R BS.1770-4)
+
+    Verwendet denselben Kaiser-FIR wie resample_poly(x, 4, 1), zerlegt in
+    Polyphase-Teilfilter mit übertragenem Filterzustand. Pro Block entstehen
+    nur block × oversampling Werte; gespeichert wird ausschließlich das
+    laufende Maximum pro Kanal - Speicherbedarf unabhängig von der Trackdauer.
+    """
+
+    def __init__(self, channels: int = 1, oversampling: int = TRUE_PEAK_OVERSAMPLING):
+        self.channels = channels
+        self.oversampling = oversampling
+
+        # Filterdesign identisch zu resample_poly; Ausgänge vor der Verzögerung liegen vor Sample 0
+        self._phases, self._delay = _true_peak_phases(oversampling)
+        self._states = [np.zeros((len(h) - 1, channels)) for h in self._phases]
+        self._frames_seen = 0
+        self._peak = np.zeros(channels)
+
+    def process(self, block: np.ndarray) -> None:
+        """Verarbeitet einen Block (frames,) oder (frames, channels)"""
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        if len(block) == 0:
+            return
+
+        skip = max(0, self._delay - self._frames_seen)
+        self._frames_seen += len(block)
+        for p, h in enumerate(self._phases):
+            out, self._states[p] = signal.lfilter(h, [1.0], block, axis=0, zi=self._states[p])
+            if skip < len(out):
+                self._peak = np.maximum(self._peak, np.max(np.abs(out[skip:]), axis=0))
+
+    def warm_up(self, block: np.ndarray) -> None:
+        """Füllt nur den Filterzustand mit vorangehenden Frames (ohne Peaks zu zählen)"""
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        if len(block) == 0:
+            return
+        self._frames_seen += len(block)
+        for p, h in enumerate(self._phases):
+            _, self._states[p] = signal.lfilter(h, [1.0], block, axis=0, zi=self._states[p])
+
+    def merge(self, other: 'TruePeakMeter') -> None:
+        """Übernimmt Maximum und Filterzustand eines nachfolgenden Segments"""
+        self._peak = np.maximum(self._peak, other._peak)
+        self._states = other._states
+        self._frames_seen = other._frames_seen
+
+    def peak_linear(self) -> np.ndarray:
+        """Lineares True Peak pro Kanal (inkl. Ausschwingen nach dem letzten Sample)"""
+        peak = self._peak.copy()
+        tail = np.zeros((self._delay, self.channels))
+        skip = max(0, self._delay - self._frames_seen)
+        for h, state in zip(self._phases, self._states):
+            out, _ = signal.lfilter(h, [1.0], tail, axis=0, zi=state)
+            if skip < len(out):
+                peak = np.maximum(peak, np.max(np.abs(out[skip:]), axis=0))
+        return peak
+
+    def peak_db(self) -> float:
+        """True Peak in dBTP über alle Kanäle (-inf bei Stille)"""
+        peak = float(np.max(self.peak_linear()))
+        return 20 * np.log10(peak) if peak > 0 else -float('inf')
+
+
+def measure_true_peak(audio: np.ndarray, block_size: int = TRUE_PEAK_BLOCK_SIZE,
+                      oversampling: int = TRUE_PEAK_OVERSAMPLING) -> float:
+    """
+    True Peak eines Arrays in dBTP, blockweise mit konstantem Zusatzspeicher
+
+    Ergebnis entspricht max(|resample_poly(audio, 4, 1)|) innerhalb von 0.01 dB.
+    """
+    channels = audio.shape[1] if audio.ndim == 2 else 1
+    meter = TruePeakMeter(channels, oversampling)
+    for start in range(0, len(audio), block_size):
+        meter.process(audio[start:start + block_size])
+    return meter.peak_db()
+
+
+class StreamingCompressor:
+    """
+    Channel-linked RMS-Kompressor für blockweise Verarbeitung
+
+    Gleiche Kennlinie und Attack/Release wie AudioProcessor._apply_compression.
+    Der zentrierte RMS-Detektor braucht Lookahead, daher gibt process()
+    die Frames um window_size - 1 - window_size // 2 verzögert zurück;
+    flush() liefert den Rest am Dateiende.
+
+    Der Make-up Gain hängt vom Mittel der Gain Reduction über die ganze
+    Datei ab: ein Messdurchlauf mit makeup_db=0 sammelt dazu
+    gr_sum/gr_count, der eigentliche Durchlauf setzt makeup_db.
+    """
+
+    def __init__(self, sample_rate: int, ratio: float, threshold_db: float,
+                 attack_ms: float, release_ms: float, knee_db: float = 6.0,
+                 makeup_db: float = 0.0):
+        self.ratio = ratio
+        self.threshold_db = threshold_db
+        self.knee_db = knee_db
+        self.makeup_db = makeup_db
+        self.attack_coeff = np.exp(-1 / (attack_ms * sample_rate / 1000))
+        self.release_coeff = np.exp(-1 / (release_ms * sample_rate / 1000))
+
+        self.window_size = int(0.01 * sample_rate)
+        self._lookahead = self.window_size - 1 - self.window_size // 2
+
+        # Leistung der Frames vor der aktuellen Position (Null vor Dateianfang)
+        self._history = np.zeros(self.window_size // 2)
+        self._pending = None
+        self._smoothed = None
+
+        # Statistik für Make-up Gain (nur signifikante Gain Reduction)
+        self.gr_sum = 0.0
+        self.gr_count = 0
+
+    def _power(self, audio: np.ndarray) -> np.ndarray:
+        return audio**2 if audio.ndim == 1 else np.mean(audio**2, axis=1)
+
+    def _compress(self, frames: np.ndarray, power: np.ndarray) -> np.ndarray:
+        """Komprimiert frames; power enthält History + Frames + Lookahead"""
+        csum = np.concatenate([[0.0], np.cumsum(power)])
+        rms_squared = (csum[self.window_size:self.window_size + len(frames)] - csum[:len(frames)]) / self.window_size
+        rms_db = 20 * np.log10(np.sqrt(np.maximum(rms_squared, 1e-10)))
+
+        gain_reduction_db = compute_gain_reduction(rms_db, self.ratio, self.threshold_db, self.knee_db)
+        smoothed_gr = smooth_gain_reduction(gain_reduction_db, self.attack_coeff, self.release_coeff,
+                                            initial=self._smoothed)
+        self._smoothed = smoothed_gr[-1]
+
+        significant = smoothed_gr[smoothed_gr < -0.1]
+        self.gr_sum += float(np.sum(significant))
+        self.gr_count += len(significant)
+
+        gain_linear = (10 ** ((smoothed_gr + self.makeup_db) / 20)).astype(frames.dtype)
+        if frames.ndim == 2:
+            gain_linear = gain_linear[:, np.newaxis]
+        return frames * gain_linear
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Verarbeitet einen Block, gibt die fertig komprimierten Frames zurück"""
+        pending = block if self._pending is None else np.concatenate([self._pending, block])
+        ready = len(pending) - self._lookahead
+        if ready <= 0:
+            self._pending = pending
+            return pending[:0]
+
+        power = np.concatenate([self._history, self._power(pending)])
+        output = self._compress(pending[:ready], power)
+
+        self._history = power[ready:ready + len(self._history)]
+        self._pending = pending[ready:]
+        return output
+
+    def flush(self) -> np.ndarray:
+        """Gibt die verbleibenden Frames aus (Lookahead hinter dem Dateiende = Stille)"""
+        if self._pending is None:
+            return np.zeros(0)
+        if len(self._pending) == 0:
+            return self._pending
+        power = np.concatenate([self._history, self._power(self._pending), np.zeros(self._lookahead)])
+        output = self._compress(self._pending, power)
+        self._pending = self._pending[:0]
+        return output
+
+    @property
+    def average_gain_reduction_db(self) -> float:
+        """Mittlere signifikante Gain Reduction (NaN ohne Kompression)"""
+        return self.gr_sum / self.gr_count if self.gr_count else float('nan')
+
+
+class TruePeakEnvelope:
+    """
+    Streaming True-Peak-Hüllkurve pro Frame (channel-linked)
+
+    Gleiche Polyphase-Filter wie TruePeakMeter, statt des laufenden Maximums
+    wird pro Frame n das Maximum über alle Kanäle und die oversampelten Werte
+    im Intervall [n, n+1) zurückgegeben. Die Ausgabe hinkt um die
+    Filterverzögerung hinterher, flush() liefert den Rest am Dateiende.
+    """
+
+    def __init__(self, channels: int = 1, oversampling: int = TRUE_PEAK_OVERSAMPLING):
+        self.channels = channels
+        self._phases, self._delay = _true_peak_phases(oversampling)
+        self._states = [np.zeros((len(h) - 1, channels)) for h in self._phases]
+        self._frames_seen = 0
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Verarbeitet einen Block, gibt die Hüllkurve der fertigen Frames zurück"""
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+
+        skip = max(0, self._delay - self._frames_seen)
+        self._frames_seen += len(block)
+        envelope = np.zeros(len(block))
+        for p, h in enumerate(self._phases):
+            out, self._states[p] = signal.lfilter(h, [1.0], block, axis=0, zi=self._states[p])
+            np.maximum(envelope, np.max(np.abs(out), axis=1), out=envelope)
+        return envelope[skip:]
+
+    def flush(self) -> np.ndarray:
+        """Hüllkurve der letzten Frames (Ausschwingen mit Stille)"""
+        return self.process(np.zeros((self._delay, self.channels)))
+
+
+class StreamingLimiter:
+    """
+    Lookahead True-Peak-Limiter (channel-linked, vektorisiert)
+
+    Ablauf pro Block, vollständig mit Array-Operationen:
+    1. True-Peak-Hüllkurve pro Frame (4x Polyphase-Oversampling)
+    2. Benötigter Gain min(1, ceiling / peak), LIMITER_HOLD_FRAMES um jeden Peak gehalten
+    3. Vorwärts-Minimum über das Lookahead-Fenster und gleitender Mittelwert
+       derselben Länge: Der Gain fällt linear über das Lookahead ab und liegt
+       an jedem Frame garantiert unter dem benötigten Gain (kein Overshoot)
+    4. Release: One-Pole-Glättung (smooth_gain_reduction) mit Zustand über
+       Blockgrenzen, das Minimum mit der Rampe bestimmt den finalen Gain
+
+    process() gibt die Frames um Lookahead + Filterverzögerung verzögert
+    zurück, flush() liefert den Rest. Ein abschließendes Clipping auf die
+    Ceiling fängt nur noch Rundungsreste ab.
+    """
+
+    def __init__(self, sample_rate: int, ceiling_db: float, channels: int = 1,
+                 lookahead_ms: float = LIMITER_LOOKAHEAD_MS,
+                 release_ms: float = LIMITER_RELEASE_MS, oversampling: int = TRUE_PEAK_OVERSAMPLING):
+        self.ceiling_linear = 10 ** (ceiling_db / 20)
+        self.lookahead = max(1, int(lookahead_ms * sample_rate / 1000))
+        self.attack_coeff = np.exp(-1 / self.lookahead)
+        self.release_coeff = np.exp(-1 / (release_ms * sample_rate / 1000))
+
+        self._detector = TruePeakEnvelope(channels, oversampling)
+        # Benötigter Gain vor/nach einem Frame, der in dessen Gain eingeht
+        self._context = self.lookahead - 1 + LIMITER_HOLD_FRAMES
+
+        self._required = np.zeros(0)   # benötigter Gain ab Frame _required_start
+        self._required_start = 0
+        self._pending = None           # Audio ab Frame _output_pos (noch nicht ausgegeben)
+        self._output_pos = 0
+        self._smoothed = None
+
+        # Statistik: stärkste Gain Reduction (dB, <= 0)
+        self.max_gain_reduction_db = 0.0
+
+    def _gain_curve(self, required: np.ndarray) -> np.ndarray:
+        """Gain-Rampe aus dem benötigten Gain (Halten, Vorwärts-Minimum, Mittelwert)"""
+        lookahead = self.lookahead
+        held = minimum_filter1d(required, 2 * LIMITER_HOLD_FRAMES + 1, mode='nearest')
+        # Minimum über [n, n + lookahead - 1] (hinter dem Signalende: kein Limiting)
+        held = minimum_filter1d(held, lookahead, mode='constant', cval=1.0, origin=-(lookahead // 2))
+        # Mittelwert über [n - lookahead + 1, n]
+        return uniform_filter1d(held, lookahead, mode='nearest', origin=(lookahead - 1) // 2)
+
+    def _limit(self, end: int) -> np.ndarray:
+        """Limitiert die ausstehenden Frames bis end (exklusiv)"""
+        count = end - self._output_pos
+        frames = self._pending[:count]
+        if count <= 0:
+            return frames
+
+        ramp = self._gain_curve(self._required)
+        offset = self._output_pos - self._required_start
+        ramp_db = 20 * np.log10(ramp[offset:offset + count])
+
+        smoothed = smooth_gain_reduction(ramp_db, self.attack_coeff, self.release_coeff,
+                                         initial=self._smoothed)
+        self._smoothed = smoothed[-1]
+        gain_db = np.minimum(ramp_db, smoothed)
+        self.max_gain_reduction_db = min(self.max_gain_reduction_db, float(np.min(gain_db)))
+
+        gain_linear = (10 ** (gain_db / 20)).astype(frames.dtype)
+        if frames.ndim == 2:
+            gain_linear = gain_linear[:, np.newaxis]
+        limited = np.clip(frames * gain_linear, -self.ceiling_linear, self.ceiling_linear)
+
+        self._pending = self._pending[count:]
+        self._output_pos = end
+        keep_from = max(0, end - self._context)
+        self._required = self._required[keep_from - self._required_start:]
+        self._required_start = keep_from
+        return limited
+
+    def _add_envelope(self, envelope: np.ndarray) -> None:
+        required = np.minimum(1.0, self.ceiling_linear / np.maximum(envelope, 1e-12))
+        self._required = np.concatenate([self._required, required])
+
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """Verarbeitet einen Block, gibt die fertig limitierten Frames zurück"""
+        self._pending = block if self._pending is None else np.concatenate([self._pending, block])
+        self._add_envelope(self._detector.process(block))
+        known = self._required_start + len(self._required)
+        return self._limit(max(self._output_pos, known - self._context))
+
+    def flush(self) -> np.ndarray:
+        """Gibt die verbleibenden Frames aus (Lookahead hinter dem Dateiende = Stille)"""
+        if self._pending is None:
+            return np.zeros(0)
+        self._add_envelope(self._detector.flush())
+        return self._limit(self._output_pos + len(self._pending))
+
+
+def limit_true_peak(audio: np.ndarray, sample_rate: int, ceiling_db: float,
+                    lookahead_ms: float = LIMITER_LOOKAHEAD_MS,
+                    release_ms: float = LIMITER_RELEASE_MS,
+                    block_size: int = TRUE_PEAK_BLOCK_SIZE) -> Tuple[np.ndarray, float]:
+    """
+    Lookahead True-Peak-Limiter für ein ganzes Array (blockweise, konstanter Zusatzspeicher)
+
+    Returns:
+        Tuple (limitiertes Audio im dtype des Inputs, maximale Gain Reduction in dB)
+    """
+    channels = audio.shape[1] if audio.ndim == 2 else 1
+    limiter = StreamingLimiter(sample_rate, ceiling_db, channels, lookahead_ms, release_ms)
+
+    limited = np.empty_like(audio)
+    position = 0
+    for start in range(0, len(audio), block_size):
+        out = limiter.process(audio[start:start + block_size])
+        limited[position:position + len(out)] = out
+        position += len(out)
+    out = limiter.flush()
+    limited[position:position + len(out)] = out
+    return limited, limiter.max_gain_reduction_db
+
+
+class StreamResampler:
+    """
+    Blockweises Resampling mit resample_poly und Kontext an den Blockgrenzen
+
+    Blöcke werden auf Vielfache von down ausgerichtet und mit genügend
+    Vor-/Nachlauf (>= halbe Filterlänge) gerechnet, damit das Ergebnis dem
+    Resampling der ganzen Datei entspricht.
+    """
+
+    def __init__(self, from_sr: int, to_sr: int):
+        divisor = gcd(from_sr, to_sr)
+        self.up = to_sr // divisor
+        self.down = from_sr // divisor
+
+        # resample_poly nutzt half_len = 10 * max(up, down) Taps (im hochgetasteten Raster)
+        half_len_in = 10 * max(self.up, self.down) // self.up + 2
+        self._context = -(-half_len_in // self.down) * self.down
+
+        self._history = None
+        self._pending = None
+        self._frames_in = 0
+        self._frames_out = 0
+
+    def _resample(self, segment: np.ndarray) -> np.ndarray:
+        resampled = resample_poly(segment, self.up, self.down, axis=0,
+                                  window=resample_filter(self.up, self.down))
+        return resampled.astype(segment.dtype, copy=False)
+
+    def process(self, block: np.ndarray, final: bool = False) -> np.ndarray:
+        """Resampelt einen Block; final=True gibt den Rest am Dateiende aus"""
+        pending = block if self._pending is None else np.concatenate([self._pending, block])
+        self._frames_in += len(block)
+        history = pending[:0] if self._history is None else self._history
+
+        if final:
+            usable = len(pending)
+            lookahead = 0
+        else:
+            usable = (len(pending) - self._context) // self.down * self.down
+            lookahead = self._context
+            if usable <= 0:
+                self._pending = pending
+                return pending[:0]
+
+        segment = np.concatenate([history, pending[:usable + lookahead]])
+        resampled = self._resample(segment)
+
+        skip = len(history) * self.up // self.down
+        if final:
+            total_out = -(-self._frames_in * self.up // self.down)
+            count = total_out - self._frames_out
+        else:
+            count = usable * self.up // self.down
+        output = resampled[skip:skip + count]
+        self._frames_out += len(output)
+
+        consumed = np.concatenate([history, pending[:usable]])
+        self._history = consumed[len(consumed) - min(len(consumed), self._context):]
+        self._pending = pending[usable:]
+        return output
@@ -0,0 +1,89 @@
+"""
+Polling-basierte Ordnerüberwachung für den Watch-Modus
+
+Vergleicht periodische Verzeichnis-Snapshots (Größe, mtime) - ohne
+betriebssystemspezifische Abhängigkeiten wie inotify. Eine Datei gilt erst
+als fertig, wenn ihr Zustand settle_sec lang unverändert geblieben ist
+(Debouncing für Uploads und Kopiervorgänge, die noch geschrieben werden).
+"""
+
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Collection, Dict, Iterable, List, Optional, Tuple
+
+from config import WATCH_SETTLE_SEC
+
+logger = logging.getLogger(__name__)
+
+# Zustand einer Datei im Snapshot: (Größe in Bytes, mtime in ns)
+FileState = Tuple[int, int]
+
+
+def scan_directory(directory: Path, extensions: Iterable[str]) -> Dict[Path, FileState]:
+    """Snapshot aller Dateien mit passender Endung (ein Verzeichnis-Listing, nicht rekursiv)"""
+    extensions = {ext.lower() for ext in extensions}
+    snapshot = {}
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or Path(entry.name).suffix.lower() not in extensions:
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue  # zwischen Listing und stat gelöscht
+                snapshot[Path(entry.path)] = (stat.st_size, stat.st_mtime_ns)
+    except FileNotFoundError:
+        logger.warning(f"⚠️  Überwachter Ordner {directory} existiert nicht")
+    return snapshot
+
+
+class SettledFileTracker:
+    """
+    Meldet neue oder geänderte Dateien, sobald ihr Zustand stabil ist
+
+    Jeder gemeldete Zustand gilt als übernommen; erst eine erneute Änderung
+    (oder Löschen und neu Anlegen) meldet die Datei wieder. Fehlgeschlagene
+    Dateien werden so nicht endlos wiederholt.
+    """
+
+    def __init__(self, settle_sec: float = WATCH_SETTLE_SEC):
+        self.settle_sec = settle_sec
+        self._handled: Dict[Path, FileState] = {}                 # zuletzt gemeldeter Zustand
+        self._pending: Dict[Path, Tuple[FileState, float]] = {}   # Zustand, unverändert seit
+
+    def update(self, snapshot: Dict[Path, FileState], busy: Collection[Path] = (),
+               now: Optional[float] = None) -> List[Tuple[Path, FileState]]:
+        """
+        Verarbeitet einen Snapshot
+
+        Args:
+            snapshot: Ergebnis von scan_directory
+            busy: Dateien mit laufendem Job - werden erst nach dessen Ende erneut gemeldet
+            now: Zeitpunkt des Snapshots (Standard: time.monotonic())
+
+        Returns:
+            Liste (Pfad, Zustand) der Dateien, die jetzt verarbeitet werden sollen
+        """
+        now = time.monotonic() if now is None else now
+
+        # Gelöschte Dateien vergessen
+        for tracked in (self._pending, self._handled):
+            for path in [path for path in tracked if path not in snapshot]:
+                del tracked[path]
+
+        settled = []
+        for path, state in snapshot.items():
+            if self._handled.get(path) == state:
+                continue
+            seen = self._pending.get(path)
+            if seen is None or seen[0] != state:
+                # Neu oder noch im Schreibvorgang: Wartezeit beginnt von vorn
+                self._pending[path] = (state, now)
+            elif now - seen[1] >= self.settle_sec and path not in busy:
+                del self._pending[path]
+                self._handled[path] = state
+                settled.append((path, state))
+        return sorted(settled)
@@ -0,0 +1,249 @@
+"""
+Job-Queue für den Koordinator/Worker-Modus (SQLite-Datei, ohne externen Broker)
+
+Der Koordinator stellt Jobs (Input-Datei + Outputs pro Preset) in die Queue;
+beliebig viele Worker - lokal oder auf anderen Rechnern mit demselben
+gemeinsamen Speicher - holen sich Jobs mit einer Lease und verlängern sie per
+Heartbeat. Läuft eine Lease ab (Worker abgestürzt, Rechner weg), wird der Job
+wieder eingereiht; nach QUEUE_MAX_ATTEMPTS Abläufen gilt er als fehlgeschlagen.
+
+Alle Zustandswechsel laufen in BEGIN IMMEDIATE-Transaktionen, damit zwei
+Worker nie denselben Job erhalten. SQLite nutzt dafür Datei-Locks - auf
+Netzlaufwerken müssen diese zuverlässig sein (NFSv4, SMB; kein WAL-Modus).
+Leases sind absolute Zeitpunkte - die Uhren der Rechner müssen synchron
+laufen (NTP), Abweichungen weit unter QUEUE_LEASE_SEC sind unkritisch.
+"""
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from config import QUEUE_LEASE_SEC, QUEUE_MAX_ATTEMPTS
+from batch_journal import json_default
+
+logger = logging.getLogger(__name__)
+
+# Job-Status in der Queue
+JOB_STATUSES = ('queued', 'running', 'done', 'failed')
+
+# Wartezeit auf Datei-Locks anderer Prozesse, bevor SQLite "database is locked" meldet
+SQLITE_TIMEOUT_SEC = 30.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id TEXT NOT NULL,
+    input_file TEXT NOT NULL,
+    outputs TEXT NOT NULL,        -- JSON {Preset: Output-Pfad}
+    config TEXT NOT NULL,         -- JSON Verarbeitungs-Einstellungen für den Worker
+    status TEXT NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    results TEXT,                 -- JSON Ergebnis-Dicts (status = done)
+    error TEXT,                   -- Fehlermeldung (status = failed)
+    enqueued_at REAL NOT NULL,
+    finished_at REAL,
+    collected INTEGER NOT NULL DEFAULT 0  -- Ergebnis vom Koordinator übernommen
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id, status);
+"""
+
+
+def default_worker_id() -> str:
+    """Eindeutige Worker-Kennung: Rechnername und Prozess-ID"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class QueuedJob:
+    """Ein von einem Worker übernommener Job"""
+
+    def __init__(self, job_id: int, batch_id: str, input_file: Path, outputs: Dict[str, Path],
+                 config: Dict[str, Any], attempts: int):
+        self.id = job_id
+        self.batch_id = batch_id
+        self.input_file = input_file
+        self.outputs = outputs
+        self.config = config
+        self.attempts = attempts
+
+
+class JobQueue:
+    """
+    Persistente Job-Queue in einer SQLite-Datei
+
+    Jede Operation öffnet eine eigene Verbindung - Heartbeat-Threads und
+    mehrere Prozesse greifen so unabhängig voneinander auf die Datei zu.
+    """
+
+    def __init__(self, path: Path, lease_sec: float = QUEUE_LEASE_SEC,
+                 max_attempts: int = QUEUE_MAX_ATTEMPTS):
+        if lease_sec <= 0:
+            raise ValueError(f"Lease-Dauer muss positiv sein ({lease_sec}s angegeben)")
+        self.path = Path(path)
+        self.lease_sec = lease_sec
+        self.max_attempts = max_attempts
+        conn = self._connect()
+        try:
+            conn.executescript(_SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=SQLITE_TIMEOUT_SEC, isolation_level=None)
+
+    @contextmanager
+    def _transaction(self):
+        """Schreib-Transaktion (BEGIN IMMEDIATE: Lock sofort, nicht erst beim ersten UPDATE)"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def enqueue(self, batch_id: str, jobs: Dict[Path, Dict[str, Path]],
+                config: Dict[str, Any]) -> Tuple[int, Dict[Path, Tuple[int, str]]]:
+        """
+        Stellt Jobs eines Batches in die Queue
+
+        Input-Dateien mit einem offenen Job (queued/running, auch aus einem anderen
+        Batch) werden nicht doppelt eingereiht - ihr Ergebnis gehört zum anderen Batch.
+
+        Returns:
+            (Anzahl neu eingereihter Jobs, Input-Datei → (Job-ID, Batch-ID) der offenen Jobs)
+        """
+        now = time.time()
+        added = 0
+        pending = {}
+        with self._transaction() as conn:
+            for input_file, outputs in jobs.items():
+                open_job = conn.execute(
+                    "SELECT id, batch_id FROM jobs WHERE input_file = ? AND status IN ('queued', 'running')",
+                    (str(input_file),)).fetchone()
+                if open_job is not None:
+                    logger.warning(f"⚠️  {input_file.name} bereits als Job {open_job[0]} (Batch {open_job[1]}) "
+                                   f"in der Queue - Ergebnis erscheint nicht in diesem Batch")
+                    pending[input_file] = (open_job[0], open_job[1])
+                    continue
+                conn.execute(
+                    "INSERT INTO jobs (batch_id, input_file, outputs, config, status, enqueued_at) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?)",
+                    (batch_id, str(input_file),
+                     json.dumps({preset: str(path) for preset, path in outputs.items()}),
+                     json.dumps(config), now))
+                added += 1
+        return added, pending
+
+    def _requeue_expired(self, conn: sqlite3.Connection, now: float) -> None:
+        expired = conn.execute(
+            "SELECT id, input_file, worker, attempts FROM jobs WHERE status = 'running' AND lease_until < ?",
+            (now,)).fetchall()
+        for job_id, input_file, worker, attempts in expired:
+            if attempts >= self.max_attempts:
+                logger.error(f"❌ Job {job_id} ({Path(input_file).name}): Lease von {worker} abgelaufen, "
+                             f"{attempts} Versuche - gilt als fehlgeschlagen")
+                conn.execute(
+                    "UPDATE jobs SET status = 'failed', worker = NULL, lease_until = NULL, finished_at = ?, "
+                    "error = ? WHERE id = ?",
+                    (now, f"Lease nach {attempts} Versuchen abgelaufen (Worker abgestürzt?)", job_id))
+            else:
+                logger.warning(f"♻️  Job {job_id} ({Path(input_file).name}): Lease von {worker} abgelaufen, "
+                               f"wird erneut eingereiht")
+                conn.execute("UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL WHERE id = ?",
+                             (job_id,))
+
+    def requeue_expired(self) -> None:
+        """Reiht Jobs mit abgelaufener Lease wieder ein (auch ohne wartende Worker)"""
+        with self._transaction() as conn:
+            self._requeue_expired(conn, time.time())
+
+    def claim(self, worker_id: str) -> Optional[QueuedJob]:
+        """Übernimmt den ältesten wartenden Job mit einer Lease (None = Queue leer)"""
+        now = time.time()
+        with self._transaction() as conn:
+            self._requeue_expired(conn, now)
+            row = conn.execute(
+                "SELECT id, batch_id, input_file, outputs, config, attempts FROM jobs "
+                "WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            job_id, batch_id, input_file, outputs, config, attempts = row
+            conn.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1 "
+                "WHERE id = ?",
+                (worker_id, now + self.lease_sec, job_id))
+        return QueuedJob(job_id, batch_id, Path(input_file),
+                         {preset: Path(path) for preset, path in json.loads(outputs).items()},
+                         json.loads(config), attempts + 1)
+
+    def release(self, job_id: int, worker_id: str) -> None:
+        """Gibt einen Job ohne Ergebnis zurück (Worker beendet), ohne einen Versuch zu zählen"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'queued', worker = NULL, lease_until = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (job_id, worker_id))
+
+    def heartbeat(self, job_id: int, worker_id: str) -> bool:
+        """Verlängert die Lease; False, wenn der Worker den Job nicht mehr hält"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + self.lease_sec, job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, results: List[Dict[str, Any]]) -> bool:
+        """Meldet einen Job als erledigt (nur mit gültiger Lease)"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'done', results = ?, lease_until = NULL, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (json.dumps(results, default=json_default), time.time(), job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str) -> bool:
+        """Meldet einen Job als fehlgeschlagen (nur mit gültiger Lease)"""
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, lease_until = NULL, finished_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (error, time.time(), job_id, worker_id))
+            return cursor.rowcount == 1
+
+    def batch_counts(self, batch_id: str) -> Dict[str, int]:
+        """Anzahl Jobs eines Batches pro Status"""
+        counts = dict.fromkeys(JOB_STATUSES, 0)
+        with self._transaction() as conn:
+            for status, count in conn.execute(
+                    "SELECT status, COUNT(*) FROM jobs WHERE batch_id = ? GROUP BY status", (batch_id,)):
+                counts[status] = count
+        return counts
+
+    def collect_finished(self, batch_id: str) -> List[Tuple[Path, str, Any]]:
+        """
+        Übernimmt neu abgeschlossene Jobs eines Batches (jeder Job wird einmal geliefert)
+
+        Returns:
+            Liste (Input-Datei, Status, Ergebnis-Dicts bzw. Fehlermeldung, Worker)
+        """
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT id, input_file, status, results, error, worker FROM jobs "
+                "WHERE batch_id = ? AND status IN ('done', 'failed') AND collected = 0 ORDER BY id",
+                (batch_id,)).fetchall()
+            conn.executemany("UPDATE jobs SET collected = 1 WHERE id = ?", [(row[0],) for row in rows])
+        return [(Path(input_file), status, json.loads(results) if status == 'done' else error, worker)
+                for _, input_file, status, results, error, worker in rows]
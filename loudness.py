@@ -0,0 +1,351 @@
+"""
+Lautheitsmessung nach ITU-R BS.1770-4 (K-Weighting, Gating) und EBU R128 (LRA)
+
+Blockgrenzen, Kanalgewichte und Gating entsprechen pyloudnorm.Meter.
+LoudnessMeter misst ganze Arrays in einem Durchlauf, StreamingLoudnessMeter
+blockweise mit übertragenem Filterzustand.
+"""
+
+import numpy as np
+from scipy import signal
+import logging
+
+from dsp import filter_cache, TruePeakMeter, TRUE_PEAK_BLOCK_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Gating-Parameter (ITU-R BS.1770-4)
+GATE_BLOCK_SEC = 0.400
+GATE_OVERLAP = 0.75
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+
+# Fenster für Momentary/Short-Term-Lautheit und Loudness Range (EBU R128 / Tech 3342)
+SHORT_TERM_WINDOW_SEC = 3.0
+LOUDNESS_STEP_SEC = 0.1
+LRA_RELATIVE_GATE_LU = -20.0
+LRA_PERCENTILES = (10, 95)
+
+# Kanalgewichte [L, R, C, Ls, Rs]
+CHANNEL_WEIGHTS = [1.0, 1.0, 1.0, 1.41, 1.41]
+
+
+def _biquad(gain_db: float, q: float, fc: float, rate: float, filter_type: str) -> np.ndarray:
+    """RBJ-Biquad als SOS-Zeile (identisch zu pyloudnorm.IIRfilter)"""
+    A = 10 ** (gain_db / 40.0)
+    w0 = 2.0 * np.pi * (fc / rate)
+    alpha = np.sin(w0) / (2.0 * q)
+
+    if filter_type == 'high_shelf':
+        b0 = A * ((A + 1) + (A - 1) * np.cos(w0) + 2 * np.sqrt(A) * alpha)
+        b1 = -2 * A * ((A - 1) + (A + 1) * np.cos(w0))
+        b2 = A * ((A + 1) + (A - 1) * np.cos(w0) - 2 * np.sqrt(A) * alpha)
+        a0 = (A + 1) - (A - 1) * np.cos(w0) + 2 * np.sqrt(A) * alpha
+        a1 = 2 * ((A - 1) - (A + 1) * np.cos(w0))
+        a2 = (A + 1) - (A - 1) * np.cos(w0) - 2 * np.sqrt(A) * alpha
+    else:  # high_pass
+        b0 = (1 + np.cos(w0)) / 2
+        b1 = -(1 + np.cos(w0))
+        b2 = (1 + np.cos(w0)) / 2
+        a0 = 1 + alpha
+        a1 = -2 * np.cos(w0)
+        a2 = 1 - alpha
+
+    return np.array([b0, b1, b2, a0, a1, a2]) / a0
+
+
+def k_weighting_sos(rate: float) -> np.ndarray:
+    """K-Weighting (High-Shelf + High-Pass) als SOS-Matrix für beliebige Sample-Rates"""
+    return np.vstack([
+        _biquad(4.0, 1 / np.sqrt(2), 1500.0, rate, 'high_shelf'),
+        _biquad(0.0, 0.5, 38.0, rate, 'high_pass'),
+    ])
+
+
+def gated_loudness(block_energies: np.ndarray) -> float:
+    """
+    Integrierte Lautheit aus kanalgewichteten Gating-Block-Energien
+
+    Zweistufiges Gating (absolut -70 LUFS, relativ -10 LU) wie pyloudnorm.
+    """
+    z = np.asarray(block_energies, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        block_loudness = -0.691 + 10.0 * np.log10(z)
+
+        above_absolute = block_loudness >= ABSOLUTE_GATE_LUFS
+        relative_gate = -0.691 + 10.0 * np.log10(np.mean(z[above_absolute])) + RELATIVE_GATE_LU
+
+        gated = (block_loudness > relative_gate) & (block_loudness > ABSOLUTE_GATE_LUFS)
+        mean_energy = np.nan_to_num(np.mean(z[gated])) if np.any(gated) else 0.0
+        return float(-0.691 + 10.0 * np.log10(mean_energy))
+
+
+def _energy_to_loudness(energy: np.ndarray) -> np.ndarray:
+    """Kanalgewichtete mittlere Energie → LUFS (-inf bei Stille)"""
+    with np.errstate(divide='ignore'):
+        return -0.691 + 10.0 * np.log10(energy)
+
+
+def loudness_range(short_term_energies: np.ndarray) -> float:
+    """
+    Loudness Range (LRA) in LU nach EBU Tech 3342
+
+    Short-Term-Werte mit absolutem Gate (-70 LUFS) und relativem Gate
+    (-20 LU unter der Lautheit der absolut gegateten Werte), LRA ist der
+    Abstand zwischen 10. und 95. Perzentil.
+    """
+    z = np.asarray(short_term_energies, dtype=np.float64)
+    z = z[_energy_to_loudness(z) > ABSOLUTE_GATE_LUFS]
+    if len(z) == 0:
+        return 0.0
+
+    relative_gate = _energy_to_loudness(np.mean(z)) + LRA_RELATIVE_GATE_LU
+    gated = _energy_to_loudness(z)
+    gated = gated[gated > relative_gate]
+    if len(gated) == 0:
+        return 0.0
+    low, high = np.percentile(gated, LRA_PERCENTILES)
+    return float(high - low)
+
+
+class LoudnessMeter:
+    """
+    Vektorisierter BS.1770-Meter für ganze Arrays bei beliebiger Sample-Rate
+
+    K-Weighting aller Kanäle in einem sosfilt-Aufruf (axis=0), danach eine
+    kumulierte Summe der kanalgewichteten Leistung: Jede Fensterenergie
+    (Gating-Block, Momentary, Short-Term) ist eine Differenz zweier Einträge.
+    Integrierte, Momentary- und Short-Term-Lautheit sowie LRA kommen damit
+    aus einem einzigen Durchlauf über das Signal.
+    """
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self._sos = filter_cache.get(('k_weighting', rate, 2), lambda: k_weighting_sos(rate))
+
+    def _cumulative_power(self, audio: np.ndarray) -> np.ndarray:
+        """Kumulierte kanalgewichtete Leistung nach K-Weighting (mit führender 0)"""
+        audio = np.asarray(audio, dtype=np.float64)
+        if audio.ndim == 1:
+            audio = audio[:, np.newaxis]
+        if audio.shape[1] > len(CHANNEL_WEIGHTS):
+            raise ValueError(f"Maximal {len(CHANNEL_WEIGHTS)} Kanäle unterstützt ({audio.shape[1]} angegeben)")
+
+        weighted = signal.sosfilt(self._sos, audio, axis=0)
+        power = np.square(weighted) @ np.array(CHANNEL_WEIGHTS[:audio.shape[1]])
+        return np.concatenate([[0.0], np.cumsum(power)])
+
+    def _window_energies(self, cumulative: np.ndarray, window_sec: float) -> np.ndarray:
+        """Mittlere Energie gleitender Fenster (Schrittweite LOUDNESS_STEP_SEC)"""
+        frames = len(cumulative) - 1
+        duration = frames / self.rate
+        if duration < window_sec:
+            return np.zeros(0)
+
+        if window_sec == GATE_BLOCK_SEC:
+            # Gating-Blöcke exakt wie pyloudnorm (gleiche Float-Arithmetik der Grenzen)
+            step = 1.0 - GATE_OVERLAP
+            count = int(np.round((duration - GATE_BLOCK_SEC) / (GATE_BLOCK_SEC * step))) + 1
+            j = np.arange(count)
+            lower = (GATE_BLOCK_SEC * (j * step) * self.rate).astype(int)
+            upper = (GATE_BLOCK_SEC * (j * step + 1) * self.rate).astype(int)
+        else:
+            count = int(np.floor((duration - window_sec) / LOUDNESS_STEP_SEC + 1e-9)) + 1
+            lower = (np.arange(count) * LOUDNESS_STEP_SEC * self.rate).astype(int)
+            upper = lower + int(round(window_sec * self.rate))
+
+        lower = np.minimum(lower, frames)
+        upper = np.minimum(upper, frames)
+        return (cumulative[upper] - cumulative[lower]) / (window_sec * self.rate)
+
+    def integrated_loudness(self, audio: np.ndarray) -> float:
+        """Integrierte Lautheit in LUFS (Drop-in für pyloudnorm.Meter.integrated_loudness)"""
+        if len(audio) < GATE_BLOCK_SEC * self.rate:
+            raise ValueError("Audio muss mindestens eine Gating-Block-Länge (400ms) lang sein")
+        return gated_loudness(self._window_energies(self._cumulative_power(audio), GATE_BLOCK_SEC))
+
+    def measure(self, audio: np.ndarray) -> dict:
+        """
+        Alle Lautheitswerte aus einem Durchlauf
+
+        Returns:
+            Dict mit 'integrated' (LUFS), 'momentary' / 'short_term' (Verläufe in LUFS,
+            100ms Raster), 'momentary_max', 'short_term_max' (LUFS) und 'lra' (LU)
+        """
+        if len(audio) < GATE_BLOCK_SEC * self.rate:
+            raise ValueError("Audio muss mindestens eine Gating-Block-Länge (400ms) lang sein")
+
+        cumulative = self._cumulative_power(audio)
+        block_energies = self._window_energies(cumulative, GATE_BLOCK_SEC)
+        short_term_energies = self._window_energies(cumulative, SHORT_TERM_WINDOW_SEC)
+
+        # Gating-Blöcke (400ms, 75% Overlap) sind zugleich die Momentary-Fenster
+        momentary = _energy_to_loudness(block_energies)
+        short_term = _energy_to_loudness(short_term_energies)
+
+        return {
+            'integrated': gated_loudness(block_energies),
+            'momentary': momentary,
+            'short_term': short_term,
+            'momentary_max': float(np.max(momentary)),
+            'short_term_max': float(np.max(short_term)) if len(short_term) else -float('inf'),
+            'lra': loudness_range(short_term_energies),
+        }
+
+
+class StreamingLoudnessMeter:
+    """
+    Integrierte Lautheit blockweise gemessen (konstanter Speicher pro Audio-Block)
+
+    K-Weighting läuft als sosfilt mit Zustand über alle Kanäle (axis=0).
+    Die kumulierte, kanalgewichtete Energie wird an den Gating-Blockgrenzen
+    festgehalten - gespeichert werden nur wenige Werte pro 100ms.
+    """
+
+    def __init__(self, rate: int, channels: int = 1, start_frame: int = 0):
+        if channels > len(CHANNEL_WEIGHTS):
+            raise ValueError(f"Maximal {len(CHANNEL_WEIGHTS)} Kanäle unterstützt ({channels} angegeben)")
+        self.rate = rate
+        self.channels = channels
+        self._sos = filter_cache.get(('k_weighting', rate, 2), lambda: k_weighting_sos(rate))
+        self._zi = np.zeros((self._sos.shape[0], 2, channels))
+        self._weights = np.array(CHANNEL_WEIGHTS[:channels])
+
+        # start_frame > 0: Meter für ein Segment ab dieser Position (siehe merge)
+        self._start = start_frame
+        self._frames = start_frame
+        self._energy = 0.0
+        self._boundaries = []       # Blockgrenzen in Samples (aufsteigend, absolut)
+        self._cumulative = []       # kumulierte Energie an den Blockgrenzen
+        step_frames = GATE_BLOCK_SEC * (1.0 - GATE_OVERLAP) * rate
+        self._next_block = max(0, int((start_frame - GATE_BLOCK_SEC * rate) / step_frames) - 1)
+
+    def _block_bounds(self, j: np.ndarray):
+        """Blockgrenzen l, u wie pyloudnorm (gleiche Float-Arithmetik)"""
+        step = 1.0 - GATE_OVERLAP
+        lower = (GATE_BLOCK_SEC * (j * step) * self.rate).astype(int)
+        upper = (GATE_BLOCK_SEC * (j * step + 1) * self.rate).astype(int)
+        return lower, upper
+
+    def process(self, block: np.ndarray) -> None:
+        """Verarbeitet einen Block (frames,) oder (frames, channels)"""
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        if len(block) == 0:
+            return
+
+        weighted, self._zi = signal.sosfilt(self._sos, block, axis=0, zi=self._zi)
+        power = np.square(weighted) @ self._weights
+        cumulative = self._energy + np.cumsum(power)
+
+        start = self._frames
+        end = start + len(block)
+
+        # Alle Blockgrenzen (untere/obere) im Bereich (start, end] festhalten
+        candidates = []
+        j = self._next_block
+        while True:
+            lower, upper = self._block_bounds(np.arange(j, j + 64))
+            candidates.extend([lower, upper])
+            open_blocks = np.flatnonzero(upper > end)
+            if open_blocks.size:
+                # Erster Block, dessen Ende noch aussteht
+                self._next_block = j + int(open_blocks[0])
+                break
+            j += 64
+
+        bounds = np.unique(np.concatenate(candidates))
+        bounds = bounds[(bounds > start) & (bounds <= end)]
+        self._boundaries.extend(bounds.tolist())
+        self._cumulative.extend(cumulative[bounds - start - 1].tolist())
+
+        self._frames = end
+        self._energy = float(cumulative[-1])
+
+    def warm_up(self, block: np.ndarray) -> None:
+        """Füllt nur den Filterzustand mit den Frames vor start_frame (ohne Energie zu zählen)"""
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        if len(block):
+            _, self._zi = signal.sosfilt(self._sos, block, axis=0, zi=self._zi)
+
+    def merge(self, other: 'StreamingLoudnessMeter') -> None:
+        """Hängt ein direkt anschließendes Segment an (other.start_frame == Ende dieses Meters)"""
+        if other._start != self._frames:
+            raise ValueError(f"Segment beginnt bei {other._start}, erwartet {self._frames}")
+        self._boundaries.extend(other._boundaries)
+        self._cumulative.extend(c + self._energy for c in other._cumulative)
+        self._energy += other._energy
+        self._frames = other._frames
+        self._zi = other._zi
+        self._next_block = other._next_block
+
+    def block_energies(self) -> np.ndarray:
+        """Kanalgewichtete mittlere Energie pro Gating-Block (400ms, 75% Overlap)"""
+        block_len = GATE_BLOCK_SEC * self.rate
+        duration = self._frames / self.rate
+        num_blocks = int(np.round((duration - GATE_BLOCK_SEC) / (GATE_BLOCK_SEC * (1.0 - GATE_OVERLAP)))) + 1
+        if num_blocks <= 0:
+            return np.zeros(0)
+
+        lower, upper = self._block_bounds(np.arange(num_blocks))
+        bounds = [0] + self._boundaries
+        cumulative = [0.0] + self._cumulative
+        if bounds[-1] != self._frames:
+            bounds.append(self._frames)
+            cumulative.append(self._energy)
+        bounds = np.array(bounds)
+        cumulative = np.array(cumulative)
+
+        # Positionen hinter dem Signalende zählen mit der Gesamtenergie
+        lower_energy = cumulative[np.searchsorted(bounds, np.minimum(lower, self._frames))]
+        upper_energy = cumulative[np.searchsorted(bounds, np.minimum(upper, self._frames))]
+        return (upper_energy - lower_energy) / block_len
+
+    def integrated_loudness(self) -> float:
+        """Integrierte Lautheit in LUFS"""
+        if self._frames < GATE_BLOCK_SEC * self.rate:
+            raise ValueError("Audio muss mindestens eine Gating-Block-Länge (400ms) lang sein")
+        return gated_loudness(self.block_energies())
+
+
+class LoudnessModel:
+    """
+    Lautheit und True Peak nach beliebigem Gain ohne erneute Messung
+
+    Ein Gain g skaliert jede Gating-Block-Energie mit 10^(g/10) und verschiebt
+    den True Peak um g dB. Die Block-Energien werden daher einmal gemessen;
+    danach kostet jede Abfrage O(Blöcke) statt eines Durchlaufs über das
+    Signal. Das Gating wird pro Abfrage neu ausgewertet und bleibt damit
+    exakt (auch wenn Blöcke durch den Gain über das absolute Gate steigen).
+    """
+
+    def __init__(self, block_energies: np.ndarray, true_peak_db: float):
+        self.block_energies = np.asarray(block_energies, dtype=np.float64)
+        self.true_peak_db = float(true_peak_db)
+
+    @classmethod
+    def measure(cls, audio: np.ndarray, rate: int,
+                block_size: int = TRUE_PEAK_BLOCK_SIZE) -> 'LoudnessModel':
+        """Misst Block-Energien und True Peak in einem gemeinsamen blockweisen Durchlauf"""
+        if len(audio) < GATE_BLOCK_SEC * rate:
+            raise ValueError("Audio muss mindestens eine Gating-Block-Länge (400ms) lang sein")
+
+        channels = audio.shape[1] if audio.ndim == 2 else 1
+        meter = StreamingLoudnessMeter(rate, channels)
+        true_peak = TruePeakMeter(channels)
+        for start in range(0, len(audio), block_size):
+            block = audio[start:start + block_size]
+            meter.process(block)
+            true_peak.process(block)
+        return cls(meter.block_energies(), true_peak.peak_db())
+
+    def loudness_after_gain(self, gain_db: float = 0.0) -> float:
+        """Integrierte Lautheit in LUFS nach einem Gain von gain_db"""
+        return gated_loudness(self.block_energies * 10 ** (gain_db / 10))
+
+    def peak_after_gain(self, gain_db: float = 0.0) -> float:
+        """True Peak in dBTP nach einem Gain von gain_db"""
+        return self.true_peak_db + gain_db
@@ -14,8 +14,9 @@ import time
 from datetime import datetime
 from pathlib import Path
 
-from config import INPUT_DIR, OUTPUT_DIR, LOGS_DIR
-from batch_processor import BatchProcessor
+from config import INPUT_DIR, OUTPUT_DIR, LOGS_DIR, QUEUE_FILENAME
+from batch_processor import BatchProcessor, run_queue_workers
+from job_queue import JobQueue
 from web_server import app
 
 
@@ -45,7 +46,9 @@ def setup_logging(log_level: str = "INFO") -> None:
 
 def parse_arguments() -> argparse.Namespace:
     """Parst Kommandozeilen-Argumente"""
-    from audio_processor import MASTERING_PRESETS
+    from audio_processor import MASTERING_PRESETS, ANALYSIS_MODES, DTYPES
+    from batch_processor import BACKENDS
+    from memory_budget import parse_memory_size
 
     parser = argparse.ArgumentParser(
         description="Audio Mastering Automation Tool",
@@ -56,6 +59,14 @@ Beispiele:
   python mastering_tool.py -i ./my_input -o ./my_output  # Benutzerdefinierte Ordner
   python mastering_tool.py --verbose          # Detaillierte Ausgabe
   python mastering_tool.py --preset gentle    # Gentle Preset für Suno AI
+  python mastering_tool.py --presets suno,gentle,aggressive  # A/B-Vergleich, ein Output pro Preset
+  python mastering_tool.py --workers 8 --backend process  # Parallel auf 8 CPU-Kernen
+  python mastering_tool.py --segment-workers 8  # Einzelne lange Datei auf 8 Kernen
+  python mastering_tool.py --watch --workers 4  # Daemon: neue Dateien sofort mastern
+  python mastering_tool.py --workers 16 --memory-budget 8G  # Viele Worker, begrenzter Speicher
+  python mastering_tool.py --resume           # Abgebrochenen Batch fortsetzen
+  python mastering_tool.py --coordinator --queue /mnt/shared/queue.db  # Jobs für Worker einreihen
+  python mastering_tool.py --worker --workers 8 --queue /mnt/shared/queue.db  # Worker auf diesem Rechner
 
 Verfügbare Presets:
 {chr(10).join(f"  {name}: {config['target_lufs']}dB LUFS" for name, config in MASTERING_PRESETS.items())}
@@ -84,6 +95,36 @@ Verfügbare Presets:
         help="Mastering-Preset verwenden (Standard: suno)"
     )
 
+    parser.add_argument(
+        "--presets",
+        type=str,
+        default=None,
+        help="Mehrere Presets kommagetrennt (z.B. suno,gentle,aggressive): ein Output pro Preset, "
+             "Dekodieren und High-Pass nur einmal pro Datei"
+    )
+
+    parser.add_argument(
+        "--analysis-mode",
+        type=str,
+        default="incremental",
+        choices=list(ANALYSIS_MODES),
+        help="Analyse zwischen den Schritten: full, incremental oder final-only (Standard: incremental)"
+    )
+
+    parser.add_argument(
+        "--dtype",
+        type=str,
+        default="float64",
+        choices=list(DTYPES),
+        help="Sample-Format der Verarbeitung (float32 halbiert den Speicherbedarf, Standard: float64)"
+    )
+
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Zwei-Pass-Streaming mit begrenztem Speicher (für sehr lange Dateien)"
+    )
+
     parser.add_argument(
         "--verbose", "-v",
         action="store_true",
@@ -97,6 +138,60 @@ Verfügbare Presets:
         help="Anzahl paralleler Worker (Standard: 1)"
     )
 
+    parser.add_argument(
+        "--backend",
+        type=str,
+        default="thread",
+        choices=list(BACKENDS),
+        help="Ausführungs-Backend: thread, process (ein AudioProcessor pro Prozess) oder pipeline (I/O überlappt mit DSP)"
+    )
+
+    parser.add_argument(
+        "--memory-budget",
+        type=parse_memory_size,
+        default=None,
+        help="Speicher-Budget für gleichzeitig laufende Jobs, z.B. 4G oder 512M "
+             "(Jobs warten, bis ihr geschätzter Bedarf frei ist; Standard: unbegrenzt)"
+    )
+
+    parser.add_argument(
+        "--segment-workers",
+        type=int,
+        default=1,
+        help="Threads pro Datei: lange Dateien in Segmenten parallel verarbeiten (Standard: 1 = aus)"
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Input-Ordner dauerhaft überwachen und neue/geänderte Dateien sofort mastern (Ctrl+C beendet)"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Zuletzt abgebrochenen Batch aus dem Journal im Output-Ordner fortsetzen"
+    )
+
+    parser.add_argument(
+        "--coordinator",
+        action="store_true",
+        help="Jobs in die Queue stellen und auf --worker-Prozesse warten (Report wie im Batch-Modus)"
+    )
+
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="Jobs aus der Queue abarbeiten (--workers Prozesse, lokal oder auf anderen Rechnern; Ctrl+C beendet)"
+    )
+
+    parser.add_argument(
+        "--queue",
+        type=str,
+        default=None,
+        help=f"SQLite-Job-Queue auf gemeinsamem Speicher (Standard: <Output-Ordner>/{QUEUE_FILENAME})"
+    )
+
     parser.add_argument(
         "--web",
         action="store_true",
@@ -170,10 +265,16 @@ def main() -> int:
         logger = logging.getLogger(__name__)
         logger.info("🎵 Audio Mastering Tool gestartet")
 
-        # Pfade validieren
         input_dir = Path(args.input)
         output_dir = Path(args.output)
+        queue_path = Path(args.queue) if args.queue else output_dir / QUEUE_FILENAME
+
+        if args.worker:
+            # Worker brauchen nur die Queue - Einstellungen und Pfade kommen mit jedem Job
+            run_queue_workers(queue_path, args.workers)
+            return 0
 
+        # Pfade validieren
         if not validate_directories(input_dir, output_dir):
             return 1
 
@@ -181,8 +282,26 @@ def main() -> int:
         logger.info(f"Output-Ordner: {output_dir.absolute()}")
 
         # Batch-Verarbeitung starten
-        processor = BatchProcessor(input_dir, output_dir, preset=args.preset)
-        results = processor.process_batch(max_workers=args.workers)
+        presets = [name.strip() for name in args.presets.split(',') if name.strip()] if args.presets else None
+        processor = BatchProcessor(input_dir, output_dir, preset=args.preset,
+                                   analysis_mode=args.analysis_mode, streaming=args.streaming,
+                                   dtype=args.dtype, backend=args.backend,
+                                   segment_workers=args.segment_workers, presets=presets,
+                                   memory_budget=args.memory_budget)
+
+        if args.watch:
+            # Daemon-Modus: bestehende veraltete Dateien und alle neuen laufen über denselben Pool
+            if args.web:
+                start_web_server(args.port)
+            stats = processor.watch(max_workers=args.workers)
+            logger.info(f"👀 Watch-Modus: {stats['files_processed']} Dateien verarbeitet "
+                        f"({stats['outputs_written']} Outputs), {stats['files_failed']} Fehler, "
+                        f"{stats['files_skipped']} Outputs übersprungen")
+            return 0
+        if args.coordinator:
+            results = processor.process_queued(JobQueue(queue_path))
+        else:
+            results = processor.process_batch(max_workers=args.workers, resume=args.resume)
 
         # Report generieren und anzeigen
         report = processor.generate_report(results)
@@ -192,11 +311,15 @@ def main() -> int:
         if results['files_failed'] > 0:
             logger.warning(f"⚠️  {results['files_failed']} Dateien konnten nicht verarbeitet werden")
             return 1
+        elif results.get('files_pending', 0) > 0:
+            logger.warning(f"⚠️  {results['files_pending']} Dateien laufen noch in einem anderen Batch der Queue")
+            return 1
         elif results['files_processed'] == 0:
             logger.warning("⚠️  Keine Dateien zur Verarbeitung gefunden")
             return 1
         else:
-            logger.info(f"✅ {results['files_processed']} Dateien erfolgreich verarbeitet")
+            logger.info(f"✅ {results['files_processed']} Dateien erfolgreich verarbeitet "
+                        f"({results['outputs_written']} Outputs)")
 
             # Webserver starten falls gewünscht
             if args.web:
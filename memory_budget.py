@@ -0,0 +1,85 @@
+"""
+Speicher-Budget für parallele Batch-Jobs (Admission Control)
+
+Jeder Job reserviert vor dem Start seinen geschätzten Spitzen-Speicher
+(AudioProcessor.estimate_memory). Ein Job startet nur, wenn die Reservierungen
+aller laufenden Jobs plus seine eigene unter dem Budget bleiben; sonst wartet
+er, bis laufende Jobs ihre Reservierung freigeben. Ein einzelner Job über dem
+Budget läuft allein, damit der Batch nicht blockiert.
+"""
+
+import logging
+import re
+from typing import Any, Dict
+
+logger = logging.getLogger(__name__)
+
+# Einheiten für --memory-budget (ohne Einheit: MB)
+SIZE_UNITS = {'': 1024**2, 'K': 1024, 'M': 1024**2, 'G': 1024**3, 'T': 1024**4}
+
+
+def parse_memory_size(text: str) -> int:
+    """Parst Größenangaben wie '512M', '4G', '1.5g' oder '2048' (MB) in Bytes"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*', text.upper())
+    if not match:
+        raise ValueError(f"Ungültige Speichergröße '{text}' (erlaubt: z.B. 512M, 4G, 2048)")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def format_mb(size_bytes: float) -> str:
+    return f"{size_bytes / 1024**2:.0f}MB"
+
+
+class MemoryBudget:
+    """
+    Buchführung der Speicher-Reservierungen laufender Jobs
+
+    Nicht thread-sicher: try_acquire und release laufen im steuernden Thread.
+    """
+
+    def __init__(self, budget_bytes: int):
+        if budget_bytes <= 0:
+            raise ValueError(f"Speicher-Budget muss positiv sein ({budget_bytes} Bytes angegeben)")
+        self.budget_bytes = budget_bytes
+        self.reserved_bytes = 0
+        self.running = 0
+        self.peak_reserved_bytes = 0
+        self.jobs_queued = 0       # Jobs, die mindestens einmal warten mussten
+        self.jobs_oversized = 0    # Jobs über dem Budget (allein gestartet)
+        self._waiting = set()
+
+    def try_acquire(self, name: str, estimate: int) -> bool:
+        """Reserviert estimate Bytes für einen Job, falls das Budget es zulässt"""
+        free = self.budget_bytes - self.reserved_bytes
+        if estimate > free and self.running > 0:
+            if name not in self._waiting:
+                self._waiting.add(name)
+                self.jobs_queued += 1
+                logger.info(f"⏳ {name} wartet: benötigt ~{format_mb(estimate)}, frei {format_mb(free)} "
+                            f"von {format_mb(self.budget_bytes)} ({self.running} Jobs aktiv)")
+            return False
+
+        if estimate > self.budget_bytes:
+            self.jobs_oversized += 1
+            logger.warning(f"⚠️  {name} benötigt ~{format_mb(estimate)} und überschreitet das Budget "
+                           f"{format_mb(self.budget_bytes)} - läuft allein")
+        self._waiting.discard(name)
+        self.reserved_bytes += estimate
+        self.running += 1
+        self.peak_reserved_bytes = max(self.peak_reserved_bytes, self.reserved_bytes)
+        logger.debug(f"▶️  {name} zugelassen (~{format_mb(estimate)}, "
+                     f"belegt {format_mb(self.reserved_bytes)}/{format_mb(self.budget_bytes)})")
+        return True
+
+    def release(self, estimate: int) -> None:
+        """Gibt die Reservierung eines beendeten Jobs frei"""
+        self.reserved_bytes -= estimate
+        self.running -= 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            'budget_mb': round(self.budget_bytes / 1024**2, 1),
+            'peak_reserved_mb': round(self.peak_reserved_bytes / 1024**2, 1),
+            'jobs_queued': self.jobs_queued,
+            'jobs_oversized': self.jobs_oversized
+        }
@@ -0,0 +1,148 @@
+"""
+Vorschau-Renditionen für die Weboberfläche (A/B-Player)
+
+Statt der vollen WAV-Dateien spielt der Browser kompakte Vorschau-Encodes
+(OGG Vorbis, ohne Vorbis-Unterstützung in libsndfile: FLAC). Sie werden beim
+ersten Abruf blockweise erzeugt und in einem Cache-Ordner abgelegt. Schlüssel
+ist (Pfad, Größe, mtime) der Quelle plus die Vorschau-Einstellungen - eine
+geänderte Datei bekommt automatisch eine neue Vorschau. Übersteigt der Cache
+PREVIEW_CACHE_MAX_MB, werden die am längsten nicht abgerufenen Vorschauen
+gelöscht (LRU).
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from config import PREVIEW_CACHE_MAX_MB, PREVIEW_COMPRESSION_LEVEL, PREVIEW_MAX_SAMPLE_RATE
+from dsp import StreamResampler
+
+logger = logging.getLogger(__name__)
+
+# Vorschau-Formate: Endung → (soundfile-Format, Subtyp, MIME-Typ)
+PREVIEW_FORMATS = {
+    'ogg': ('OGG', 'VORBIS', 'audio/ogg'),
+    'flac': ('FLAC', 'PCM_16', 'audio/flac'),
+}
+
+# Blockgröße beim Kodieren (kleine Blöcke: libsndfile-Vorbis verträgt keine sehr großen Writes)
+PREVIEW_BLOCK_FRAMES = 16384
+
+
+def default_preview_format() -> str:
+    """OGG Vorbis, falls libsndfile es schreiben kann, sonst FLAC"""
+    return 'ogg' if 'OGG' in sf.available_formats() else 'flac'
+
+
+class PreviewCache:
+    """
+    Größenbegrenzter LRU-Cache der Vorschau-Dateien
+
+    Thread-sicher; gleichzeitige Anfragen für dieselbe Vorschau warten auf
+    ein einziges Encoding.
+    """
+
+    def __init__(self, cache_dir: Path, max_bytes: int = PREVIEW_CACHE_MAX_MB * 1024 * 1024,
+                 preview_format: str = None):
+        preview_format = preview_format or default_preview_format()
+        if preview_format not in PREVIEW_FORMATS:
+            raise ValueError(f"Unbekanntes Vorschau-Format '{preview_format}' (erlaubt: {', '.join(PREVIEW_FORMATS)})")
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.extension = preview_format
+        self.format, self.subtype, self.mimetype = PREVIEW_FORMATS[preview_format]
+        self._lock = threading.Lock()
+        self._render_locks: Dict[str, threading.Lock] = {}
+        self._entries: Dict[str, Tuple[int, float]] = {}   # Dateiname → (Größe, letzter Abruf)
+        self._scanned = False
+
+    def _scan(self) -> None:
+        """Liest den Cache-Ordner einmalig ein (Vorschauen früherer Läufe bleiben gültig)"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(f".{self.extension}"):
+                stat = entry.stat()
+                self._entries[entry.name] = (stat.st_size, stat.st_mtime)
+        self._scanned = True
+
+    def key(self, source: Path) -> str:
+        """Cache-Schlüssel (auch ETag) einer Quelldatei im aktuellen Zustand"""
+        stat = os.stat(source)
+        identity = (f"{Path(source).resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{self.extension}|"
+                    f"{self.subtype}|{PREVIEW_COMPRESSION_LEVEL}|{PREVIEW_MAX_SAMPLE_RATE}")
+        return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, source: Path) -> Tuple[Path, str]:
+        """
+        Liefert die Vorschau einer Quelldatei (erzeugt sie bei Bedarf)
+
+        Returns:
+            (Pfad der Vorschau, Cache-Schlüssel für den ETag)
+        """
+        key = self.key(source)
+        name = f"{key}.{self.extension}"
+        path = self.cache_dir / name
+        with self._lock:
+            if not self._scanned:
+                self._scan()
+            render_lock = self._render_locks.setdefault(key, threading.Lock())
+
+        with render_lock:
+            with self._lock:
+                cached = name in self._entries and path.exists()
+            if not cached:
+                self._render(Path(source), path)
+            with self._lock:
+                self._entries[name] = (path.stat().st_size, time.time())
+                self._render_locks.pop(key, None)
+                self._evict(keep=name)
+        os.utime(path)  # letzter Abruf bleibt über Neustarts erhalten (Reihenfolge beim Einlesen)
+        return path, key
+
+    def _render(self, source: Path, path: Path) -> None:
+        tmp_path = path.with_name(f".{path.stem}.partial{path.suffix}")
+        info = sf.info(str(source))
+        rate = min(info.samplerate, PREVIEW_MAX_SAMPLE_RATE)
+        resampler = StreamResampler(info.samplerate, rate) if rate != info.samplerate else None
+        logger.info(f"🎧 Erzeuge Vorschau für {source.name} ({self.extension}, {rate}Hz)")
+        try:
+            with sf.SoundFile(str(tmp_path), 'w', samplerate=rate, channels=info.channels,
+                              format=self.format, subtype=self.subtype,
+                              compression_level=PREVIEW_COMPRESSION_LEVEL) as out:
+                for block in sf.blocks(str(source), blocksize=PREVIEW_BLOCK_FRAMES, dtype='float32',
+                                       always_2d=True):
+                    out.write(resampler.process(block) if resampler is not None else block)
+                if resampler is not None:
+                    out.write(resampler.process(np.zeros((0, info.channels), dtype=np.float32), final=True))
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        logger.info(f"🎧 Vorschau {source.name}: {info.frames * info.channels * 2 / 1024**2:.1f}MB PCM → "
+                    f"{path.stat().st_size / 1024**2:.1f}MB")
+
+    def _evict(self, keep: str) -> None:
+        """Löscht die am längsten nicht abgerufenen Vorschauen, bis der Cache ins Budget passt"""
+        total = sum(size for size, _ in self._entries.values())
+        for name in sorted(self._entries, key=lambda n: self._entries[n][1]):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            size, _ = self._entries.pop(name)
+            (self.cache_dir / name).unlink(missing_ok=True)
+            total -= size
+            logger.debug(f"Vorschau {name} aus dem Cache entfernt (LRU)")
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'entries': len(self._entries),
+                    'size_bytes': sum(size for size, _ in self._entries.values()),
+                    'max_bytes': self.max_bytes}
@@ -0,0 +1,298 @@
+"""
+Streaming-Ingest für Uploads der Weboberfläche
+
+Der Request-Body (multipart/form-data) wird blockweise gelesen und direkt in
+den Input-Ordner geschrieben - ohne Zwischenpuffer von Flask/Werkzeug. Im
+selben Durchlauf wird die Größengrenze geprüft, sobald die Bytes ankommen,
+der SHA-256 berechnet und bei WAV-Dateien die integrierte Lautheit gemessen
+(PCM/Float direkt aus dem Byte-Strom, K-Weighting mit StreamingLoudnessMeter).
+Komprimierte Formate (MP3, FLAC) und AIFF liefern keine Schätzung; für sie
+bleibt die Analyse der gespeicherten Datei.
+"""
+
+import hashlib
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+from werkzeug.utils import secure_filename
+
+from loudness import StreamingLoudnessMeter
+
+logger = logging.getLogger(__name__)
+
+# Lesegröße für den Request-Body
+UPLOAD_CHUNK_BYTES = 256 * 1024
+
+# Namensteil unvollständiger Uploads (keine Audio-Endung: Batch und Watch-Modus ignorieren sie)
+UPLOAD_PARTIAL_SUFFIX = ".upload"
+
+# WAVE-Formatkennungen im fmt-Chunk
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_IEEE_FLOAT = 0x0003
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class UploadTooLarge(ValueError):
+    """Upload überschreitet MAX_FILE_SIZE_MB (HTTP 413)"""
+
+
+class WavStreamDecoder:
+    """
+    Dekodiert WAV-Samples aus einem Byte-Strom in beliebig geschnittenen Stücken
+
+    Unterstützt PCM 8/16/24/32 Bit und Float 32/64 Bit (auch WAVE_FORMAT_EXTENSIBLE).
+    Die Skalierung entspricht soundfile (z.B. int16 / 32768), die Samples sind
+    also identisch mit sf.read(..., dtype='float64').
+    """
+
+    def __init__(self, on_samples: Callable[[np.ndarray, int, int], None]):
+        self.on_samples = on_samples   # Callback (Samples (frames, channels), Sample-Rate, Kanäle)
+        self.supported = True
+        self.sample_rate: Optional[int] = None
+        self.channels: Optional[int] = None
+        self.frames = 0
+        self._buffer = bytearray()
+        self._state = 'riff'
+        self._remaining = 0            # Restbytes des aktuellen Chunks
+        self._chunk_padding = 0
+        self._dtype = None
+
+    def feed(self, data: bytes) -> None:
+        if not self.supported:
+            return
+        self._buffer += data
+        try:
+            while self._step():
+                pass
+        except ValueError as e:
+            logger.debug(f"WAV-Strom nicht dekodierbar: {e}")
+            self.supported = False
+            self._buffer.clear()
+
+    def _take(self, count: int) -> Optional[bytes]:
+        if len(self._buffer) < count:
+            return None
+        taken = bytes(self._buffer[:count])
+        del self._buffer[:count]
+        return taken
+
+    def _step(self) -> bool:
+        """Verarbeitet so viel wie möglich; False, wenn mehr Daten nötig sind"""
+        if self._state == 'riff':
+            header = self._take(12)
+            if header is None:
+                return False
+            if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+                raise ValueError("kein RIFF/WAVE")
+            self._state = 'chunk'
+            return True
+
+        if self._state == 'chunk':
+            header = self._take(8)
+            if header is None:
+                return False
+            chunk_id, size = header[:4], struct.unpack('<I', header[4:])[0]
+            self._chunk_padding = size & 1
+            if chunk_id == b'fmt ':
+                self._remaining = size
+                self._state = 'fmt'
+            elif chunk_id == b'data':
+                if self._dtype is None:
+                    raise ValueError("data-Chunk vor fmt-Chunk")
+                # Größe 0 oder 0xFFFFFFFF: Schreiber kannte die Länge nicht - bis zum Ende lesen
+                self._remaining = size if 0 < size < 0xFFFFFFFF else None
+                self._state = 'data'
+            else:
+                self._remaining = size + self._chunk_padding
+                self._state = 'skip'
+            return True
+
+        if self._state == 'fmt':
+            fmt = self._take(self._remaining + self._chunk_padding)
+            if fmt is None:
+                return False
+            self._parse_fmt(fmt)
+            self._state = 'chunk'
+            return True
+
+        if self._state == 'skip':
+            skipped = min(self._remaining, len(self._buffer))
+            del self._buffer[:skipped]
+            self._remaining -= skipped
+            if self._remaining > 0:
+                return False
+            self._state = 'chunk'
+            return True
+
+        # data: nur vollständige Frames dekodieren
+        available = len(self._buffer) if self._remaining is None else min(len(self._buffer), self._remaining)
+        usable = available - available % self._frame_bytes
+        if usable > 0:
+            self._decode(self._take(usable))
+            if self._remaining is not None:
+                self._remaining -= usable
+        if self._remaining == 0:
+            self._remaining = self._chunk_padding
+            self._state = 'skip'
+            return True
+        return False
+
+    def _parse_fmt(self, fmt: bytes) -> None:
+        if len(fmt) < 16:
+            raise ValueError("fmt-Chunk zu kurz")
+        format_tag, channels, sample_rate, _, _, bits = struct.unpack('<HHIIHH', fmt[:16])
+        if format_tag == WAVE_FORMAT_EXTENSIBLE:
+            if len(fmt) < 26:
+                raise ValueError("WAVE_FORMAT_EXTENSIBLE ohne Subformat")
+            format_tag = struct.unpack('<H', fmt[24:26])[0]
+        if format_tag == WAVE_FORMAT_PCM and bits in (8, 16, 24, 32):
+            self._dtype = f"int{bits}"
+        elif format_tag == WAVE_FORMAT_IEEE_FLOAT and bits in (32, 64):
+            self._dtype = f"float{bits}"
+        else:
+            raise ValueError(f"Format {format_tag:#06x} mit {bits} Bit nicht unterstützt")
+        if channels == 0:
+            raise ValueError("0 Kanäle")
+        self.channels = channels
+        self.sample_rate = sample_rate
+        self._frame_bytes = channels * bits // 8
+
+    def _decode(self, raw: bytes) -> None:
+        if self._dtype == 'int8':
+            samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float64) - 128) / 128
+        elif self._dtype == 'int16':
+            samples = np.frombuffer(raw, dtype='<i2') / 32768
+        elif self._dtype == 'int24':
+            triplets = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+            values = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+            samples = np.where(values >= 1 << 23, values - (1 << 24), values) / 8388608
+        elif self._dtype == 'int32':
+            samples = np.frombuffer(raw, dtype='<i4') / 2147483648
+        else:
+            samples = np.frombuffer(raw, dtype='<f4' if self._dtype == 'float32' else '<f8').astype(np.float64)
+        samples = samples.reshape(-1, self.channels)
+        self.frames += len(samples)
+        self.on_samples(samples, self.sample_rate, self.channels)
+
+
+class UploadSink:
+    """
+    Schreibt einen Upload blockweise in den Input-Ordner
+
+    Bis zum Abschluss liegt die Datei unter einem temporären Namen; erst finish()
+    benennt sie atomar um. Hash und Lautheitsschätzung laufen im selben Durchlauf.
+    """
+
+    def __init__(self, target_path: Path, max_bytes: int):
+        self.target_path = Path(target_path)
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self._tmp_path = self.target_path.with_name(f".{self.target_path.name}{UPLOAD_PARTIAL_SUFFIX}")
+        self._file = open(self._tmp_path, 'wb')
+        self._digest = hashlib.sha256()
+        self._meter: Optional[StreamingLoudnessMeter] = None
+        self._wav = WavStreamDecoder(self._measure) if self.target_path.suffix.lower() == '.wav' else None
+
+    def _measure(self, samples: np.ndarray, sample_rate: int, channels: int) -> None:
+        if self._meter is None:
+            try:
+                self._meter = StreamingLoudnessMeter(sample_rate, channels)
+            except ValueError as e:
+                logger.debug(f"Keine Lautheitsschätzung für {self.target_path.name}: {e}")
+                self._wav.supported = False
+                return
+        self._meter.process(samples)
+
+    def write(self, data: bytes) -> None:
+        self.size_bytes += len(data)
+        if self.size_bytes > self.max_bytes:
+            raise UploadTooLarge(f"{self.target_path.name} ist zu groß "
+                                 f"(> {self.max_bytes / (1024 * 1024):.0f}MB)")
+        self._file.write(data)
+        self._digest.update(data)
+        if self._wav is not None:
+            self._wav.feed(data)
+
+    def finish(self) -> Dict[str, Any]:
+        """Schließt den Upload ab und liefert Größe, Hash und (bei WAV) die Lautheit"""
+        self._file.close()
+
+        info = {'size_bytes': self.size_bytes, 'sha256': self._digest.hexdigest(), 'lufs': None}
+        if self._wav is not None and self._wav.supported and self._meter is not None:
+            try:
+                lufs = self._meter.integrated_loudness()
+            except ValueError as e:
+                # z.B. kürzer als ein Gating-Block (400ms) - Preset-Empfehlung über die Datei-Analyse
+                logger.debug(f"Keine Lautheitsschätzung für {self.target_path.name}: {e}")
+                lufs = float('nan')
+            info.update({
+                'lufs': round(lufs, 2) if np.isfinite(lufs) else None,
+                'sample_rate': self._wav.sample_rate,
+                'channels': self._wav.channels,
+                'duration_sec': round(self._wav.frames / self._wav.sample_rate, 2)
+            })
+        os.replace(self._tmp_path, self.target_path)
+        return info
+
+    def abort(self) -> None:
+        self._file.close()
+        self._tmp_path.unlink(missing_ok=True)
+
+
+def ingest_multipart(stream, boundary: bytes, target_dir: Path, max_bytes: int,
+                     allowed: Callable[[str], bool], field_name: str = 'file') -> List[Dict[str, Any]]:
+    """
+    Liest einen multipart/form-data-Body und speichert alle Dateien des Feldes field_name
+
+    Args:
+        stream: Request-Body (request.stream)
+        boundary: Multipart-Boundary aus dem Content-Type
+        target_dir: Ziel-Ordner (Input-Ordner)
+        max_bytes: Größengrenze pro Datei
+        allowed: Prüfung des Original-Dateinamens (Endung)
+
+    Returns:
+        Pro Datei: filename, size_bytes, sha256, lufs (None ohne Schätzung) und Audio-Eckdaten
+
+    Raises:
+        UploadTooLarge: eine Datei überschreitet max_bytes (bereits fertige Dateien bleiben)
+        ValueError: Dateityp nicht erlaubt oder Body fehlerhaft
+    """
+    decoder = MultipartDecoder(boundary)
+    uploaded = []
+    sink: Optional[UploadSink] = None
+    filename = None
+    try:
+        while True:
+            chunk = stream.read(UPLOAD_CHUNK_BYTES)
+            decoder.receive_data(chunk or None)
+            event = decoder.next_event()
+            while not isinstance(event, (NeedData, Epilogue)):
+                if isinstance(event, File) and event.name == field_name and event.filename:
+                    if not allowed(event.filename):
+                        raise ValueError(f"Dateityp von {event.filename} nicht erlaubt")
+                    filename = secure_filename(event.filename)
+                    if not filename:
+                        raise ValueError(f"Ungültiger Dateiname {event.filename}")
+                    sink = UploadSink(Path(target_dir) / filename, max_bytes)
+                elif isinstance(event, (File, Field)):
+                    sink = None  # andere Felder und leere Datei-Felder werden ignoriert
+                    filename = None
+                elif isinstance(event, Data) and sink is not None:
+                    sink.write(event.data)
+                    if not event.more_data:
+                        uploaded.append({'filename': filename, **sink.finish()})
+                        sink = None
+                event = decoder.next_event()
+            if isinstance(event, Epilogue) or not chunk:
+                break
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+        raise
+    return uploaded
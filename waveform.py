@@ -0,0 +1,230 @@
+"""
+Wellenform-Übersichten (Min/Max/RMS-Pyramide als Binär-Sidecar)
+
+Zum Zeichnen einer Wellenform braucht der Browser nicht das Audio, sondern pro
+Bildpunkt Minimum, Maximum und RMS. WaveformBuilder berechnet die feinste Stufe
+(WAVEFORM_SAMPLES_PER_BIN Frames pro Wert, alle Kanäle zusammengefasst)
+blockweise in einem vektorisierten Durchlauf; die gröberen Stufen entstehen
+daraus paarweise (reduceat), bis höchstens WAVEFORM_MIN_BINS Werte übrig sind.
+
+Die Pyramide liegt als Sidecar neben der Audiodatei (".song.wav.peaks"):
+Header (WAVEFORM_HEADER) und danach alle Stufen, fein → grob, als int16
+little-endian mit drei Werten pro Bin (min, max, rms; Skala 32767). Der Header
+enthält Größe und mtime der Audiodatei - eine geänderte Datei macht das Sidecar
+ungültig. Eine Stunde Audio ergibt bei 2000 Bildpunkten 12KB.
+"""
+
+import logging
+import os
+import struct
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+from config import WAVEFORM_SAMPLES_PER_BIN, WAVEFORM_MIN_BINS
+
+logger = logging.getLogger(__name__)
+
+# Sidecar-Format: Kennung, Version, Kanäle, Sample-Rate, Frames pro Bin (feinste Stufe),
+# Frames, Größe und mtime (ns) der Audiodatei, Anzahl Stufen
+WAVEFORM_MAGIC = b'WFPK'
+WAVEFORM_VERSION = 1
+WAVEFORM_HEADER = struct.Struct('<4sHHIIQQqH')
+
+# Endung der Sidecar-Dateien (keine Audio-Endung: Batch und Watch-Modus ignorieren sie)
+WAVEFORM_SUFFIX = ".peaks"
+
+# Vollausschlag in der int16-Darstellung
+WAVEFORM_SCALE = 32767
+
+# Frames pro vektorisiertem Rechenschritt (begrenzt Zwischenspeicher bei ganzen Tracks)
+WAVEFORM_CHUNK_FRAMES = WAVEFORM_SAMPLES_PER_BIN * 4096
+
+# Blockgröße beim nachträglichen Erzeugen aus einer Datei
+WAVEFORM_READ_FRAMES = 65536
+
+
+def sidecar_path(audio_path: Path) -> Path:
+    """Pfad des Sidecars einer Audiodatei (versteckt, im selben Ordner)"""
+    audio_path = Path(audio_path)
+    return audio_path.with_name(f".{audio_path.name}{WAVEFORM_SUFFIX}")
+
+
+def _level_bins(base_bins: int, levels: int) -> List[int]:
+    """Anzahl Werte pro Stufe (jede Stufe fasst zwei Werte der feineren zusammen)"""
+    bins = [base_bins]
+    for _ in range(levels - 1):
+        bins.append((bins[-1] + 1) // 2)
+    return bins
+
+
+class WaveformPyramid:
+    """Fertige Pyramide: levels[0] ist die feinste Stufe, je (Bins, 3) int16 mit min, max, rms"""
+
+    def __init__(self, sample_rate: int, channels: int, frames: int, samples_per_bin: int,
+                 levels: List[np.ndarray]):
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.frames = frames
+        self.samples_per_bin = samples_per_bin
+        self.levels = levels
+
+    def save(self, audio_path: Path) -> Path:
+        """Schreibt das Sidecar atomar (gültig für den aktuellen Stand der Audiodatei)"""
+        stat = os.stat(audio_path)
+        path = sidecar_path(audio_path)
+        tmp_path = path.with_name(path.name + '.tmp')
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(WAVEFORM_HEADER.pack(WAVEFORM_MAGIC, WAVEFORM_VERSION, self.channels, self.sample_rate,
+                                             self.samples_per_bin, self.frames, stat.st_size, stat.st_mtime_ns,
+                                             len(self.levels)))
+                for level in self.levels:
+                    f.write(level.astype('<i2', copy=False).tobytes())
+            os.replace(tmp_path, path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return path
+
+
+class WaveformBuilder:
+    """
+    Berechnet die Wellenform-Pyramide blockweise
+
+    process() nimmt Blöcke beliebiger Länge (z.B. die Blöcke des Streaming-Writers
+    oder ein ganzes Array); Reste unter einem Bin werden übertragen. Gespeichert
+    wird nur die feinste Stufe (3 Werte pro WAVEFORM_SAMPLES_PER_BIN Frames).
+    """
+
+    def __init__(self, sample_rate: int, channels: int, samples_per_bin: int = WAVEFORM_SAMPLES_PER_BIN):
+        if samples_per_bin < 1:
+            raise ValueError(f"Frames pro Bin muss mindestens 1 sein ({samples_per_bin} angegeben)")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.samples_per_bin = samples_per_bin
+        self.frames = 0
+        self._carry = np.zeros((0, channels))
+        self._mins: List[np.ndarray] = []
+        self._maxs: List[np.ndarray] = []
+        self._sum_squares: List[np.ndarray] = []
+
+    def process(self, block: np.ndarray) -> None:
+        """Verarbeitet einen Block (frames,) oder (frames, channels)"""
+        block = np.asarray(block)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        if len(block) == 0:
+            return
+        self.frames += len(block)
+        if len(self._carry):
+            block = np.concatenate([self._carry, block])
+
+        # Eine Zeile pro Bin mit allen Frames und Kanälen - min/max/Quadratsumme je Zeile
+        full = len(block) - len(block) % self.samples_per_bin
+        chunk = max(self.samples_per_bin, WAVEFORM_CHUNK_FRAMES - WAVEFORM_CHUNK_FRAMES % self.samples_per_bin)
+        for start in range(0, full, chunk):
+            rows = np.ascontiguousarray(block[start:min(full, start + chunk)]).reshape(
+                -1, self.samples_per_bin * self.channels)
+            self._mins.append(rows.min(axis=1))
+            self._maxs.append(rows.max(axis=1))
+            self._sum_squares.append(np.einsum('ij,ij->i', rows, rows, dtype=np.float64))
+        self._carry = block[full:].copy()
+
+    def finish(self) -> WaveformPyramid:
+        """Schließt den letzten (kürzeren) Bin ab und baut die gröberen Stufen"""
+        mins, maxs, sum_squares = list(self._mins), list(self._maxs), list(self._sum_squares)
+        base_bins = sum(len(m) for m in mins)
+        counts = np.full(base_bins, self.samples_per_bin * self.channels, dtype=np.float64)
+        if len(self._carry):
+            mins.append(self._carry.min(keepdims=True).ravel())
+            maxs.append(self._carry.max(keepdims=True).ravel())
+            sum_squares.append(np.array([np.sum(np.square(self._carry, dtype=np.float64))]))
+            counts = np.append(counts, self._carry.size)
+
+        mins = np.concatenate(mins) if mins else np.zeros(0)
+        maxs = np.concatenate(maxs) if maxs else np.zeros(0)
+        sum_squares = np.concatenate(sum_squares) if sum_squares else np.zeros(0)
+
+        levels = []
+        while True:
+            rms = np.sqrt(sum_squares / counts) if len(counts) else np.zeros(0)
+            values = np.stack([mins, maxs, rms], axis=1) * WAVEFORM_SCALE
+            levels.append(np.round(np.clip(values, -WAVEFORM_SCALE, WAVEFORM_SCALE)).astype('<i2'))
+            if len(mins) <= WAVEFORM_MIN_BINS:
+                break
+            pairs = np.arange(0, len(mins), 2)
+            mins = np.minimum.reduceat(mins, pairs)
+            maxs = np.maximum.reduceat(maxs, pairs)
+            sum_squares = np.add.reduceat(sum_squares, pairs)
+            counts = np.add.reduceat(counts, pairs)
+
+        return WaveformPyramid(self.sample_rate, self.channels, self.frames, self.samples_per_bin, levels)
+
+
+def load_waveform(audio_path: Path, bins: int) -> Optional[Dict[str, Any]]:
+    """
+    Liest eine Stufe aus dem Sidecar - die gröbste mit mindestens bins Werten
+    (bzw. die feinste, falls keine so fein ist)
+
+    Returns:
+        Dict mit sample_rate, channels, frames, samples_per_bin, bins, data ((Bins, 3) int16)
+        und etag; None, wenn kein gültiges Sidecar existiert
+    """
+    path = sidecar_path(audio_path)
+    try:
+        stat = os.stat(audio_path)
+        with open(path, 'rb') as f:
+            header = f.read(WAVEFORM_HEADER.size)
+            if len(header) < WAVEFORM_HEADER.size:
+                return None
+            (magic, version, channels, sample_rate, samples_per_bin, frames,
+             size, mtime_ns, level_count) = WAVEFORM_HEADER.unpack(header)
+            if (magic != WAVEFORM_MAGIC or version != WAVEFORM_VERSION or level_count == 0
+                    or size != stat.st_size or mtime_ns != stat.st_mtime_ns):
+                return None
+
+            level_bins = _level_bins(-(-frames // samples_per_bin), level_count)
+            level = 0
+            while level + 1 < level_count and level_bins[level + 1] >= bins:
+                level += 1
+            f.seek(WAVEFORM_HEADER.size + sum(level_bins[:level]) * 3 * 2)
+            data = np.fromfile(f, dtype='<i2', count=level_bins[level] * 3)
+    except FileNotFoundError:
+        return None
+    if len(data) != level_bins[level] * 3:
+        return None   # Sidecar abgeschnitten
+
+    return {
+        'sample_rate': sample_rate,
+        'channels': channels,
+        'frames': frames,
+        'samples_per_bin': samples_per_bin << level,
+        'bins': level_bins[level],
+        'data': data.reshape(-1, 3),
+        'etag': f"{size:x}-{mtime_ns:x}-{samples_per_bin << level}"
+    }
+
+
+def build_waveform(audio_path: Path) -> Path:
+    """Erzeugt das Sidecar einer vorhandenen Audiodatei (ein blockweiser Lesedurchlauf)"""
+    info = sf.info(str(audio_path))
+    builder = WaveformBuilder(info.samplerate, info.channels)
+    for block in sf.blocks(str(audio_path), blocksize=WAVEFORM_READ_FRAMES, dtype='float32', always_2d=True):
+        builder.process(block)
+    path = builder.finish().save(audio_path)
+    logger.info(f"🌊 Wellenform für {Path(audio_path).name} erzeugt ({path.stat().st_size / 1024:.0f}KB)")
+    return path
+
+
+def waveform_level(audio_path: Path, bins: int) -> Dict[str, Any]:
+    """Stufe wie load_waveform; fehlt das Sidecar oder ist es veraltet, wird es erst erzeugt"""
+    level = load_waveform(audio_path, bins)
+    if level is None:
+        build_waveform(audio_path)
+        level = load_waveform(audio_path, bins)
+        if level is None:
+            raise RuntimeError(f"Wellenform für {Path(audio_path).name} nicht lesbar (Datei während des Lesens geändert?)")
+    return level
@@ -0,0 +1,189 @@
+"""
+Hintergrund-Jobs für die Weboberfläche
+
+/process liefert sofort eine Job-ID; der Batch läuft auf einem begrenzten
+Thread-Pool. Jeder Job sammelt seine Ereignisse (Status, Start/Ende pro Datei)
+in einer Liste - Clients fragen den Zustand per Polling ab oder folgen dem
+Event-Stream (Server-Sent Events, Wiederaufnahme über Last-Event-ID).
+Jobs auf denselben Output-Ordner laufen nacheinander, da sie sich Manifest,
+Journal und Output-Namen teilen.
+"""
+
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from analysis_index import AnalysisIndex
+from batch_journal import json_default
+from batch_processor import BatchProcessor
+from config import WEB_JOB_WORKERS, WEB_JOB_HISTORY
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    """Ein Ereignis im Server-Sent-Events-Format"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=json_default, ensure_ascii=False)}\n\n"
+
+
+class WebJob:
+    """Zustand und Ereignis-Log eines Batch-Jobs (thread-sicher)"""
+
+    def __init__(self, job_id: str, preset: str):
+        self.id = job_id
+        self.preset = preset
+        self.status = 'queued'
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.files: Dict[str, Dict[str, Any]] = {}   # Dateiname → Status, Outputs, LUFS, Fehler
+        self.files_skipped = 0
+        self.summary: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.events: List[Tuple[str, Dict[str, Any]]] = []
+        self._changed = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def emit(self, event: str, data: Dict[str, Any]) -> None:
+        """Wendet ein Ereignis auf den Zustand an und weckt wartende Streams"""
+        with self._changed:
+            if event == 'batch_start':
+                self.files = {name: {'status': 'queued'} for name in data['files']}
+                self.files_skipped = data['skipped']
+            elif event == 'file_start':
+                self.files[data['file']] = {'status': 'running'}
+            elif event == 'file_done':
+                self.files[data['file']] = {'status': 'done', 'outputs': data['outputs'], 'lufs': data['lufs']}
+            elif event == 'file_failed':
+                self.files[data['file']] = {'status': 'failed', 'error': data['error']}
+            self.events.append((event, data))
+            self._changed.notify_all()
+
+    def start(self) -> None:
+        with self._changed:
+            self.status = 'running'
+            self.started_at = time.time()
+            self.emit('status', {'status': 'running'})
+
+    def finish(self, status: str, event: str, data: Dict[str, Any]) -> None:
+        """Beendet den Job - Status und letztes Ereignis werden gemeinsam sichtbar"""
+        with self._changed:
+            self.status = status
+            self.finished_at = time.time()
+            self.emit(event, data)
+
+    def wait_events(self, index: int, timeout: float) -> Tuple[List[Tuple[int, str, Dict[str, Any]]], bool]:
+        """
+        Ereignisse ab index; wartet bis zu timeout Sekunden, falls noch keine vorliegen
+
+        Returns:
+            (Liste (Index, Ereignis, Daten), True wenn der Job beendet und alles geliefert ist)
+        """
+        with self._changed:
+            if index >= len(self.events) and not self.finished:
+                self._changed.wait(timeout)
+            events = [(i, event, data) for i, (event, data) in enumerate(self.events[index:], index)]
+            return events, self.finished and index + len(events) >= len(self.events)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Zustand für das Polling (/jobs/<id>)"""
+        with self._changed:
+            counts = {}
+            for info in self.files.values():
+                counts[info['status']] = counts.get(info['status'], 0) + 1
+            snapshot = {
+                'job_id': self.id,
+                'preset': self.preset,
+                'status': self.status,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'files': {name: dict(info) for name, info in self.files.items()},
+                'files_total': len(self.files),
+                'files_done': counts.get('done', 0),
+                'files_failed': counts.get('failed', 0),
+                'files_skipped': self.files_skipped,
+                'events': len(self.events)
+            }
+            if self.summary is not None:
+                snapshot['results'] = self.summary
+            if self.error is not None:
+                snapshot['error'] = self.error
+            return snapshot
+
+
+class WebJobManager:
+    """Begrenzter Thread-Pool für Batch-Jobs der Weboberfläche"""
+
+    def __init__(self, input_dir: Path, output_dir: Path, max_workers: int = WEB_JOB_WORKERS,
+                 history: int = WEB_JOB_HISTORY, analysis_index: Optional[AnalysisIndex] = None):
+        if max_workers < 1:
+            raise ValueError(f"Anzahl Job-Worker muss mindestens 1 sein ({max_workers} angegeben)")
+        self.input_dir = Path(input_dir)
+        self.output_dir = Path(output_dir)
+        self.history = history
+        self.analysis_index = analysis_index  # geteilt mit der Indexseite
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='web-job')
+        self._jobs: 'OrderedDict[str, WebJob]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._output_locks: Dict[Path, threading.Lock] = {}
+
+    def submit(self, preset: str) -> WebJob:
+        """Reiht einen Batch-Job ein und kehrt sofort zurück"""
+        job = WebJob(uuid.uuid4().hex[:12], preset)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+        job.emit('status', {'status': 'queued'})
+        self._executor.submit(self._run, job)
+        logger.info(f"📨 Job {job.id} eingereiht (Preset {preset})")
+        return job
+
+    def get(self, job_id: str) -> Optional[WebJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[WebJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _evict(self) -> None:
+        """Vergisst die ältesten abgeschlossenen Jobs über dem History-Limit"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+
+    def _run(self, job: WebJob) -> None:
+        with self._lock:
+            output_lock = self._output_locks.setdefault(self.output_dir.resolve(), threading.Lock())
+        if not output_lock.acquire(blocking=False):
+            job.emit('waiting', {'reason': 'Anderer Batch auf denselben Output-Ordner läuft'})
+            output_lock.acquire()
+        try:
+            job.start()
+            processor = BatchProcessor(self.input_dir, self.output_dir, preset=job.preset,
+                                       analysis_index=self.analysis_index)
+            summary = processor.process_batch(max_workers=1, progress=job.emit)
+        except Exception as e:
+            logger.error(f"❌ Job {job.id} fehlgeschlagen: {e}")
+            job.error = str(e)
+            job.finish('failed', 'job_failed', {'error': str(e)})
+        else:
+            job.summary = summary
+            job.finish('done', 'job_done', {'files_processed': summary['files_processed'],
+                                            'outputs_written': summary['outputs_written'],
+                                            'files_failed': summary['files_failed'],
+                                            'files_skipped': summary.get('files_skipped', 0),
+                                            'total_time_sec': summary['total_time_sec']})
+            logger.info(f"✅ Job {job.id}: {summary['files_processed']} Dateien verarbeitet")
+        finally:
+            output_lock.release()
@@ -3,24 +3,39 @@
 Einfacher Webserver für Audio-Vergleich
 """
 
-from flask import Flask, render_template_string, send_from_directory, request, jsonify
+from flask import Flask, Response, render_template_string, send_file, send_from_directory, request, jsonify
 from pathlib import Path
 import json
-import os
+import logging
 import threading
 from werkzeug.utils import secure_filename
 from werkzeug.security import safe_join
 from audio_analyzer import AudioAnalyzer
-from batch_processor import BatchProcessor
+from analysis_index import AnalysisIndex
 from audio_processor import MASTERING_PRESETS
-from config import MAX_FILE_SIZE_MB
+from config import MAX_FILE_SIZE_MB, PREVIEW_DIRNAME, WAVEFORM_DEFAULT_BINS, WEB_SSE_KEEPALIVE_SEC
+from preview_cache import PreviewCache
+from web_jobs import WebJobManager, format_sse
+from upload_ingest import ingest_multipart, UploadTooLarge
+from waveform import sidecar_path, waveform_level
 import shutil
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
 # Pfade
 INPUT_DIR = Path("input")
 OUTPUT_DIR = Path("output")
+AUDIO_FOLDERS = {'input': INPUT_DIR, 'output': OUTPUT_DIR}
+
+# Analysen der Indexseite bleiben über Aufrufe hinweg erhalten (nur geänderte Dateien neu)
+analysis_index = AnalysisIndex(OUTPUT_DIR)
+
+# Batch-Jobs laufen im Hintergrund (begrenzter Pool), /process antwortet sofort
+web_jobs = WebJobManager(INPUT_DIR, OUTPUT_DIR, analysis_index=analysis_index)
+
+# Der A/B-Player spielt komprimierte Vorschauen statt der vollen WAVs (erzeugt beim ersten Abruf)
+preview_cache = PreviewCache(OUTPUT_DIR / PREVIEW_DIRNAME)
 
 # Erlaubte Dateiendungen
 ALLOWED_EXTENSIONS = {'wav', 'mp3', 'flac', 'aiff'}
@@ -47,24 +62,25 @@ def get_app_version():
     return "1.0.0"  # Fallback
 
 
+def suggest_preset(lufs):
+    """Preset-Vorschlag aus der integrierten Lautheit - immer Suno für AI-Musik"""
+    if lufs > -12:
+        return "suno", "Suno AI Preset für bereits laute Aufnahmen"
+    elif lufs > -16:
+        return "suno", "Suno AI Preset für moderate Lautheit"
+    elif lufs > -20:
+        return "suno", "Suno AI Preset für leise Aufnahmen"
+    else:
+        return "suno", "Suno AI Preset für sehr leise Aufnahmen"
+
+
 def analyze_audio_for_preset(audio_path):
     """Analysiere Audio-Datei und schlage Preset vor"""
     try:
-        analyzer = AudioAnalyzer()
-        stats = analyzer.analyze_file(audio_path)
-
-        lufs = stats['original_lufs']
-
-        # Preset-Empfehlungen basierend auf LUFS - immer Suno für AI-Musik
-        if lufs > -12:
-            return "suno", "Suno AI Preset für bereits laute Aufnahmen"
-        elif lufs > -16:
-            return "suno", "Suno AI Preset für moderate Lautheit"
-        elif lufs > -20:
-            return "suno", "Suno AI Preset für leise Aufnahmen"
-        else:
-            return "suno", "Suno AI Preset für sehr leise Aufnahmen"
-    except:
+        analyzer = AudioAnalyzer(index=analysis_index)
+        stats = analyzer.analyze_file(str(audio_path))
+        return suggest_preset(stats['lufs_integrated'])
+    except Exception:
         return "suno", "Suno AI Preset bei Analysefehler"
 
 HTML_TEMPLATE = """
@@ -174,6 +190,13 @@ HTML_TEMPLATE = """
             margin-bottom: 10px;
         }
 
+        .waveform {
+            display: block;
+            width: 100%;
+            height: 80px;
+            cursor: pointer;
+        }
+
         .controls {
             display: flex;
             gap: 10px;
@@ -364,10 +387,13 @@ HTML_TEMPLATE = """
                         <div class="audio-player">
                             <div class="audio-label" id="label-{{ file.name }}">🎤 ORIGINAL</div>
                             <audio id="audio-{{ file.name }}" controls preload="metadata">
-                                <source id="source-original-{{ file.name }}" src="/audio/input/{{ file.name }}" type="audio/wav">
-                                <source id="source-mastered-{{ file.name }}" src="/audio/output/{{ file.mastered_name }}" type="audio/wav">
+                                <source id="source-original-{{ file.name }}" src="/audio/input/{{ file.name }}?preview=1" type="{{ preview_mime }}">
+                                <source id="source-mastered-{{ file.name }}" src="/audio/output/{{ file.mastered_name }}?preview=1" type="{{ preview_mime }}">
                                 Ihr Browser unterstützt das Audio-Element nicht.
                             </audio>
+                            <canvas class="waveform" id="waveform-{{ file.name }}" width="600" height="80"
+                                    data-original="/waveform/input/{{ file.name }}"
+                                    data-mastered="/waveform/output/{{ file.mastered_name }}"></canvas>
                         </div>
                     </div>
 
@@ -679,10 +705,8 @@ HTML_TEMPLATE = """
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
-                    statusDiv.innerHTML = '<span style="color: #27ae60;">✅ ' + data.message + '</span>';
-                    setTimeout(() => {
-                        location.reload();
-                    }, 2000);
+                    statusDiv.innerHTML = '<span style="color: #f39c12;">⏳ ' + data.message + '</span>';
+                    followJob(data.events_url, statusDiv);
                 } else {
                     statusDiv.innerHTML = '<span style="color: #e74c3c;">❌ Fehler: ' + data.error + '</span>';
                 }
@@ -692,6 +716,42 @@ HTML_TEMPLATE = """
             });
         }
 
+        // Fortschritt eines Hintergrund-Jobs per Server-Sent Events anzeigen
+        function followJob(eventsUrl, statusDiv) {
+            const source = new EventSource(eventsUrl);
+            let total = 0;
+            let finished = 0;
+
+            source.addEventListener('waiting', () => {
+                statusDiv.innerHTML = '<span style="color: #f39c12;">⏳ Wartet auf laufenden Batch...</span>';
+            });
+            source.addEventListener('batch_start', (e) => {
+                total = JSON.parse(e.data).files.length;
+                statusDiv.innerHTML = `<span style="color: #f39c12;">🎛️ 0/${total} Dateien gemastert</span>`;
+            });
+            source.addEventListener('file_start', (e) => {
+                const file = JSON.parse(e.data).file;
+                statusDiv.innerHTML = `<span style="color: #f39c12;">🎛️ ${finished}/${total} - verarbeite ${file}...</span>`;
+            });
+            ['file_done', 'file_failed'].forEach(type => source.addEventListener(type, () => {
+                finished++;
+                statusDiv.innerHTML = `<span style="color: #f39c12;">🎛️ ${finished}/${total} Dateien gemastert</span>`;
+            }));
+            source.addEventListener('job_done', (e) => {
+                source.close();
+                const data = JSON.parse(e.data);
+                statusDiv.innerHTML = `<span style="color: #27ae60;">✅ ${data.files_processed} Dateien verarbeitet` +
+                    (data.files_failed ? `, ${data.files_failed} Fehler` : '') + '</span>';
+                setTimeout(() => {
+                    location.reload();
+                }, 2000);
+            });
+            source.addEventListener('job_failed', (e) => {
+                source.close();
+                statusDiv.innerHTML = '<span style="color: #e74c3c;">❌ Fehler: ' + JSON.parse(e.data).error + '</span>';
+            });
+        }
+
         // Löschen-Funktion
         function deleteMastered(filename) {
             if (!confirm(`Möchten Sie "${filename}" wirklich löschen?`)) {
@@ -715,6 +775,42 @@ HTML_TEMPLATE = """
             });
         }
 
+        // Wellenform-Übersicht: Original (rot) und Mastered (grün) übereinander, Klick springt zur Position
+        async function fetchWaveform(url, bins) {
+            const response = await fetch(`${url}?bins=${bins}`);
+            if (!response.ok) return null;
+            // int16 little-endian: min, max, rms pro Bin
+            return new Int16Array(await response.arrayBuffer());
+        }
+
+        async function drawWaveform(canvas) {
+            const filename = canvas.id.replace('waveform-', '');
+            const ctx = canvas.getContext('2d');
+            const [original, mastered] = await Promise.all([
+                fetchWaveform(canvas.dataset.original, canvas.width),
+                fetchWaveform(canvas.dataset.mastered, canvas.width)
+            ]);
+            const mid = canvas.height / 2;
+            [[original, 'rgba(231, 76, 60, 0.6)'], [mastered, 'rgba(39, 174, 96, 0.6)']].forEach(([data, color]) => {
+                if (!data) return;
+                const bins = data.length / 3;
+                ctx.fillStyle = color;
+                for (let x = 0; x < canvas.width; x++) {
+                    const i = Math.floor(x * bins / canvas.width) * 3;
+                    const top = mid - data[i + 1] / 32767 * mid;
+                    const bottom = mid - data[i] / 32767 * mid;
+                    ctx.fillRect(x, top, 1, Math.max(1, bottom - top));
+                }
+            });
+
+            canvas.addEventListener('click', (e) => {
+                const audio = document.getElementById(`audio-${filename}`);
+                if (audio.duration) {
+                    audio.currentTime = e.offsetX / canvas.clientWidth * audio.duration;
+                }
+            });
+        }
+
         // Audio-Event-Listener für Button-Synchronisation
         document.addEventListener('DOMContentLoaded', () => {
             const allAudio = document.querySelectorAll('audio');
@@ -741,6 +837,8 @@ HTML_TEMPLATE = """
                 });
             });
 
+            document.querySelectorAll('canvas.waveform').forEach(drawWaveform);
+
             console.log('🎵 A/B Audio-Vergleich geladen');
         });
 
@@ -784,8 +882,8 @@ HTML_TEMPLATE = """
 def index():
     """Hauptseite mit Audio-Vergleich"""
     try:
-        # Audio-Dateien finden und analysieren
-        analyzer = AudioAnalyzer()
+        # Audio-Dateien finden und analysieren (unveränderte Dateien aus dem Index)
+        analyzer = AudioAnalyzer(index=analysis_index)
         comparisons = analyzer.batch_compare(str(INPUT_DIR), str(OUTPUT_DIR))
 
         # Daten für Template vorbereiten
@@ -808,7 +906,8 @@ def index():
                 }
             })
 
-        return render_template_string(HTML_TEMPLATE, files=files_data, version=get_app_version())
+        return render_template_string(HTML_TEMPLATE, files=files_data, version=get_app_version(),
+                                      preview_mime=preview_cache.mimetype)
 
     except Exception as e:
         return f"""
@@ -821,74 +920,118 @@ def index():
         </html>
         """
 
+def resolve_audio_path(folder, filename):
+    """Pfad einer Audiodatei in input/ oder output/ (None, falls nicht vorhanden oder ungültig)"""
+    if folder not in AUDIO_FOLDERS:
+        return None
+    # Security: safe_join verhindert Directory Traversal
+    file_path = safe_join(str(AUDIO_FOLDERS[folder]), filename)
+    if not file_path or not Path(file_path).is_file():
+        return None
+    return Path(file_path)
+
+
 @app.route('/audio/<folder>/<filename>')
 def serve_audio(folder, filename):
-    """Audio-Dateien ausliefern (mit Security-Validierung)"""
+    """
+    Audio-Dateien ausliefern (mit Security-Validierung)
+
+    Mit ?preview=1 wird die gecachte Vorschau (OGG/FLAC) geliefert. Beide Varianten
+    unterstützen Range-Requests (Spulen, sofortiger Start) und bedingte Anfragen
+    (ETag/If-None-Match → 304).
+    """
     # Security: Filename sanitization gegen Path Traversal
     filename = secure_filename(filename)
 
     if not filename:
         return "Ungültiger Dateiname", 400
 
-    if folder == 'input':
-        # Security: safe_join verhindert Directory Traversal
-        file_path = safe_join(str(INPUT_DIR), filename)
-        if file_path and Path(file_path).exists():
-            return send_from_directory(INPUT_DIR, filename)
-    elif folder == 'output':
-        file_path = safe_join(str(OUTPUT_DIR), filename)
-        if file_path and Path(file_path).exists():
-            return send_from_directory(OUTPUT_DIR, filename)
+    file_path = resolve_audio_path(folder, filename)
+    if file_path is None:
+        return "Datei nicht gefunden", 404
+
+    if request.args.get('preview'):
+        try:
+            preview_path, key = preview_cache.get(file_path)
+        except Exception as e:
+            # Vorschau nicht erzeugbar (z.B. Format ohne libsndfile-Unterstützung) - volle Datei liefern
+            logger.warning(f"⚠️  Keine Vorschau für {filename}: {e}")
+        else:
+            return send_file(preview_path.resolve(), mimetype=preview_cache.mimetype, conditional=True, etag=key)
+
+    return send_from_directory(AUDIO_FOLDERS[folder], filename)
+
+
+@app.route('/waveform/<folder>/<filename>')
+def serve_waveform(folder, filename):
+    """
+    Wellenform-Übersicht als Binärdaten statt Audio
+
+    ?bins=N wählt die gröbste Stufe mit mindestens N Werten (Standard: WAVEFORM_DEFAULT_BINS).
+    Body: int16 little-endian, pro Bin min, max, rms (Skala 32767); Eckdaten in den
+    X-Waveform-*-Headern. Fehlt das Sidecar, wird es beim ersten Abruf erzeugt.
+    """
+    filename = secure_filename(filename)
+    if not filename:
+        return "Ungültiger Dateiname", 400
+
+    bins = request.args.get('bins', WAVEFORM_DEFAULT_BINS, type=int)
+    if bins < 1:
+        return jsonify({'error': f'bins muss mindestens 1 sein ({bins} angegeben)'}), 400
 
-    return "Datei nicht gefunden", 404
+    file_path = resolve_audio_path(folder, filename)
+    if file_path is None:
+        return "Datei nicht gefunden", 404
+
+    try:
+        level = waveform_level(file_path, bins)
+    except Exception as e:
+        logger.error(f"❌ Wellenform für {filename} fehlgeschlagen: {e}")
+        return jsonify({'error': str(e)}), 500
+
+    response = Response(level['data'].tobytes(), mimetype='application/octet-stream')
+    response.headers['X-Waveform-Sample-Rate'] = str(level['sample_rate'])
+    response.headers['X-Waveform-Channels'] = str(level['channels'])
+    response.headers['X-Waveform-Frames'] = str(level['frames'])
+    response.headers['X-Waveform-Samples-Per-Bin'] = str(level['samples_per_bin'])
+    response.headers['X-Waveform-Bins'] = str(level['bins'])
+    response.set_etag(level['etag'])
+    return response.make_conditional(request)
 
 
 @app.route('/upload', methods=['POST'])
 def upload_file():
-    """Datei-Upload über Weboberfläche (mit Größen-Validierung)"""
-    if 'file' not in request.files:
+    """Datei-Upload über Weboberfläche (Streaming: Größen-Check, Hash und Lautheit beim Empfang)"""
+    boundary = request.mimetype_params.get('boundary')
+    if request.mimetype != 'multipart/form-data' or not boundary:
         return jsonify({'error': 'Keine Datei ausgewählt'}), 400
 
-    files = request.files.getlist('file')
-    uploaded_files = []
+    INPUT_DIR.mkdir(exist_ok=True)
+    try:
+        files = ingest_multipart(request.stream, boundary.encode('latin-1'), INPUT_DIR,
+                                 MAX_FILE_SIZE_MB * 1024 * 1024, allowed_file)
+    except UploadTooLarge as e:
+        return jsonify({'error': f'{e} - Maximum {MAX_FILE_SIZE_MB}MB'}), 413
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
 
-    for file in files:
-        if file.filename == '':
-            continue
-
-        # Security & Validation: Dateigrößen-Check
-        file.seek(0, os.SEEK_END)
-        size_bytes = file.tell()
-        size_mb = size_bytes / (1024 * 1024)
-        file.seek(0)
-
-        if size_mb > MAX_FILE_SIZE_MB:
-            return jsonify({
-                'error': f'{file.filename} ist zu groß ({size_mb:.1f}MB > {MAX_FILE_SIZE_MB}MB)'
-            }), 413
-
-        if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            file_path = INPUT_DIR / filename
-
-            # Speichere Datei
-            file.save(file_path)
-
-            # Analysiere Datei für Preset-Vorschlag
-            try:
-                preset, reason = analyze_audio_for_preset(file_path)
-            except Exception as e:
-                # Fallback bei Analyse-Fehler
-                preset, reason = 'default', 'Standard (Analyse fehlgeschlagen)'
-
-            uploaded_files.append({
-                'filename': filename,
-                'preset': preset,
-                'reason': reason,
-                'size_mb': round(size_mb, 2)
-            })
+    uploaded_files = []
+    for info in files:
+        # Preset-Vorschlag aus der Lautheit, die beim Empfang gemessen wurde (WAV);
+        # andere Formate werden nach dem Speichern analysiert
+        if info['lufs'] is not None:
+            preset, reason = suggest_preset(info['lufs'])
         else:
-            return jsonify({'error': f'Dateityp von {file.filename} nicht erlaubt'}), 400
+            preset, reason = analyze_audio_for_preset(INPUT_DIR / info['filename'])
+
+        uploaded_files.append({
+            'filename': info['filename'],
+            'preset': preset,
+            'reason': reason,
+            'size_mb': round(info['size_bytes'] / (1024 * 1024), 2),
+            'sha256': info['sha256'],
+            'lufs': info['lufs']
+        })
 
     if not uploaded_files:
         return jsonify({'error': 'Keine gültigen Dateien hochgeladen'}), 400
@@ -902,23 +1045,72 @@ def upload_file():
 
 @app.route('/process', methods=['POST'])
 def process_files():
-    """Starte Mastering-Verarbeitung über Weboberfläche"""
-    try:
-        preset = request.form.get('preset', 'default')
+    """Starte Mastering-Verarbeitung über Weboberfläche (Hintergrund-Job, Antwort sofort)"""
+    preset = request.form.get('preset', 'default')
+    if preset not in MASTERING_PRESETS:
+        return jsonify({'error': f'Unbekanntes Preset "{preset}" (erlaubt: {", ".join(MASTERING_PRESETS)})'}), 400
 
-        # Batch-Verarbeitung starten
-        processor = BatchProcessor(INPUT_DIR, OUTPUT_DIR, preset=preset)
-        results = processor.process_batch(max_workers=1)
-
-        # Seite neu laden lassen
-        return jsonify({
-            'success': True,
-            'message': f'{results["files_processed"]} Dateien mit Preset "{preset}" verarbeitet',
-            'results': results
-        })
+    try:
+        job = web_jobs.submit(preset)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    return jsonify({
+        'success': True,
+        'job_id': job.id,
+        'message': f'Mastering mit Preset "{preset}" gestartet',
+        'status_url': f'/jobs/{job.id}',
+        'events_url': f'/jobs/{job.id}/events'
+    }), 202
+
+
+@app.route('/jobs')
+def list_jobs():
+    """Alle bekannten Jobs (laufend und zuletzt abgeschlossen)"""
+    return jsonify({'jobs': [
+        {key: value for key, value in job.snapshot().items() if key not in ('files', 'results')}
+        for job in web_jobs.jobs()
+    ]})
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Fortschritt eines Jobs (Polling)"""
+    job = web_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+    return jsonify(job.snapshot())
+
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Fortschritt eines Jobs als Server-Sent Events (endet mit job_done / job_failed)"""
+    job = web_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job nicht gefunden'}), 404
+
+    # Nach Verbindungsabbruch setzt der Browser Last-Event-ID - nur Neues senden
+    try:
+        index = int(request.headers.get('Last-Event-ID', -1)) + 1
+    except ValueError:
+        index = 0
+
+    def stream():
+        position = index
+        while True:
+            events, finished = job.wait_events(position, WEB_SSE_KEEPALIVE_SEC)
+            if not events and not finished:
+                yield ": keepalive\n\n"
+                continue
+            for event_id, event, data in events:
+                yield format_sse(event_id, event, data)
+            position += len(events)
+            if finished:
+                return
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 
 @app.route('/delete/<filename>', methods=['DELETE'])
 def delete_file(filename):
@@ -934,6 +1126,7 @@ def delete_file(filename):
         file_path = OUTPUT_DIR / filename
         if file_path.exists():
             file_path.unlink()
+            sidecar_path(file_path).unlink(missing_ok=True)
             return jsonify({'success': True, 'message': f'{filename} gelöscht'})
         else:
             return jsonify({'error': 'Datei nicht gefunden'}), 404